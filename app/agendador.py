@@ -0,0 +1,82 @@
+import os
+import logging
+import threading
+from datetime import datetime, date, time
+from sqlalchemy import text
+from app import crud
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Com vários processos (workers do uvicorn, réplicas), só os com
+# EXPIRACAO_AGENDADOR=1 sobem o agendador. No Postgres, quem sobe ainda
+# disputa um advisory lock a cada rodada: só um fecha as votações por vez e
+# os outros esperam a próxima.
+EXPIRACAO_AGENDADOR = os.getenv("EXPIRACAO_AGENDADOR", "1") == "1"
+CHAVE_LOCK = 0x766F7461  # pg_try_advisory_xact_lock
+
+# Teto de espera entre duas rodadas, em segundos. Votações criadas ou alteradas
+# depois do último cálculo do próximo vencimento são pegas no máximo nesse prazo;
+# as leituras já derivam o status na consulta, então o atraso nunca aparece na API.
+INTERVALO_MAXIMO = float(os.getenv("EXPIRACAO_INTERVALO_MAX", "60"))
+
+
+def _segundos_ate(vencimento, agora):
+    if vencimento is None:
+        return None
+    if isinstance(vencimento, date) and not isinstance(vencimento, datetime):
+        vencimento = datetime.combine(vencimento, time.min)
+    return (vencimento - agora).total_seconds()
+
+
+# Fecha votações vencidas com um único UPDATE, acordando no próximo data_fim
+class AgendadorExpiracao:
+    def __init__(self, session_factory=SessionLocal, intervalo_maximo=INTERVALO_MAXIMO):
+        self.session_factory = session_factory
+        self.intervalo_maximo = intervalo_maximo
+        self._parar = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parar.clear()
+        self._thread = threading.Thread(target=self._executar, name="agendador-expiracao", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def rodada(self):
+        # Retorna quantos segundos esperar até a próxima rodada
+        db = self.session_factory()
+        try:
+            if db.get_bind().dialect.name == "postgresql":
+                # Preso à transação: o commit do UPDATE solta o lock
+                if not db.execute(text("SELECT pg_try_advisory_xact_lock(:chave)"), {"chave": CHAVE_LOCK}).scalar():
+                    return self.intervalo_maximo
+            crud.atualizar_status_votacoes_expiradas(db)
+            vencimento = crud.proximo_vencimento(db)
+        finally:
+            db.close()
+
+        espera = _segundos_ate(vencimento, datetime.utcnow())
+        # espera <= 0: o limite já passou mas o banco compara data_fim por dia
+        # (ex.: SQLite); volta no intervalo máximo em vez de girar em falso
+        if espera is None or espera <= 0:
+            return self.intervalo_maximo
+        return min(espera, self.intervalo_maximo)
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                espera = self.rodada()
+            except Exception:
+                logger.exception("Erro ao fechar votações expiradas")
+                espera = self.intervalo_maximo
+            self._parar.wait(espera)
+
+
+agendador = AgendadorExpiracao()
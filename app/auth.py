@@ -1,3 +1,7 @@
+import os
+import time
+import threading
+from collections import OrderedDict
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -8,6 +12,65 @@ from app.token import SECRET_KEY, ALGORITHM
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login/")
 
+# AUTH_CACHE_TTL / AUTH_CACHE_MAX: validade (s) e tamanho do cache de usuários autenticados.
+# AUTH_SOMENTE_CLAIMS=1: monta o usuário só com as claims assinadas do token
+# (id, user_type, nome_completo, email), sem ir ao banco. Nesse modo uma
+# mudança de papel só vale quando o token expira.
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "60"))
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "10000"))
+AUTH_SOMENTE_CLAIMS = os.getenv("AUTH_SOMENTE_CLAIMS", "0") == "1"
+
+
+class CachePrincipais:
+    def __init__(self, ttl=AUTH_CACHE_TTL, tamanho_max=AUTH_CACHE_MAX):
+        self.ttl = ttl
+        self.tamanho_max = tamanho_max
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, id_user):
+        with self._lock:
+            item = self._itens.get(id_user)
+            if item is None:
+                return None
+            expira, user = item
+            if expira < time.monotonic():
+                del self._itens[id_user]
+                return None
+            self._itens.move_to_end(id_user)
+            return user
+
+    def guardar(self, id_user, user):
+        with self._lock:
+            self._itens[id_user] = (time.monotonic() + self.ttl, user)
+            self._itens.move_to_end(id_user)
+            while len(self._itens) > self.tamanho_max:
+                self._itens.popitem(last=False)
+
+    def invalidar(self, id_user):
+        with self._lock:
+            self._itens.pop(id_user, None)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+principais = CachePrincipais()
+
+def invalidar_principal(id_user):
+    # Chamar sempre que papel ou credenciais do usuário mudarem
+    principais.invalidar(int(id_user))
+
+
+def _user_das_claims(payload):
+    return models.User(
+        id_user=int(payload["id"]),
+        user_type=payload.get("user_type"),
+        nome_completo=payload.get("nome_completo"),
+        email=payload.get("email"),
+    )
+
 
 def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
     try:
@@ -17,11 +80,21 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         if user_id is None:
             raise HTTPException(status_code=401, detail="Token inválido")
 
+        if AUTH_SOMENTE_CLAIMS and "user_type" in payload:
+            return _user_das_claims(payload)
+
+        user = principais.obter(int(user_id))
+        if user is not None:
+            return user
+
         user = db.query(models.User).filter(models.User.id_user == user_id).first()
 
         if user is None:
             raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
+        # Desanexa da sessão da requisição para poder reaproveitar nas próximas
+        db.expunge(user)
+        principais.guardar(int(user_id), user)
         return user
 
     except JWTError:
@@ -38,4 +111,3 @@ def admin_required(current_user: models.User = Depends(get_current_user)):
             detail="Acesso permitido apenas para administradores."
         )
     return current_user
-
@@ -0,0 +1,137 @@
+import os
+import re
+from sqlalchemy import select, text, func, literal_column, table, column, type_coerce, and_, or_, Integer, Float
+from app import models
+
+# Busca de votações por título e descrição (GET /votacoes/busca), com índice
+# em cada banco para o custo acompanhar o número de resultados, não o de
+# votações:
+#   - SQLite: tabela FTS5 votacao_busca com conteúdo externo (a própria
+#     votacao), mantida por triggers; ranking por bm25 com o título pesando
+#     PESO_TITULO vezes a descrição. Acentos e caixa são ignorados.
+#   - Postgres: índice GIN sobre o tsvector em português do título (peso A)
+#     e da descrição (peso B); ranking por ts_rank. A consulta usa o mesmo
+#     texto de VETOR_PG, senão o planejador não reconhece o índice.
+#   - Sem índice (banco sem "python -m app.esquema" ou outro dialeto): LIKE
+#     em ordem de id, que varre a tabela.
+# Todas as palavras precisam aparecer (E entre os termos).
+#
+# O ranking custa por resultado encontrado (bm25/ts_rank de cada um), então
+# um termo que aparece em boa parte das votações sai caro. Por padrão todos
+# os resultados são ranqueados. BUSCA_MAX_CANDIDATOS=N (opcional) troca
+# completude por latência: só os N resultados mais novos (maior id) entram
+# no ranking, e uma votação mais antiga que case com a busca não aparece em
+# página nenhuma, por mais relevante que seja. Filtros extras (categoria)
+# entram antes do corte, para uma categoria com poucos resultados antigos
+# não ficar sem nenhum.
+PESO_TITULO, PESO_DESCRICAO = 10.0, 1.0
+MAX_TERMOS = 10
+BUSCA_MAX_CANDIDATOS = int(os.getenv("BUSCA_MAX_CANDIDATOS") or "0")
+
+DDL_SQLITE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS votacao_busca USING fts5(titulo, descricao, content='votacao', content_rowid='id_votacao', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS votacao_busca_ai AFTER INSERT ON votacao BEGIN "
+    "INSERT INTO votacao_busca(rowid, titulo, descricao) VALUES (new.id_votacao, new.titulo, new.descricao); END",
+    "CREATE TRIGGER IF NOT EXISTS votacao_busca_ad AFTER DELETE ON votacao BEGIN "
+    "INSERT INTO votacao_busca(votacao_busca, rowid, titulo, descricao) VALUES ('delete', old.id_votacao, old.titulo, old.descricao); END",
+    "CREATE TRIGGER IF NOT EXISTS votacao_busca_au AFTER UPDATE OF titulo, descricao ON votacao BEGIN "
+    "INSERT INTO votacao_busca(votacao_busca, rowid, titulo, descricao) VALUES ('delete', old.id_votacao, old.titulo, old.descricao); "
+    "INSERT INTO votacao_busca(rowid, titulo, descricao) VALUES (new.id_votacao, new.titulo, new.descricao); END",
+]
+OBJETOS_SQLITE = {"votacao_busca", "votacao_busca_ai", "votacao_busca_ad", "votacao_busca_au"}
+
+VETOR_PG = "(setweight(to_tsvector('portuguese', coalesce(titulo, '')), 'A') || setweight(to_tsvector('portuguese', coalesce(descricao, '')), 'B'))"
+DDL_PG = f"CREATE INDEX IF NOT EXISTS ix_votacao_busca ON votacao USING gin ({VETOR_PG})"
+
+_fts = table("votacao_busca", column("rowid", Integer), column("votacao_busca"))
+
+# Binds (str(url)) em que a tabela FTS5 já foi vista; só o positivo fica
+# guardado, para a busca passar a usar o índice assim que o esquema for criado
+_com_indice = set()
+
+
+def termos(consulta):
+    return re.findall(r"\w+", (consulta or "").lower())[:MAX_TERMOS]
+
+
+def _faltando_sqlite(conexao):
+    existentes = set(conexao.execute(text("SELECT name FROM sqlite_master WHERE name LIKE 'votacao_busca%'")).scalars())
+    return OBJETOS_SQLITE - existentes
+
+
+def pendente(engine):
+    # Nome do índice de busca que falta criar, ou None
+    with engine.connect() as conexao:
+        if engine.dialect.name == "sqlite":
+            return "votacao_busca" if _faltando_sqlite(conexao) else None
+        if engine.dialect.name == "postgresql":
+            existe = conexao.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_votacao_busca'")).first()
+            return None if existe else "ix_votacao_busca"
+    return None
+
+
+def criar(engine):
+    with engine.begin() as conexao:
+        if engine.dialect.name == "sqlite":
+            for ddl in DDL_SQLITE:
+                conexao.execute(text(ddl))
+            # Indexa o que já existia na votacao
+            conexao.execute(text("INSERT INTO votacao_busca(votacao_busca) VALUES ('rebuild')"))
+        elif engine.dialect.name == "postgresql":
+            conexao.execute(text(DDL_PG))
+
+
+def _modo(db):
+    bind = db.get_bind()
+    if bind.dialect.name == "postgresql":
+        return "tsvector"
+    if bind.dialect.name == "sqlite":
+        chave = str(bind.url)
+        if chave not in _com_indice:
+            if _faltando_sqlite(db):
+                return "like"
+            _com_indice.add(chave)
+        return "fts5"
+    return "like"
+
+
+def _piso(coluna_id, origem, condicoes):
+    # Menor id entre os BUSCA_MAX_CANDIDATOS resultados mais novos que passam
+    # em todas as condições; a comparação "id >= piso" entra na varredura do
+    # índice
+    mais_novos = (
+        select(coluna_id).select_from(origem).where(*condicoes)
+        .order_by(coluna_id.desc()).offset(BUSCA_MAX_CANDIDATOS - 1).limit(1)
+    )
+    return func.coalesce(mais_novos.correlate(None).scalar_subquery(), 0)
+
+
+def stmt_busca(db, palavras, colunas, filtros=()):
+    # Devolve (select, colunas de ordenação para paginar, chave do cursor).
+    # colunas: as colunas da votação a devolver (crud.colunas_votacao);
+    # filtros: condições extras sobre a votação, aplicadas também na escolha
+    # dos candidatos ranqueados
+    modo = _modo(db)
+    if modo == "fts5":
+        # bm25 é menor para o mais relevante: ordem crescente
+        relevancia = type_coerce(func.bm25(literal_column("votacao_busca"), PESO_TITULO, PESO_DESCRICAO), Float)
+        filtro = _fts.c.votacao_busca.match(" ".join(f'"{p}"' for p in palavras))
+        origem = _fts.join(models.Votacao.__table__, models.Votacao.id_votacao == _fts.c.rowid)
+        stmt = select(*colunas, relevancia.label("relevancia")).select_from(origem).where(filtro, *filtros)
+        if BUSCA_MAX_CANDIDATOS:
+            # Sem filtros extras o piso sai só da tabela FTS5
+            stmt = stmt.where(_fts.c.rowid >= _piso(_fts.c.rowid, origem if filtros else _fts, [filtro, *filtros]))
+    elif modo == "tsvector":
+        vetor = literal_column(VETOR_PG)
+        consulta = func.plainto_tsquery(literal_column("'portuguese'"), " ".join(palavras))
+        relevancia = type_coerce(-func.ts_rank(vetor, consulta), Float)
+        filtro = vetor.op("@@")(consulta)
+        stmt = select(*colunas, relevancia.label("relevancia")).where(filtro, *filtros)
+        if BUSCA_MAX_CANDIDATOS:
+            stmt = stmt.where(models.Votacao.id_votacao >= _piso(models.Votacao.id_votacao, models.Votacao.__table__, [filtro, *filtros]))
+    else:
+        stmt = select(*colunas).where(and_(*(
+            or_(models.Votacao.titulo.ilike(f"%{p}%"), models.Votacao.descricao.ilike(f"%{p}%")) for p in palavras
+        )), *filtros)
+        return stmt, [models.Votacao.id_votacao], lambda v: [v.id_votacao]
+    return stmt, [relevancia, models.Votacao.id_votacao], lambda v: [v.relevancia, v.id_votacao]
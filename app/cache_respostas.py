@@ -0,0 +1,139 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from fastapi import Request, Response
+from app.paginacao import Pagina, CABECALHO_CURSOR
+from app.serializacao import para_json
+
+# Cache das respostas de leitura (listagens de votações, opções e
+# candidaturas). Cada entrada guarda o corpo JSON já serializado e vale
+# enquanto as versões das entidades de que depende não mudarem; as funções de
+# escrita do crud chamam invalidar() depois do commit. O ETag é o hash do
+# corpo, então If-None-Match responde 304 mesmo depois de a entrada sair do
+# cache ou vir de outro worker.
+# O TTL limita o quanto uma entrada pode ficar velha por mudanças que não
+# passam por invalidar(): escrita feita em outro worker e o status derivado
+# da hora (votação que vence enquanto a entrada está guardada).
+RESPOSTAS_CACHE = os.getenv("RESPOSTAS_CACHE", "1") == "1"
+RESPOSTAS_CACHE_TTL = float(os.getenv("RESPOSTAS_CACHE_TTL", "5"))
+RESPOSTAS_CACHE_MAX = int(os.getenv("RESPOSTAS_CACHE_MAX", "2048"))
+
+VOTACOES = ("votacao",)
+OPCOES = ("opcoes",)
+# Candidaturas mostram o título da votação
+CANDIDATURAS = ("candidatura", "votacao")
+
+
+def _etag(corpo):
+    return '"' + hashlib.blake2b(corpo, digest_size=16).hexdigest() + '"'
+
+
+def _casa_etag(request: Request, etag):
+    cabecalho = request.headers.get("if-none-match")
+    if not cabecalho:
+        return False
+    for candidato in cabecalho.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+class CacheRespostas:
+    def __init__(self, ttl=RESPOSTAS_CACHE_TTL, tamanho_max=RESPOSTAS_CACHE_MAX, ativo=RESPOSTAS_CACHE):
+        self.ttl = ttl
+        self.tamanho_max = tamanho_max
+        self.ativo = ativo
+        self._lock = threading.Lock()
+        self._versoes = {}
+        self._entradas = OrderedDict()
+        self.acertos = 0
+        self.faltas = 0
+        self.nao_modificados = 0
+
+    def invalidar(self, *entidades):
+        with self._lock:
+            for entidade in entidades:
+                self._versoes[entidade] = self._versoes.get(entidade, 0) + 1
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self.acertos = self.faltas = self.nao_modificados = 0
+
+    def _versao(self, entidades):
+        return tuple(self._versoes.get(e, 0) for e in entidades)
+
+    def _buscar(self, chave, entidades):
+        # Devolve (entrada, versão atual); entrada None se faltou ou venceu
+        with self._lock:
+            versao = self._versao(entidades)
+            entrada = self._entradas.get(chave)
+            if entrada is not None and entrada[0] == versao and entrada[1] > time.monotonic():
+                self._entradas.move_to_end(chave)
+                self.acertos += 1
+                return entrada, versao
+            self.faltas += 1
+            return None, versao
+
+    def _serializar(self, versao, resultado, modelo):
+        corpo = para_json(resultado, modelo)
+        cursor = resultado.proximo_cursor if isinstance(resultado, Pagina) else None
+        return (versao, time.monotonic() + self.ttl, corpo, _etag(corpo), cursor)
+
+    def _guardar(self, chave, entrada):
+        with self._lock:
+            # A versão foi lida antes de consultar o banco: se houve escrita no
+            # meio, a entrada já nasce vencida e não é servida
+            self._entradas[chave] = entrada
+            self._entradas.move_to_end(chave)
+            while len(self._entradas) > self.tamanho_max:
+                self._entradas.popitem(last=False)
+        return entrada
+
+    def _resposta(self, request: Request, entrada):
+        _, _, corpo, etag, cursor = entrada
+        cabecalhos = {"ETag": etag, "Cache-Control": "no-cache"}
+        if cursor:
+            cabecalhos[CABECALHO_CURSOR] = cursor
+        if _casa_etag(request, etag):
+            self.nao_modificados += 1
+            return Response(status_code=304, headers=cabecalhos)
+        return Response(content=corpo, media_type="application/json", headers=cabecalhos)
+
+    def responder(self, request: Request, entidades, gerar, modelo=None):
+        # gerar: função sem argumentos que consulta o banco (só roda na falta);
+        # modelo: tipo da resposta, usado na serialização (app/serializacao.py)
+        if not self.ativo:
+            return self._resposta(request, self._serializar(None, gerar(), modelo))
+        chave = (request.url.path, request.url.query)
+        entrada, versao = self._buscar(chave, entidades)
+        if entrada is None:
+            entrada = self._guardar(chave, self._serializar(versao, gerar(), modelo))
+        return self._resposta(request, entrada)
+
+    async def responder_async(self, request: Request, entidades, gerar, modelo=None):
+        # gerar: função async sem argumentos, para as rotas de app/rotas_async.py
+        if not self.ativo:
+            return self._resposta(request, self._serializar(None, await gerar(), modelo))
+        chave = (request.url.path, request.url.query)
+        entrada, versao = self._buscar(chave, entidades)
+        if entrada is None:
+            entrada = self._guardar(chave, self._serializar(versao, await gerar(), modelo))
+        return self._resposta(request, entrada)
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.acertos + self.faltas
+            return {
+                "entradas": len(self._entradas),
+                "acertos": self.acertos,
+                "faltas": self.faltas,
+                "nao_modificados": self.nao_modificados,
+                "taxa_acerto": round(self.acertos / total, 4) if total else None,
+            }
+
+
+cache_respostas = CacheRespostas()
@@ -0,0 +1,179 @@
+import os
+import random
+from collections import Counter
+from sqlalchemy import func, select, insert, delete
+from sqlalchemy.orm import Session
+from app import models
+from app.database import insert_com_conflito
+
+# Contagem de votos por opção (tabela contagem_voto). crud.criar_voto e
+# crud.resetar_votacao mexem aqui na mesma transação do voto, então a tabela
+# acompanha a tabela voto sem precisar de GROUP BY no caminho de leitura.
+#
+#   python -m app.contagem verificar [--votacao ID]
+#   python -m app.contagem reconstruir [--votacao ID]
+#   python -m app.contagem dobrar [--votacao ID]
+
+# Contador fragmentado (opt-in) para votações muito disputadas: cada voto
+# soma em uma de CONTAGEM_SHARDS linhas da opção, sorteada, em vez de todos
+# os votos disputarem o lock da mesma linha. As leituras já somam as linhas;
+# "dobrar" junta tudo de volta no shard 0 (rode periodicamente, via cron, se
+# quiser manter a tabela enxuta). CONTAGEM_SHARDS_VOTACOES limita a
+# fragmentação a algumas votações (ids separados por vírgula); vazio vale
+# para todas.
+CONTAGEM_SHARDS = max(1, int(os.getenv("CONTAGEM_SHARDS", "1")))
+CONTAGEM_SHARDS_VOTACOES = {int(v) for v in os.getenv("CONTAGEM_SHARDS_VOTACOES", "").split(",") if v.strip()}
+
+
+def escolher_shard(id_votacao, shards=None):
+    shards = CONTAGEM_SHARDS if shards is None else shards
+    if shards <= 1 or (CONTAGEM_SHARDS_VOTACOES and id_votacao not in CONTAGEM_SHARDS_VOTACOES):
+        return 0
+    return random.randrange(shards)
+
+
+def stmt_incremento(db, id_votacao, id_opcao, quantidade=1, shard=None):
+    # Upsert do contador; None se o banco não tem ON CONFLICT
+    stmt = insert_com_conflito(db, models.ContagemVoto)
+    if stmt is None:
+        return None
+    shard = escolher_shard(id_votacao) if shard is None else shard
+    return stmt.values(id_votacao=id_votacao, id_opcao=id_opcao, shard=shard, total=quantidade).on_conflict_do_update(
+        index_elements=[models.ContagemVoto.id_votacao, models.ContagemVoto.id_opcao, models.ContagemVoto.shard],
+        set_={"total": models.ContagemVoto.total + quantidade},
+    )
+
+
+def incrementar(db: Session, id_votacao, id_opcao, quantidade=1, shard=None):
+    shard = escolher_shard(id_votacao) if shard is None else shard
+    stmt = stmt_incremento(db, id_votacao, id_opcao, quantidade, shard)
+    if stmt is not None:
+        db.execute(stmt)
+        return
+
+    atualizadas = db.query(models.ContagemVoto).filter(models.ContagemVoto.id_votacao == id_votacao, models.ContagemVoto.id_opcao == id_opcao, models.ContagemVoto.shard == shard).update({models.ContagemVoto.total: models.ContagemVoto.total + quantidade}, synchronize_session=False)
+    if not atualizadas:
+        db.add(models.ContagemVoto(id_votacao=id_votacao, id_opcao=id_opcao, shard=shard, total=quantidade))
+        db.flush()
+
+
+def zerar(db: Session, id_votacao):
+    return db.query(models.ContagemVoto).filter(models.ContagemVoto.id_votacao == id_votacao).delete(synchronize_session=False)
+
+
+def stmt_ler(id_votacao):
+    total = func.sum(models.ContagemVoto.total)
+    return (
+        # O título sai como "id_opcao", o nome que a rota de resultados usa
+        select(models.Opcoes.titulo.label("id_opcao"), total.label("total_votos"))
+        .join(models.ContagemVoto, models.ContagemVoto.id_opcao == models.Opcoes.id_opcao)
+        .where(models.ContagemVoto.id_votacao == id_votacao)
+        .group_by(models.Opcoes.titulo)
+        .having(total > 0)
+    )
+
+
+def ler(db: Session, id_votacao):
+    return db.execute(stmt_ler(id_votacao)).all()
+
+
+def totais_por_opcao(db: Session, id_votacao):
+    stmt = select(models.ContagemVoto.id_opcao, func.sum(models.ContagemVoto.total)).where(models.ContagemVoto.id_votacao == id_votacao).group_by(models.ContagemVoto.id_opcao)
+    return {id_opcao: int(total) for id_opcao, total in db.execute(stmt)}
+
+
+def _contagem_real(id_votacao=None):
+    stmt = select(models.Voto.id_votacao, models.Voto.id_opcao, func.count(models.Voto.id_voto).label("total")).group_by(models.Voto.id_votacao, models.Voto.id_opcao)
+    if id_votacao is not None:
+        stmt = stmt.where(models.Voto.id_votacao == id_votacao)
+    return stmt
+
+
+def reconstruir(db: Session, id_votacao=None):
+    apagar = db.query(models.ContagemVoto)
+    if id_votacao is not None:
+        apagar = apagar.filter(models.ContagemVoto.id_votacao == id_votacao)
+    apagar.delete(synchronize_session=False)
+
+    origem = _contagem_real(id_votacao).where(models.Voto.id_opcao.is_not(None))
+    db.execute(insert(models.ContagemVoto).from_select(["id_votacao", "id_opcao", "total"], origem))
+    db.commit()
+
+
+def verificar(db: Session, id_votacao=None):
+    # Retorna as divergências como (id_votacao, id_opcao, total_em_voto, total_em_contagem)
+    real = {(v, o): t for v, o, t in db.execute(_contagem_real(id_votacao)) if o is not None}
+
+    stmt = select(models.ContagemVoto.id_votacao, models.ContagemVoto.id_opcao, func.sum(models.ContagemVoto.total)).group_by(models.ContagemVoto.id_votacao, models.ContagemVoto.id_opcao)
+    if id_votacao is not None:
+        stmt = stmt.where(models.ContagemVoto.id_votacao == id_votacao)
+    mantida = {(v, o): t for v, o, t in db.execute(stmt)}
+
+    divergencias = []
+    for chave in sorted(set(real) | set(mantida), key=lambda c: (c[0] or 0, c[1] or 0)):
+        esperado, atual = real.get(chave, 0), mantida.get(chave, 0)
+        if esperado != atual:
+            divergencias.append((chave[0], chave[1], esperado, atual))
+    return divergencias
+
+
+def dobrar(db: Session, id_votacao=None):
+    # Move os shards > 0 para o shard 0. O DELETE ... RETURNING devolve
+    # exatamente o que saiu, então um voto que chegue no meio não se perde:
+    # ou já estava na linha apagada, ou recria a linha depois. Retorna
+    # quantas linhas foram juntadas.
+    apagar = delete(models.ContagemVoto).where(models.ContagemVoto.shard > 0)
+    if id_votacao is not None:
+        apagar = apagar.where(models.ContagemVoto.id_votacao == id_votacao)
+    colunas = (models.ContagemVoto.id_votacao, models.ContagemVoto.id_opcao, models.ContagemVoto.total)
+    if db.get_bind().dialect.delete_returning:
+        linhas = db.execute(apagar.returning(*colunas)).all()
+    else:
+        # Sem RETURNING: cada linha lida só sai se o total ainda for o lido.
+        # Se um voto somou nela entre a leitura e o DELETE, ela fica para a
+        # próxima dobra em vez de sumir com o voto
+        linhas = []
+        lidas = db.execute(select(models.ContagemVoto.shard, *colunas).where(apagar.whereclause)).all()
+        for shard, id_v, id_o, total in lidas:
+            apagadas = db.execute(delete(models.ContagemVoto).where(
+                models.ContagemVoto.id_votacao == id_v,
+                models.ContagemVoto.id_opcao == id_o,
+                models.ContagemVoto.shard == shard,
+                models.ContagemVoto.total == total,
+            )).rowcount
+            if apagadas:
+                linhas.append((id_v, id_o, total))
+
+    somas = Counter()
+    for id_v, id_o, total in linhas:
+        somas[(id_v, id_o)] += total
+    for (id_v, id_o), total in somas.items():
+        incrementar(db, id_v, id_o, total, shard=0)
+    db.commit()
+    return len(linhas)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(prog="python -m app.contagem")
+    parser.add_argument("comando", choices=["verificar", "reconstruir", "dobrar"])
+    parser.add_argument("--votacao", type=int, default=None)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.comando == "reconstruir":
+            reconstruir(db, args.votacao)
+            print("Contagens reconstruídas")
+        elif args.comando == "dobrar":
+            print(f"{dobrar(db, args.votacao)} linha(s) de shard juntadas no shard 0")
+        divergencias = verificar(db, args.votacao)
+        for id_votacao, id_opcao, esperado, atual in divergencias:
+            print(f"votacao={id_votacao} opcao={id_opcao} voto={esperado} contagem={atual}")
+        print(f"{len(divergencias)} divergência(s)")
+        sys.exit(1 if divergencias else 0)
+    finally:
+        db.close()
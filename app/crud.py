@@ -1,35 +1,71 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, and_, or_, select, delete, insert, update
 from sqlalchemy.exc import IntegrityError
-from app import models, schemas
+from app import models, schemas, contagem, busca
+from app.identidade import normalizar_email, normalizar_cpf, parece_email
+from app.database import insert_com_conflito
+from app.paginacao import paginar, montar_pagina
+from app.tempo_real import hub
+from app.cache_respostas import cache_respostas
+from app import metricas
 from fastapi import HTTPException, status
-from app.security import hash_password, verify_password
+from app.security import hash_password, hash_password_async, verify_password_async, precisa_rehash
+from fastapi.concurrency import run_in_threadpool
 from datetime import datetime
+import time
 from app.token import criar_token_acesso
+from app.auth import invalidar_principal
 
 
 
 def atualizar_status_votacoes_expiradas(db):
+    # Chamado pelo agendador (app/agendador.py), nunca pelas rotas de leitura
     agora = datetime.utcnow()
-    try:
-        votacoes = db.query(models.Votacao).filter(models.Votacao.status == "aberta", models.Votacao.data_fim < agora).all()
+    fechadas = db.query(models.Votacao).filter(models.Votacao.status == "aberta", models.Votacao.data_fim < agora).update({models.Votacao.status: "fechada"}, synchronize_session=False)
+    db.commit()
+    return fechadas
 
-        for votacao in votacoes:
-            votacao.status = "fechada"
-        db.commit()
-    except:
-        print("Nenhum registro atualizado")
+def proximo_vencimento(db):
+    return db.query(func.min(models.Votacao.data_fim)).filter(models.Votacao.status == "aberta").scalar()
+
+
+# Status calculado na própria consulta: uma votação "aberta" com data_fim vencida
+# já é lida como "fechada", mesmo antes do agendador gravar a mudança.
+def status_efetivo(agora):
+    return case((and_(models.Votacao.status == "aberta", models.Votacao.data_fim < agora), "fechada"), else_=models.Votacao.status)
+
+def filtro_abertas(agora):
+    return and_(models.Votacao.status == "aberta", or_(models.Votacao.data_fim.is_(None), models.Votacao.data_fim >= agora))
+
+def filtro_fechadas(agora):
+    return or_(models.Votacao.status == "fechada", and_(models.Votacao.status == "aberta", models.Votacao.data_fim < agora))
+
+def colunas_votacao(agora):
+    # Colunas da votação com o status efetivo no lugar do gravado: as linhas
+    # vão direto para schemas.VotacaoRead, sem montar objetos do ORM
+    return [status_efetivo(agora).label("status") if c.key == "status" else c for c in models.Votacao.__table__.c]
+
+def _query_votacoes(db: Session, agora):
+    return db.query(*colunas_votacao(agora))
+
+def _pagina_votacoes(query, limit, offset, cursor):
+    query = paginar(query, [models.Votacao.id_votacao], limit, cursor, offset)
+    return montar_pagina(query.all(), limit, lambda v: [v.id_votacao])
 
 
 def create_user_with_login(db: Session, user_data: schemas.UserCreate, senha: str):
-    # Verifica se o e-mail já existe
-    existing_user = db.query(models.User).filter(models.User.email == user_data.email).first()
+    # Verifica e-mail e CPF numa consulta só, pelos índices normalizados
+    email, cpf = normalizar_email(user_data.email), normalizar_cpf(user_data.cpf)
+    existing_user = db.query(models.EMAIL_NORMALIZADO).filter(or_(models.EMAIL_NORMALIZADO == email, models.CPF_NORMALIZADO == cpf)).first()
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="E-mail já está em uso."
+            detail="E-mail já está em uso." if existing_user[0] == email else "CPF já está em uso."
         )
 
+    # Hash antes de abrir a escrita: a transação não fica aberta esperando o bcrypt
+    senha_hash = hash_password(senha)
+
     try:
         # Cria usuário
         new_user = models.User(nome_completo=user_data.nome_completo,cpf=user_data.cpf,email=user_data.email,user_type=user_data.user_type)
@@ -37,13 +73,20 @@ def create_user_with_login(db: Session, user_data: schemas.UserCreate, senha: st
         db.flush()  # Garante que o id_user está disponível (sem commit)
 
         # Cria login com o id do usuário recém-criado
-        login = models.Login(id_user=new_user.id_user, senha=hash_password(senha))
+        login = models.Login(id_user=new_user.id_user, senha=senha_hash)
         db.add(login)
 
         db.commit()
         db.refresh(new_user)
         return new_user
 
+    except IntegrityError:
+        # Outro cadastro com o mesmo e-mail/CPF entrou entre a checagem e o commit
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="E-mail ou CPF já está em uso."
+        )
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -51,8 +94,9 @@ def create_user_with_login(db: Session, user_data: schemas.UserCreate, senha: st
             detail=f"Erro ao criar usuário: {str(e)}"
         )
 
-def get_users(db: Session, limit=10, offset=0):
-    return db.query(models.User).limit(limit).offset(offset).all()
+def get_users(db: Session, limit=10, offset=0, cursor=None):
+    query = paginar(db.query(models.User), [models.User.id_user], limit, cursor, offset)
+    return montar_pagina(query.all(), limit, lambda u: [u.id_user])
 
 def get_user_id(db: Session, id):
     return db.query(models.User).filter(id == models.User.id_user).first()
@@ -63,71 +107,127 @@ def get_user_id(db: Session, id):
 
 
 
-def get_all_votacao(db: Session, limit=10, offset=0):
-    atualizar_status_votacoes_expiradas(db)
-    return db.query(models.Votacao).limit(limit).offset(offset).all()
+def get_all_votacao(db: Session, limit=10, offset=0, cursor=None):
+    agora = datetime.utcnow()
+    return _pagina_votacoes(_query_votacoes(db, agora), limit, offset, cursor)
 
-def get_votacoes_abertas(db: Session, limit=10, offset=0):
-    atualizar_status_votacoes_expiradas(db)
-    return db.query(models.Votacao).filter(models.Votacao.status == "aberta").limit(limit).offset(offset).all()
+def get_votacoes_abertas(db: Session, limit=10, offset=0, cursor=None):
+    agora = datetime.utcnow()
+    return _pagina_votacoes(_query_votacoes(db, agora).filter(filtro_abertas(agora)), limit, offset, cursor)
 
-def get_votacoes_fechadas(db: Session, limit=10, offset=0):
-    atualizar_status_votacoes_expiradas(db)
-    return db.query(models.Votacao).filter(models.Votacao.status == "fechada").limit(limit).offset(offset).all()
+def get_votacoes_fechadas(db: Session, limit=10, offset=0, cursor=None):
+    agora = datetime.utcnow()
+    return _pagina_votacoes(_query_votacoes(db, agora).filter(filtro_fechadas(agora)), limit, offset, cursor)
 
 def get_votacao_id(db: Session, id):
-    atualizar_status_votacoes_expiradas(db)
-    return db.query(models.Votacao).filter(models.Votacao.id_votacao == id).first()
+    agora = datetime.utcnow()
+    return _query_votacoes(db, agora).filter(models.Votacao.id_votacao == id).first()
 
-def get_votacao_categoria(db: Session, id_category, limit=10, offset=0 ):
-    atualizar_status_votacoes_expiradas(db)
-    return db.query(models.Votacao).filter(models.Votacao.id_categoria == id_category).limit(limit).offset(offset).all()
+def filtro_categoria(id_categoria):
+    return models.Votacao.id_categoria == id_categoria
 
-def get_votacao_nome(db: Session, nome, limit=10, offset=0):
-    atualizar_status_votacoes_expiradas(db)
-    return db.query(models.Votacao).filter(nome in models.Votacao.titulo).limit(limit).offset(offset).all()
+def get_votacao_categoria(db: Session, id_category, limit=10, offset=0, cursor=None):
+    agora = datetime.utcnow()
+    return _pagina_votacoes(_query_votacoes(db, agora).filter(filtro_categoria(id_category)), limit, offset, cursor)
 
+def buscar_votacoes(db: Session, consulta, id_categoria=None, limit=10, offset=0, cursor=None):
+    # Por relevância em título e descrição, pelo índice de busca (app/busca.py)
+    palavras = busca.termos(consulta)
+    if not palavras:
+        raise HTTPException(status_code=400, detail="Informe ao menos uma palavra para buscar")
+    filtros = [filtro_categoria(id_categoria)] if id_categoria is not None else []
+    stmt, ordem, chave = busca.stmt_busca(db, palavras, colunas_votacao(datetime.utcnow()), filtros)
+    stmt = paginar(stmt, ordem, limit, cursor, offset)
+    return montar_pagina(db.execute(stmt).all(), limit, chave)
 
+def get_votacao_nome(db: Session, nome, limit=10, offset=0, cursor=None):
+    return buscar_votacoes(db, nome, None, limit, offset, cursor)
 
 
-def get_opcoes(db: Session):
-    opcoes = db.query(models.Opcoes).all()
+def get_opcoes(db: Session, limit=10, offset=0, cursor=None):
+    query = paginar(db.query(*models.Opcoes.__table__.c), [models.Opcoes.id_opcao], limit, cursor, offset)
+    opcoes = montar_pagina(query.all(), limit, lambda o: [o.id_opcao])
     if opcoes:
         return opcoes
     else:
         return {"msg": "Votação e/ou opções não encontradas"}
 
-def get_opcoes_id(db: Session, id_votacao):
-    opcoes = db.query(models.Opcoes).filter(id_votacao == models.Opcoes.id_votacao).all()
+def get_opcoes_id(db: Session, id_votacao, limit=None, cursor=None):
+    # Sem limite por padrão: as opções de uma votação são poucas e a tela usa todas
+    query = paginar(db.query(*models.Opcoes.__table__.c).filter(id_votacao == models.Opcoes.id_votacao), [models.Opcoes.id_opcao], limit, cursor)
+    opcoes = montar_pagina(query.all(), limit, lambda o: [o.id_opcao])
     if opcoes:
         return opcoes
     else:
         return {"msg": "Votação e/ou opções não encontradas"}
 
 def get_votos_votacao(db: Session, id_votacao):
-    votos = db.query(models.Opcoes.titulo, func.count(models.Voto.id_voto).label("total_votos")).join(models.Voto, models.Voto.id_opcao == models.Opcoes.id_opcao).filter(models.Voto.id_votacao == id_votacao).group_by(models.Opcoes.titulo).all()
+    votos = contagem.ler(db, id_votacao)
     if votos:
         return votos
     else:
         return {"msg": "Votação e/ou opções não encontradas"}
 
+def get_painel(db: Session, limit=10, offset=0, cursor=None, id_categoria=None):
+    # Página de votações com número de opções, total de votos e candidaturas
+    # pendentes em um comando só: a página vira uma CTE e cada agregado é um
+    # GROUP BY restrito aos ids dela, ligado por LEFT JOIN
+    agora = datetime.utcnow()
+    stmt = select(*colunas_votacao(agora))
+    if id_categoria is not None:
+        stmt = stmt.where(filtro_categoria(id_categoria))
+    pagina = paginar(stmt, [models.Votacao.id_votacao], limit, cursor, offset).cte("pagina")
+    ids = select(pagina.c.id_votacao)
+
+    def agregado(modelo, valor, *filtros):
+        return (
+            select(modelo.id_votacao, valor.label("n"))
+            .where(modelo.id_votacao.in_(ids), *filtros)
+            .group_by(modelo.id_votacao)
+            .subquery()
+        )
+
+    opcoes = agregado(models.Opcoes, func.count())
+    votos = agregado(models.ContagemVoto, func.sum(models.ContagemVoto.total))
+    pendentes = agregado(models.Candidatura, func.count(), models.Candidatura.status == "pendente")
+    stmt = (
+        select(
+            pagina,
+            func.coalesce(opcoes.c.n, 0).label("opcoes"),
+            func.coalesce(votos.c.n, 0).label("total_votos"),
+            func.coalesce(pendentes.c.n, 0).label("candidaturas_pendentes"),
+        )
+        .outerjoin(opcoes, opcoes.c.id_votacao == pagina.c.id_votacao)
+        .outerjoin(votos, votos.c.id_votacao == pagina.c.id_votacao)
+        .outerjoin(pendentes, pendentes.c.id_votacao == pagina.c.id_votacao)
+        .order_by(pagina.c.id_votacao)
+    )
+    return montar_pagina(db.execute(stmt).all(), limit, lambda v: [v.id_votacao])
 
 
 
 
 
 
-def get_candidaturas(db: Session, limit=10, offset=0):
-        return (db.query(models.Candidatura.id_candidatura,models.Candidatura.id_votacao, models.Candidatura.id_user, models.Candidatura.detalhes, models.User.nome_completo, models.Votacao.titulo,).join(models.User, models.Candidatura.id_user == models.User.id_user).join(models.Votacao, models.Candidatura.id_votacao == models.Votacao.id_votacao).all())
 
-def get_candidaturas_pendentes(db: Session, limit=10, offset=0):
-        return (db.query(models.Candidatura.id_candidatura,models.Candidatura.id_votacao, models.Candidatura.id_user, models.Candidatura.detalhes, models.User.nome_completo, models.Votacao.titulo,).join(models.User, models.Candidatura.id_user == models.User.id_user).join(models.Votacao, models.Candidatura.id_votacao == models.Votacao.id_votacao).filter(models.Candidatura.status == "pendente").limit(limit).offset(offset).all())
+def _query_candidaturas(db: Session):
+    return db.query(models.Candidatura.id_candidatura,models.Candidatura.id_votacao, models.Candidatura.id_user, models.Candidatura.detalhes, models.User.nome_completo, models.Votacao.titulo,).join(models.User, models.Candidatura.id_user == models.User.id_user).join(models.Votacao, models.Candidatura.id_votacao == models.Votacao.id_votacao)
 
-def get_candidaturas_aprovadas(db: Session, limit=10, offset=0):
-    return (db.query(models.Candidatura.id_candidatura,models.Candidatura.id_votacao, models.Candidatura.id_user, models.Candidatura.detalhes, models.User.nome_completo, models.Votacao.titulo,).join(models.User, models.Candidatura.id_user == models.User.id_user).join(models.Votacao, models.Candidatura.id_votacao == models.Votacao.id_votacao).filter(models.Candidatura.status == "aprovada").limit(limit).offset(offset).all())
+def _pagina_candidaturas(query, limit, offset, cursor):
+    query = paginar(query, [models.Candidatura.id_candidatura], limit, cursor, offset)
+    return montar_pagina(query.all(), limit, lambda c: [c.id_candidatura])
 
-def get_candidaturas_recusadas(db: Session, limit=10, offset=0):
-    return (db.query(models.Candidatura.id_candidatura,models.Candidatura.id_votacao, models.Candidatura.id_user, models.Candidatura.detalhes, models.User.nome_completo, models.Votacao.titulo,).join(models.User, models.Candidatura.id_user == models.User.id_user).join(models.Votacao, models.Candidatura.id_votacao == models.Votacao.id_votacao).filter(models.Candidatura.status == "recusada").limit(limit).offset(offset).all())
+def get_candidaturas(db: Session, limit=10, offset=0, cursor=None):
+    return _pagina_candidaturas(_query_candidaturas(db), limit, offset, cursor)
+
+def get_candidaturas_pendentes(db: Session, limit=10, offset=0, cursor=None):
+    return _pagina_candidaturas(_query_candidaturas(db).filter(models.Candidatura.status == "pendente"), limit, offset, cursor)
+
+def get_candidaturas_aprovadas(db: Session, limit=10, offset=0, cursor=None):
+    return _pagina_candidaturas(_query_candidaturas(db).filter(models.Candidatura.status == "aprovada"), limit, offset, cursor)
+
+def get_candidaturas_recusadas(db: Session, limit=10, offset=0, cursor=None):
+    return _pagina_candidaturas(_query_candidaturas(db).filter(models.Candidatura.status == "recusada"), limit, offset, cursor)
 
 
 
@@ -138,17 +238,18 @@ def atualizar_votacao(db: Session, id: int, dados: schemas.VotacaoUpdate):
     for key, value in dados.model_dump(exclude_unset=True).items():
         setattr(votacao, key, value)
     db.commit()
+    cache_respostas.invalidar("votacao")
     db.refresh(votacao)
     return votacao
 
 def atualizar_login(db: Session, id_user: int, dados: schemas.LoginUpdate):
     login = db.query(models.Login).filter(models.Login.id_user == id_user).first()
     if dados.senha:
-        hashed = login.senha = hash_password(login.senha)
-        dados.senha = hashed
+        dados.senha = hash_password(dados.senha)
     for key, value in dados.model_dump(exclude_unset=True).items():
         setattr(login, key, value)
     db.commit()
+    invalidar_principal(id_user)
     db.refresh(login)
     return login
 
@@ -158,11 +259,13 @@ def atualizar_login(db: Session, id_user: int, dados: schemas.LoginUpdate):
 
 def atualizar_candidatura(db: Session, id: int, dados: schemas.CandidaturaUpdate):
     candidatura = db.query(models.Candidatura).filter(models.Candidatura.id_candidatura == id).first()
+    ja_aprovada = (candidatura.status or "").lower() == "aprovada"
     for key, value in dados.model_dump(exclude_unset=True).items():
         setattr(candidatura, key, value)
 
     # Se o status foi alterado para "aprovada", cria automaticamente uma opção
-    if dados.status and dados.status.lower() == "aprovada":
+    # (aprovar de novo uma candidatura já aprovada não duplica a opção)
+    if dados.status and dados.status.lower() == "aprovada" and not ja_aprovada:
         candidato = db.query(models.User).filter(models.User.id_user == candidatura.id_user).first()
         nova_opcao = models.Opcoes(
             id_votacao=candidatura.id_votacao,
@@ -176,15 +279,81 @@ def atualizar_candidatura(db: Session, id: int, dados: schemas.CandidaturaUpdate
     #     titulo, detalhes, id_votacao = (candidato.nome_completo, candidatura.detalhes, candidatura.id_votacao)
 
     db.commit()
+    cache_respostas.invalidar("candidatura", "opcoes")
     db.refresh(candidatura)
     return candidatura
 
 
+# Moderação em massa (POST /admin/candidaturas/moderar/): em vez de um
+# atualizar_candidatura por item, cada lote de LOTE_MODERACAO ids faz um
+# SELECT ... FOR UPDATE com o status atual, um INSERT ... SELECT (junto com
+# user) das opções das que passam a aprovadas e um UPDATE por status; um
+# commit só no fim. Candidatura que já está no status pedido não muda nem
+# ganha opção nova, então repetir a chamada não duplica opções. O lock das
+# linhas faz duas moderações simultâneas das mesmas candidaturas se
+# enfileirarem no Postgres (no SQLite a escrita já é serializada).
+# Aprovação de candidatura cujo usuário não existe mais fica de fora (não há
+# nome para a opção) e volta em sem_candidato.
+LOTE_MODERACAO = 5000
+
+def moderar_candidaturas(db: Session, itens, lote=LOTE_MODERACAO):
+    # itens: [(id_candidatura, status)]; o último status de um id repetido vale
+    pedidos = dict(itens)
+    ids = list(pedidos)
+    atualizadas = inalteradas = opcoes_criadas = 0
+    nao_encontradas, sem_candidato = [], []
+    try:
+        for inicio in range(0, len(ids), lote):
+            parte = ids[inicio:inicio + lote]
+            atuais = {
+                linha.id_candidatura: linha for linha in db.execute(
+                    select(models.Candidatura.id_candidatura, models.Candidatura.status, models.User.id_user)
+                    .outerjoin(models.User, models.Candidatura.id_user == models.User.id_user)
+                    .where(models.Candidatura.id_candidatura.in_(parte))
+                    .with_for_update(of=models.Candidatura)
+                )
+            }
+            nao_encontradas.extend(i for i in parte if i not in atuais)
+            mudancas = {}
+            for id_candidatura, atual in atuais.items():
+                if (atual.status or "").lower() == pedidos[id_candidatura]:
+                    inalteradas += 1
+                elif pedidos[id_candidatura] == "aprovada" and atual.id_user is None:
+                    sem_candidato.append(id_candidatura)
+                else:
+                    mudancas.setdefault(pedidos[id_candidatura], []).append(id_candidatura)
+            if mudancas.get("aprovada"):
+                # Mesma opção que atualizar_candidatura cria: nome do candidato e detalhes
+                opcoes = (
+                    select(models.User.nome_completo, models.Candidatura.detalhes, models.Candidatura.id_votacao)
+                    .join(models.User, models.Candidatura.id_user == models.User.id_user)
+                    .where(models.Candidatura.id_candidatura.in_(mudancas["aprovada"]))
+                    .order_by(models.Candidatura.id_candidatura)
+                )
+                opcoes_criadas += db.execute(insert(models.Opcoes).from_select(["titulo", "detalhes", "id_votacao"], opcoes)).rowcount
+            for status_novo, alterar in mudancas.items():
+                atualizadas += db.execute(
+                    update(models.Candidatura).where(models.Candidatura.id_candidatura.in_(alterar)).values(status=status_novo),
+                    execution_options={"synchronize_session": False},
+                ).rowcount
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    if atualizadas:
+        cache_respostas.invalidar("candidatura", "opcoes")
+    return {
+        "atualizadas": atualizadas, "inalteradas": inalteradas, "opcoes_criadas": opcoes_criadas,
+        "nao_encontradas": nao_encontradas, "sem_candidato": sem_candidato,
+    }
+
+
 def atualizar_opcao(db: Session, id: int, dados: schemas.OpcaoUpdate):
     opcao = db.query(models.Opcoes).filter(models.Opcoes.id_opcao == id).first()
     for key, value in dados.model_dump(exclude_unset=True).items():
         setattr(opcao, key, value)
     db.commit()
+    cache_respostas.invalidar("opcoes")
     db.refresh(opcao)
     return opcao
 
@@ -195,6 +364,7 @@ def criar_votacao(db: Session, votacao: schemas.VotacaoCreate):
     nova = models.Votacao(**votacao.model_dump())
     db.add(nova)
     db.commit()
+    cache_respostas.invalidar("votacao")
     db.refresh(nova)
     return nova
 
@@ -202,6 +372,7 @@ def criar_candidatura(db: Session, candidatura: schemas.CandidaturaCreate):
     nova = models.Candidatura(**candidatura.model_dump())
     db.add(nova)
     db.commit()
+    cache_respostas.invalidar("candidatura")
     db.refresh(nova)
     return nova
 
@@ -209,23 +380,37 @@ def criar_opcao(db: Session, opcao: schemas.OpcaoCreate):
     nova = models.Opcoes(**opcao.model_dump())
     db.add(nova)
     db.commit()
+    cache_respostas.invalidar("opcoes")
     db.refresh(nova)
     return nova
 
+MSG_VOTO_DUPLICADO = {"msg": "Você já votou nessa votação; Apenas um voto por votação"}
+
 def criar_voto(db: Session, voto: schemas.VotoCreate):
-    novo = models.Voto(**voto.model_dump())
-    print(f"\n\n\n\n\n{novo}\n\n\n\n\n")
-    try:
-        id_user = novo.id_user
-        id_votacao = novo.id_votacao
-        q = db.query(models.Voto).filter((models.Voto.id_user == id_user) & (models.Voto.id_votacao == id_votacao)).first()
-        if q:
-            msg = {"msg": "Você já votou nessa votação; Apenas um voto por votação"}
-            return msg
-    except Exception as e:
-        return {"msg": "Erro ao registrar votação"}
-    db.add(novo)
+    dados = voto.model_dump()
+    # O índice único uq_voto_user_votacao decide o duplicado: sem SELECT antes
+    # do INSERT e sem corrida entre requisições simultâneas
+    stmt = insert_com_conflito(db, models.Voto)
+    if stmt is not None:
+        stmt = stmt.values(**dados).on_conflict_do_nothing(index_elements=["id_user", "id_votacao"]).returning(models.Voto)
+        novo = db.scalars(stmt).first()
+        if novo is None:
+            db.rollback()
+            metricas.votos_duplicados.inc()
+            return MSG_VOTO_DUPLICADO
+    else:
+        novo = models.Voto(**dados)
+        db.add(novo)
+        try:
+            db.flush()
+        except IntegrityError:
+            db.rollback()
+            metricas.votos_duplicados.inc()
+            return MSG_VOTO_DUPLICADO
+    contagem.incrementar(db, novo.id_votacao, novo.id_opcao)
     db.commit()
+    metricas.votos_aceitos.inc()
+    hub.publicar(novo.id_votacao, novo.id_opcao)
     db.refresh(novo)
     return novo
 
@@ -233,10 +418,80 @@ def criar_voto(db: Session, voto: schemas.VotoCreate):
 
 
 
-def resetar_votacao(db:Session, id_votacao):
-    result = db.query(models.Voto).filter(id_votacao == models.Voto.id_votacao).delete()
+# Remoção em lotes: DELETE ... WHERE pk IN (SELECT pk ... LIMIT lote) com um
+# commit por lote, para não segurar lock nem inflar a transação numa votação
+# com milhões de votos. Rodam em segundo plano (app/tarefas.py);
+# progresso(tabela, linhas, segundos) é chamado depois de cada commit.
+LOTE_REMOCAO = 5000
+
+
+def _sem_progresso(tabela, linhas, segundos):
+    pass
+
+
+def _apagar_em_lotes(db: Session, modelo, filtro, lote, progresso, ultimo=None, antes=None):
+    # O último lote (o que vem incompleto) é confirmado junto com ultimo(db).
+    # Com antes, as linhas do lote são lidas com FOR UPDATE e antes(db) roda
+    # na mesma transação, antes do DELETE
+    pk = modelo.__mapper__.primary_key[0]
+    total = 0
+    while True:
+        inicio = time.perf_counter()
+        ids = select(pk).where(filtro).limit(lote)
+        if antes is not None:
+            ids = db.scalars(ids.with_for_update()).all()
+            antes(db)
+        linhas = db.execute(delete(modelo).where(pk.in_(ids)), execution_options={"synchronize_session": False}).rowcount
+        total += linhas
+        final = linhas < lote
+        if final and ultimo is not None:
+            ultimo(db)
+        db.commit()
+        progresso(modelo.__tablename__, linhas, time.perf_counter() - inicio)
+        if final:
+            return total
+
+
+def resetar_votacao(db: Session, id_votacao, lote=LOTE_REMOCAO, progresso=_sem_progresso):
+    # A contagem é zerada na mesma transação do último lote de votos
+    total = _apagar_em_lotes(db, models.Voto, models.Voto.id_votacao == id_votacao, lote, progresso, ultimo=lambda db: contagem.zerar(db, id_votacao))
+    hub.publicar_reset(id_votacao)
+    return total
+
+
+def excluir_votacao(db: Session, id_votacao, lote=LOTE_REMOCAO, progresso=_sem_progresso):
+    # Filhos antes do pai, sempre por comandos de conjunto (nada é carregado no
+    # ORM). O voto não olha o status da votação, então pode chegar voto (e
+    # candidatura aprovada, com opção nova) durante as fases; com chave
+    # estrangeira valendo, qualquer um deles quebraria o DELETE das opções ou
+    # da votação. Por isso:
+    #   - a votação é fechada antes de tudo, saindo das listagens de abertas;
+    #   - cada lote de opções é travado (FOR UPDATE) e leva junto os votos e
+    #     a contagem que chegaram depois da fase de votos; um voto novo numa
+    #     opção travada espera o commit e falha na chave, sem quebrar o lote;
+    #   - a última transação trava a linha da votação e apaga o que sobrou
+    #     de todos os filhos antes dela.
+    def sobras_de_voto(db):
+        db.execute(delete(models.Voto).where(models.Voto.id_votacao == id_votacao))
+        contagem.zerar(db, id_votacao)
+
+    def remover_votacao(db):
+        db.execute(select(models.Votacao.id_votacao).where(models.Votacao.id_votacao == id_votacao).with_for_update())
+        sobras_de_voto(db)
+        db.execute(delete(models.Candidatura).where(models.Candidatura.id_votacao == id_votacao))
+        db.execute(delete(models.Opcoes).where(models.Opcoes.id_votacao == id_votacao))
+        db.execute(delete(models.Votacao).where(models.Votacao.id_votacao == id_votacao))
+
+    db.execute(update(models.Votacao).where(models.Votacao.id_votacao == id_votacao).values(status="fechada"))
     db.commit()
-    return result
+    removidos = {
+        "voto": _apagar_em_lotes(db, models.Voto, models.Voto.id_votacao == id_votacao, lote, progresso, ultimo=lambda db: contagem.zerar(db, id_votacao)),
+        "candidatura": _apagar_em_lotes(db, models.Candidatura, models.Candidatura.id_votacao == id_votacao, lote, progresso),
+        "opcoes": _apagar_em_lotes(db, models.Opcoes, models.Opcoes.id_votacao == id_votacao, lote, progresso, ultimo=remover_votacao, antes=sobras_de_voto),
+    }
+    cache_respostas.invalidar("votacao", "opcoes", "candidatura")
+    hub.publicar_reset(id_votacao)
+    return removidos
 
 
 
@@ -247,22 +502,43 @@ def resetar_votacao(db:Session, id_votacao):
 
 
 
-def login_user(db: Session, username: str, senha: str):
+def _buscar_login(db: Session, username: str):
+    # Uma consulta só, pelo índice de e-mail ou de CPF conforme o identificador
+    if parece_email(username):
+        filtro = models.EMAIL_NORMALIZADO == normalizar_email(username)
+    else:
+        filtro = models.CPF_NORMALIZADO == normalizar_cpf(username)
     result = (
-        db.query(models.User, models.Login).join(models.Login, models.Login.id_user == models.User.id_user).filter(models.User.email == username).first()
+        db.query(models.User, models.Login).join(models.Login, models.Login.id_user == models.User.id_user).filter(filtro).first()
     )
+    # Devolve a conexão ao pool antes do bcrypt; os objetos continuam
+    # carregados (desanexados) e a sessão pode ser usada de novo depois
+    db.close()
+    return result
+
+def _salvar_novo_hash(db: Session, id_login, novo_hash: str):
+    db.query(models.Login).filter(models.Login.id_login == id_login).update({models.Login.senha: novo_hash}, synchronize_session=False)
+    db.commit()
 
+async def login_user(db: Session, username: str, senha: str):
+    # Consultas no threadpool, bcrypt no pool de processos: nenhuma das duas
+    # coisas segura o event loop nem uma thread de requisição durante o hash
+    result = await run_in_threadpool(_buscar_login, db, username)
     if not result:
-        result = (
-            db.query(models.User, models.Login).join(models.Login, models.Login.id_user == models.User.id_user).filter(models.User.cpf == username).first()
-        )
-        if not result:
-            raise HTTPException(status_code=404, detail="Usuário não encontrado")
+        metricas.logins.inc("usuario_inexistente")
+        raise HTTPException(status_code=404, detail="Usuário não encontrado")
 
     user, login = result
 
-    if not verify_password(senha, login.senha):
+    if not await verify_password_async(senha, login.senha):
+        metricas.logins.inc("senha_incorreta")
         raise HTTPException(status_code=401, detail="Senha incorreta")
+    metricas.logins.inc("sucesso")
+
+    # Hash gerado com outro BCRYPT_ROUNDS: aproveita a senha em claro para refazer
+    if precisa_rehash(login.senha):
+        novo_hash = await hash_password_async(senha)
+        await run_in_threadpool(_salvar_novo_hash, db, login.id_login, novo_hash)
 
     token = criar_token_acesso({"id": str(user.id_user), "email": user.email, "user_type": user.user_type, "nome_completo": user.nome_completo})
     #return user
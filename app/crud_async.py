@@ -0,0 +1,104 @@
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from app import models, schemas, contagem
+from app.crud import colunas_votacao, filtro_abertas, filtro_fechadas, MSG_VOTO_DUPLICADO
+from app.database import insert_com_conflito
+from app.paginacao import paginar, montar_pagina
+from app.tempo_real import hub
+from app import metricas
+
+# Variantes com AsyncSession das funções de app/crud.py usadas pelas rotas
+# de app/rotas_async.py (DB_ASYNC=1). Mesmas consultas, mesmas respostas.
+
+
+def _select_votacoes(agora):
+    return select(*colunas_votacao(agora))
+
+async def _votacoes(db: AsyncSession, stmt):
+    return (await db.execute(stmt)).all()
+
+async def _pagina_votacoes(db: AsyncSession, stmt, limit, offset, cursor):
+    stmt = paginar(stmt, [models.Votacao.id_votacao], limit, cursor, offset)
+    return montar_pagina(await _votacoes(db, stmt), limit, lambda v: [v.id_votacao])
+
+
+
+
+async def get_all_votacao(db: AsyncSession, limit=10, offset=0, cursor=None):
+    agora = datetime.utcnow()
+    return await _pagina_votacoes(db, _select_votacoes(agora), limit, offset, cursor)
+
+async def get_votacoes_abertas(db: AsyncSession, limit=10, offset=0, cursor=None):
+    agora = datetime.utcnow()
+    return await _pagina_votacoes(db, _select_votacoes(agora).where(filtro_abertas(agora)), limit, offset, cursor)
+
+async def get_votacoes_fechadas(db: AsyncSession, limit=10, offset=0, cursor=None):
+    agora = datetime.utcnow()
+    return await _pagina_votacoes(db, _select_votacoes(agora).where(filtro_fechadas(agora)), limit, offset, cursor)
+
+async def get_votacao_id(db: AsyncSession, id):
+    agora = datetime.utcnow()
+    votacoes = await _votacoes(db, _select_votacoes(agora).where(models.Votacao.id_votacao == id).limit(1))
+    return votacoes[0] if votacoes else None
+
+
+
+
+async def get_opcoes_id(db: AsyncSession, id_votacao, limit=None, cursor=None):
+    stmt = paginar(select(*models.Opcoes.__table__.c).where(models.Opcoes.id_votacao == id_votacao), [models.Opcoes.id_opcao], limit, cursor)
+    opcoes = montar_pagina((await db.execute(stmt)).all(), limit, lambda o: [o.id_opcao])
+    if opcoes:
+        return opcoes
+    else:
+        return {"msg": "Votação e/ou opções não encontradas"}
+
+async def get_votos_votacao(db: AsyncSession, id_votacao):
+    votos = (await db.execute(contagem.stmt_ler(id_votacao))).all()
+    if votos:
+        return votos
+    else:
+        return {"msg": "Votação e/ou opções não encontradas"}
+
+
+
+
+async def _incrementar_contagem(db: AsyncSession, id_votacao, id_opcao):
+    shard = contagem.escolher_shard(id_votacao)
+    stmt = contagem.stmt_incremento(db, id_votacao, id_opcao, shard=shard)
+    if stmt is not None:
+        await db.execute(stmt)
+        return
+    linha = await db.get(models.ContagemVoto, (id_votacao, id_opcao, shard))
+    if linha:
+        linha.total = models.ContagemVoto.total + 1
+    else:
+        db.add(models.ContagemVoto(id_votacao=id_votacao, id_opcao=id_opcao, shard=shard, total=1))
+    await db.flush()
+
+async def criar_voto(db: AsyncSession, voto: schemas.VotoCreate):
+    dados = voto.model_dump()
+    stmt = insert_com_conflito(db, models.Voto)
+    if stmt is not None:
+        stmt = stmt.values(**dados).on_conflict_do_nothing(index_elements=["id_user", "id_votacao"]).returning(models.Voto)
+        novo = (await db.scalars(stmt)).first()
+        if novo is None:
+            await db.rollback()
+            metricas.votos_duplicados.inc()
+            return MSG_VOTO_DUPLICADO
+    else:
+        novo = models.Voto(**dados)
+        db.add(novo)
+        try:
+            await db.flush()
+        except IntegrityError:
+            await db.rollback()
+            metricas.votos_duplicados.inc()
+            return MSG_VOTO_DUPLICADO
+    await _incrementar_contagem(db, novo.id_votacao, novo.id_opcao)
+    await db.commit()
+    metricas.votos_aceitos.inc()
+    hub.publicar(novo.id_votacao, novo.id_opcao)
+    await db.refresh(novo)
+    return novo
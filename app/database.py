@@ -1,11 +1,74 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 import os
+import sqlite3
+import threading
+
+from app.instrumentacao import PoolInstrumentado, instrumentar
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Pool de conexões. Os padrões são os do SQLAlchemy, exceto pre_ping (testa a
+# conexão antes de entregar, evitando erro com conexão derrubada pelo banco)
+# e recycle (renova conexões com mais de 30 min). SQLite em memória usa outro
+# pool e fica como está.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+def opcoes_pool(url: str) -> dict:
+    if url.startswith("sqlite") and (":memory:" in url or url.rstrip("/").endswith("sqlite:") or "mode=memory" in url):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+# O engine é criado no primeiro uso (get_engine), não na importação: importar
+# o app não exige banco no ar. O lifespan do app chama get_engine() na
+# subida; comandos de linha e benchmarks caem aqui no primeiro SessionLocal().
+# "from app.database import engine" continua funcionando (ver __getattr__).
+_engine_lock = threading.Lock()
+_engine = None
+
+
+class _SessionLocal(sessionmaker):
+    def __call__(self, **kw):
+        if _engine is None:
+            get_engine()
+        return super().__call__(**kw)
+
+
+SessionLocal = _SessionLocal(autocommit=False, autoflush=False)
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                if not DATABASE_URL:
+                    raise RuntimeError("DATABASE_URL não definida")
+                opcoes = opcoes_pool(DATABASE_URL)
+                engine = create_engine(DATABASE_URL, **(dict(opcoes, poolclass=PoolInstrumentado) if opcoes else {}))
+                instrumentar(engine)
+                SessionLocal.configure(bind=engine)
+                if DB_ASYNC:
+                    _criar_async_engine()
+                _engine = engine
+    return _engine
+
+
+def __getattr__(nome):
+    if nome == "engine":
+        return get_engine()
+    raise AttributeError(f"module {__name__!r} has no attribute {nome!r}")
+
 
 def get_db():
     db = SessionLocal()
@@ -13,3 +76,50 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Modo assíncrono (DB_ASYNC=1): as rotas de leitura e de voto passam a usar
+# AsyncSession (ver app/rotas_async.py). O engine síncrono continua existindo
+# para as demais rotas, o agendador e os comandos de linha.
+DB_ASYNC = os.getenv("DB_ASYNC", "0") == "1"
+
+_DRIVERS_ASYNC = {
+    "postgres": "postgresql+asyncpg",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def url_async(url: str) -> str:
+    esquema, resto = url.split("://", 1)
+    return f"{_DRIVERS_ASYNC.get(esquema, esquema)}://{resto}"
+
+async_engine = None
+AsyncSessionLocal = None
+
+def _criar_async_engine():
+    global async_engine, AsyncSessionLocal
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    async_engine = create_async_engine(url_async(DATABASE_URL), **opcoes_pool(DATABASE_URL))
+    instrumentar(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    if AsyncSessionLocal is None:
+        get_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# INSERT ... ON CONFLICT do dialeto, ou None quando o banco não suporta
+# (aí o chamador cai no caminho com IntegrityError)
+def insert_com_conflito(db, modelo):
+    dialeto = db.get_bind().dialect.name
+    if dialeto == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialeto == "sqlite" and sqlite3.sqlite_version_info >= (3, 35):
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert(modelo)
@@ -0,0 +1,100 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+from app import models, contagem, busca
+from app.database import get_engine, SessionLocal
+
+# Criação e atualização do esquema, fora da subida do app (que não toca mais
+# no esquema). Rode antes de subir uma versão nova:
+#
+#   python -m app.esquema               cria o que falta
+#   python -m app.esquema --verificar   só lista; sai com 1 se houver pendência
+#
+# Cria tabelas e índices que faltam (o create_all sozinho não cria índice novo
+# em tabela existente), inclusive o índice de busca de app/busca.py.
+# contagem_voto sem a coluna shard é recriada e reconstruída a partir de voto,
+# já que é derivada. Outras colunas faltando só são apontadas: essas pedem
+# migração manual. Índices substituídos (OBSOLETOS) são removidos depois de o
+# novo existir.
+
+# (tabela, índice) que uma versão anterior criava
+OBSOLETOS = [("user", "uq_user_email_normalizado")]
+
+
+def _indices(engine, inspetor, tabela):
+    # A reflexão do SQLite ignora índices de expressão (os de identidade)
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as conexao:
+            return set(conexao.execute(text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t"), {"t": tabela}).scalars())
+    return {i["name"] for i in inspetor.get_indexes(tabela)}
+
+
+def pendencias(engine):
+    # Lista de (tipo, nome, corrigivel)
+    inspetor = inspect(engine)
+    existentes = set(inspetor.get_table_names())
+    resultado = []
+    for tabela in models.Base.metadata.sorted_tables:
+        if tabela.name not in existentes:
+            resultado.append(("tabela", tabela.name, True))
+            continue
+        colunas = {c["name"] for c in inspetor.get_columns(tabela.name)}
+        for coluna in tabela.columns:
+            if coluna.name not in colunas:
+                corrigivel = tabela.name == models.ContagemVoto.__tablename__
+                resultado.append(("coluna", f"{tabela.name}.{coluna.name}", corrigivel))
+        indices = _indices(engine, inspetor, tabela.name)
+        for indice in tabela.indexes:
+            if indice.name not in indices:
+                resultado.append(("indice", indice.name, True))
+    for tabela, nome in OBSOLETOS:
+        if tabela in existentes and nome in _indices(engine, inspetor, tabela):
+            resultado.append(("indice_obsoleto", nome, True))
+    if models.Votacao.__tablename__ in existentes:
+        indice_busca = busca.pendente(engine)
+        if indice_busca:
+            resultado.append(("indice", indice_busca, True))
+    return resultado
+
+
+def garantir(engine=None):
+    # Aplica o que dá para aplicar; retorna as pendências encontradas
+    engine = engine or get_engine()
+    encontradas = pendencias(engine)
+    contagem_antiga = any(tipo == "coluna" and corrigivel for tipo, _, corrigivel in encontradas)
+
+    if contagem_antiga:
+        models.ContagemVoto.__table__.drop(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conexao:
+        for tabela in models.Base.metadata.sorted_tables:
+            for indice in tabela.indexes:
+                conexao.execute(CreateIndex(indice, if_not_exists=True))
+        for tipo, nome, _ in encontradas:
+            if tipo == "indice_obsoleto":
+                conexao.execute(text(f'DROP INDEX IF EXISTS "{nome}"'))
+    if busca.pendente(engine):
+        busca.criar(engine)
+    if contagem_antiga:
+        db = SessionLocal()
+        try:
+            contagem.reconstruir(db)
+        finally:
+            db.close()
+    return encontradas
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(prog="python -m app.esquema")
+    parser.add_argument("--verificar", action="store_true", help="só lista as pendências")
+    args = parser.parse_args()
+
+    encontradas = pendencias(get_engine()) if args.verificar else garantir()
+    manuais = [nome for tipo, nome, corrigivel in encontradas if not corrigivel]
+    for tipo, nome, corrigivel in encontradas:
+        situacao = "pendente" if args.verificar else ("MIGRAÇÃO MANUAL" if not corrigivel else "removido" if tipo == "indice_obsoleto" else "criado")
+        print(f"{tipo} {nome}: {situacao}")
+    print(f"{len(encontradas)} pendência(s)")
+    sys.exit(1 if manuais or (args.verificar and encontradas) else 0)
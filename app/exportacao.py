@@ -0,0 +1,94 @@
+import io
+import csv
+import json
+import os
+from sqlalchemy import select, func, DateTime
+from app import models
+from app.database import SessionLocal
+
+# Exportação dos votos de uma votação (auditoria) em CSV ou NDJSON, em
+# streaming: as linhas saem do banco em lotes de EXPORTACAO_LOTE com
+# yield_per (cursor no servidor no PostgreSQL) e cada lote vira um pedaço da
+# resposta, então a memória não cresce com o número de votos.
+# O gerador abre a própria sessão: a do get_db já foi fechada quando o corpo
+# da StreamingResponse começa a ser enviado.
+EXPORTACAO_LOTE = int(os.getenv("EXPORTACAO_LOTE", "5000"))
+
+FORMATOS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+COLUNAS_VOTOS = ["id_voto", "id_votacao", "id_opcao", "id_user", "data_voto", "voto_publico"]
+COLUNAS_TOTAIS = ["id_opcao", "titulo", "total_votos"]
+
+
+def stmt_votos(id_votacao):
+    v = models.Voto
+    return (
+        select(v.id_voto, v.id_votacao, v.id_opcao, v.id_user, v.data_voto, v.voto_publico)
+        .where(v.id_votacao == id_votacao)
+        .order_by(v.id_voto)
+    )
+
+
+def stmt_totais(id_votacao):
+    # Todas as opções, inclusive as sem voto
+    total = func.coalesce(func.sum(models.ContagemVoto.total), 0)
+    return (
+        select(models.Opcoes.id_opcao, models.Opcoes.titulo, total.label("total_votos"))
+        .outerjoin(models.ContagemVoto, models.ContagemVoto.id_opcao == models.Opcoes.id_opcao)
+        .where(models.Opcoes.id_votacao == id_votacao)
+        .group_by(models.Opcoes.id_opcao, models.Opcoes.titulo)
+        .order_by(models.Opcoes.id_opcao)
+    )
+
+
+def _com_datas_iso(lotes, indices):
+    # Datas em ISO 8601 nos dois formatos; só as colunas de data são tocadas
+    if not indices:
+        yield from lotes
+        return
+    for lote in lotes:
+        linhas = []
+        for linha in lote:
+            linha = list(linha)
+            for i in indices:
+                if linha[i] is not None:
+                    linha[i] = linha[i].isoformat()
+            linhas.append(linha)
+        yield linhas
+
+
+def _csv(colunas, lotes):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(colunas)
+    for lote in lotes:
+        escritor.writerows(lote)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _ndjson(colunas, lotes):
+    for lote in lotes:
+        yield "".join(json.dumps(dict(zip(colunas, linha)), ensure_ascii=False) + "\n" for linha in lote)
+
+
+def exportar(id_votacao, formato="csv", tipo="votos", lote=EXPORTACAO_LOTE, session_factory=SessionLocal):
+    # Gerador de pedaços de texto; um pedaço por lote de linhas
+    if tipo == "totais":
+        stmt, colunas = stmt_totais(id_votacao), COLUNAS_TOTAIS
+    else:
+        stmt, colunas = stmt_votos(id_votacao), COLUNAS_VOTOS
+    escrever = _csv if formato == "csv" else _ndjson
+
+    datas = [i for i, coluna in enumerate(stmt.selected_columns) if isinstance(coluna.type, DateTime)]
+
+    db = session_factory()
+    try:
+        # Direto na conexão: linhas do Core, sem a camada de carregamento do ORM
+        resultado = db.connection().execute(stmt.execution_options(yield_per=lote))
+        yield from escrever(colunas, _com_datas_iso(resultado.partitions(), datas))
+    finally:
+        db.close()
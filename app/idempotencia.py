@@ -0,0 +1,199 @@
+import os
+import time
+import hashlib
+import importlib
+import threading
+from collections import OrderedDict
+import asyncio
+from concurrent.futures import Future, TimeoutError as EsperaEsgotada
+from fastapi import HTTPException, Response
+from app.serializacao import para_json
+from app import metricas
+
+# Cabeçalho Idempotency-Key em POST /votos/ e POST /cadastro/. Clientes que
+# repetem a requisição depois de um timeout mandam a mesma chave; a resposta
+# da primeira execução fica guardada por IDEMPOTENCIA_TTL segundos e é
+# devolvida nas repetições (com Idempotent-Replayed: true) sem passar pelo
+# crud, pelo banco nem pelo bcrypt. Repetição que chega enquanto a primeira
+# ainda roda espera por ela em vez de executar de novo.
+#
+# A mesma chave com outro corpo responde 422. Erros 5xx e exceções não são
+# guardados: a próxima repetição executa de novo.
+#
+# O armazém padrão fica em memória, por processo (com vários workers do
+# uvicorn a repetição pode cair em outro processo e executar de novo; aí o
+# índice único do voto e a checagem de e-mail/CPF seguram o duplicado).
+# IDEMPOTENCIA_ARMAZEM="pacote.modulo:Classe" troca por outro armazém com os
+# mesmos métodos obter(chave) e guardar(chave, registro, ttl), por exemplo
+# um compartilhado entre os workers. A espera pela execução em andamento é
+# sempre local ao processo.
+IDEMPOTENCIA_TTL = float(os.getenv("IDEMPOTENCIA_TTL", "86400"))
+IDEMPOTENCIA_MAX = int(os.getenv("IDEMPOTENCIA_MAX", "100000"))
+# Quanto uma repetição espera pela execução em andamento antes de desistir (409)
+IDEMPOTENCIA_ESPERA = float(os.getenv("IDEMPOTENCIA_ESPERA_S", "30"))
+IDEMPOTENCIA_ARMAZEM = os.getenv("IDEMPOTENCIA_ARMAZEM", "")
+
+CABECALHO = "Idempotency-Key"
+CABECALHO_REPETIDA = "Idempotent-Replayed"
+TAMANHO_MAX_CHAVE = 255
+
+
+class ArmazemMemoria:
+    def __init__(self, tamanho_max=IDEMPOTENCIA_MAX):
+        self.tamanho_max = tamanho_max
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira, registro = item
+            if expira < time.monotonic():
+                del self._itens[chave]
+                return None
+            return registro
+
+    def guardar(self, chave, registro, ttl):
+        with self._lock:
+            self._itens[chave] = (time.monotonic() + ttl, registro)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.tamanho_max:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+
+def carregar_armazem(caminho=IDEMPOTENCIA_ARMAZEM):
+    if not caminho:
+        return ArmazemMemoria()
+    modulo, _, classe = caminho.partition(":")
+    return getattr(importlib.import_module(modulo), classe)()
+
+
+def impressao(corpo) -> str:
+    # corpo: o modelo pydantic da requisição
+    return hashlib.blake2b(corpo.model_dump_json().encode(), digest_size=16).hexdigest()
+
+
+class Idempotencia:
+    def __init__(self, armazem=None, ttl=IDEMPOTENCIA_TTL, espera=IDEMPOTENCIA_ESPERA):
+        self.armazem = armazem if armazem is not None else carregar_armazem()
+        self.ttl = ttl
+        self.espera = espera
+        self._em_andamento = {}
+        self._lock = threading.Lock()
+
+    def _chave(self, rota, chave):
+        if len(chave) > TAMANHO_MAX_CHAVE:
+            raise HTTPException(status_code=400, detail=f"{CABECALHO} com mais de {TAMANHO_MAX_CHAVE} caracteres")
+        return f"{rota}:{chave}"
+
+    def _reservar(self, chave):
+        # Devolve (registro guardado, None), (None, futuro de quem já executa)
+        # ou (None, None) quando esta requisição passa a ser a dona da chave
+        with self._lock:
+            registro = self.armazem.obter(chave)
+            if registro is not None:
+                return registro, None
+            futuro = self._em_andamento.get(chave)
+            if futuro is not None:
+                return None, futuro
+            self._em_andamento[chave] = Future()
+            return None, None
+
+    def _concluir(self, chave, digest, resultado):
+        # resultado: (status, corpo) ou a exceção que a rota levantou
+        futuro = self._em_andamento[chave]
+        registro = None
+        try:
+            if isinstance(resultado, HTTPException) and resultado.status_code < 500:
+                registro = (digest, resultado.status_code, para_json({"detail": resultado.detail}))
+            elif not isinstance(resultado, BaseException):
+                registro = (digest,) + resultado
+            if registro is not None:
+                self.armazem.guardar(chave, registro, self.ttl)
+        finally:
+            with self._lock:
+                del self._em_andamento[chave]
+            if not futuro.done():
+                futuro.set_result(registro)
+        metricas.idempotencia.inc("executada")
+
+    def _responder(self, registro, digest, repetida):
+        if registro is None:
+            # A primeira execução falhou sem resposta guardada: o cliente tenta de novo
+            raise HTTPException(status_code=409, detail="A requisição original com essa chave falhou; tente novamente")
+        guardada, status_code, corpo = registro
+        if guardada != digest:
+            metricas.idempotencia.inc("conflito")
+            raise HTTPException(status_code=422, detail=f"{CABECALHO} já usada com outro corpo")
+        cabecalhos = {CABECALHO_REPETIDA: "true"} if repetida else {}
+        return Response(content=corpo, status_code=status_code, media_type="application/json", headers=cabecalhos)
+
+    def _gerar(self, gerar, modelo):
+        try:
+            return (200, para_json(gerar(), modelo))
+        except Exception as e:
+            return e
+
+    async def _gerar_async(self, gerar, modelo):
+        try:
+            return (200, para_json(await gerar(), modelo))
+        except Exception as e:
+            return e
+
+    def responder(self, rota, chave, corpo, gerar, modelo):
+        # gerar: função sem argumentos que executa a rota; modelo: tipo da resposta
+        if not chave:
+            return gerar()
+        chave, digest = self._chave(rota, chave), impressao(corpo)
+        registro, futuro = self._reservar(chave)
+        if futuro is not None:
+            metricas.idempotencia.inc("esperou")
+            try:
+                registro = futuro.result(timeout=self.espera)
+            except EsperaEsgotada:
+                raise HTTPException(status_code=409, detail="Requisição com essa chave ainda em andamento")
+        elif registro is None:
+            resultado = self._gerar(gerar, modelo)
+            self._concluir(chave, digest, resultado)
+            if isinstance(resultado, BaseException):
+                raise resultado
+            return self._responder((digest,) + resultado, digest, repetida=False)
+        else:
+            metricas.idempotencia.inc("repetida")
+        return self._responder(registro, digest, repetida=True)
+
+    async def responder_async(self, rota, chave, corpo, gerar, modelo):
+        # gerar: função async sem argumentos, para as rotas de app/rotas_async.py
+        if not chave:
+            return await gerar()
+        chave, digest = self._chave(rota, chave), impressao(corpo)
+        registro, futuro = self._reservar(chave)
+        if futuro is not None:
+            metricas.idempotencia.inc("esperou")
+            try:
+                # shield: o timeout desta espera não pode cancelar o futuro compartilhado
+                registro = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), self.espera)
+            except asyncio.TimeoutError:
+                raise HTTPException(status_code=409, detail="Requisição com essa chave ainda em andamento")
+        elif registro is None:
+            resultado = await self._gerar_async(gerar, modelo)
+            self._concluir(chave, digest, resultado)
+            if isinstance(resultado, BaseException):
+                raise resultado
+            return self._responder((digest,) + resultado, digest, repetida=False)
+        else:
+            metricas.idempotencia.inc("repetida")
+        return self._responder(registro, digest, repetida=True)
+
+    def limpar(self):
+        if hasattr(self.armazem, "limpar"):
+            self.armazem.limpar()
+
+
+idempotencia = Idempotencia()
@@ -0,0 +1,23 @@
+# Normalização de e-mail e CPF usada no cadastro e no login. Precisa bater
+# exatamente com as expressões dos índices únicos em models.py
+# (EMAIL_NORMALIZADO e CPF_NORMALIZADO), senão a consulta não usa o índice.
+import string
+
+# Só A-Z viram minúsculas: str.lower() e o lower() do Postgres também trocam
+# letras fora do ASCII (e nem sempre do mesmo jeito), o do SQLite não. Com a
+# troca restrita ao ASCII, Python e os dois bancos chegam ao mesmo texto.
+_MINUSCULAS_ASCII = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def normalizar_email(email: str) -> str:
+    return email.strip(" ").translate(_MINUSCULAS_ASCII)
+
+
+def normalizar_cpf(cpf: str) -> str:
+    return cpf.strip(" ").replace(".", "").replace("-", "")
+
+
+def parece_email(identificador: str) -> bool:
+    # CPF nunca tem "@": decide o índice sem precisar de duas consultas.
+    # Qualquer identificador sem "@" é procurado como CPF
+    return "@" in identificador
@@ -0,0 +1,194 @@
+import io
+import os
+import csv
+import json
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from app import models, schemas
+from app.identidade import normalizar_email, normalizar_cpf
+from app.security import hash_passwords, BCRYPT_ROUNDS
+
+# Importação de usuários em massa (POST /admin/users/importar e a linha de
+# comando abaixo). Arquivo CSV com cabeçalho ou NDJSON, com os campos de
+# UserCreate. Em vez de um create_user_with_login por linha, cada lote de
+# IMPORTACAO_LOTE linhas faz:
+#   - duas consultas IN nos índices normalizados para achar e-mails e CPFs já
+#     cadastrados;
+#   - os hashes em todos os processos do pool de senhas;
+#   - um INSERT de várias linhas em user e outro em login, e um commit.
+# Linhas com erro (inválidas, repetidas, já cadastradas) entram no relatório
+# e a importação segue.
+#
+# IMPORTACAO_BCRYPT_ROUNDS permite importar com custo menor que BCRYPT_ROUNDS;
+# o login refaz o hash com o custo normal na primeira entrada de cada usuário.
+#
+#   python -m app.importacao usuarios.csv [--formato ndjson] [--lote 1000]
+IMPORTACAO_LOTE = int(os.getenv("IMPORTACAO_LOTE", "1000"))
+IMPORTACAO_BCRYPT_ROUNDS = int(os.getenv("IMPORTACAO_BCRYPT_ROUNDS", str(BCRYPT_ROUNDS)))
+
+MSG_EMAIL_EM_USO = "E-mail já está em uso."
+MSG_CPF_EM_USO = "CPF já está em uso."
+MSG_COLUNAS_A_MAIS = "Colunas a mais que o cabeçalho."
+
+
+def formato_do_arquivo(nome):
+    return "ndjson" if (nome or "").lower().endswith((".ndjson", ".jsonl")) else "csv"
+
+
+def ler_linhas(texto, formato="csv"):
+    # Gera (número da linha, dict) ou (número da linha, mensagem de erro)
+    if formato == "csv":
+        leitor = csv.DictReader(texto)
+        for dados in leitor:
+            # O DictReader junta os campos que sobram na chave None
+            yield leitor.line_num, MSG_COLUNAS_A_MAIS if None in dados else dados
+        return
+    for numero, linha in enumerate(texto, start=1):
+        if not linha.strip():
+            continue
+        try:
+            dados = json.loads(linha)
+        except ValueError:
+            yield numero, "JSON inválido"
+            continue
+        yield numero, dados if isinstance(dados, dict) else "Esperado um objeto JSON"
+
+
+def _lotes(linhas, tamanho):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _validar(lote, vistos_email, vistos_cpf, erros):
+    validos = []
+    for numero, dados in lote:
+        if isinstance(dados, str):
+            erros.append({"linha": numero, "erro": dados})
+            continue
+        try:
+            user = schemas.UserCreate(**dados)
+        except ValidationError as e:
+            campos = ", ".join(".".join(map(str, err["loc"])) for err in e.errors())
+            erros.append({"linha": numero, "erro": f"Campos inválidos: {campos}"})
+            continue
+        email, cpf = normalizar_email(user.email), normalizar_cpf(user.cpf)
+        if email in vistos_email:
+            erros.append({"linha": numero, "erro": "E-mail repetido no arquivo."})
+            continue
+        if cpf in vistos_cpf:
+            erros.append({"linha": numero, "erro": "CPF repetido no arquivo."})
+            continue
+        vistos_email.add(email)
+        vistos_cpf.add(cpf)
+        validos.append((numero, user, email, cpf))
+    return validos
+
+
+def _ja_cadastrados(db: Session, validos, erros):
+    emails = set(db.scalars(select(models.EMAIL_NORMALIZADO).where(models.EMAIL_NORMALIZADO.in_([v[2] for v in validos]))))
+    cpfs = set(db.scalars(select(models.CPF_NORMALIZADO).where(models.CPF_NORMALIZADO.in_([v[3] for v in validos]))))
+    novos = []
+    for numero, user, email, cpf in validos:
+        if email in emails:
+            erros.append({"linha": numero, "erro": MSG_EMAIL_EM_USO})
+        elif cpf in cpfs:
+            erros.append({"linha": numero, "erro": MSG_CPF_EM_USO})
+        else:
+            novos.append((numero, user))
+    return novos
+
+
+def _dados_user(user: schemas.UserCreate):
+    return {"nome_completo": user.nome_completo, "cpf": user.cpf, "email": user.email, "user_type": user.user_type}
+
+
+def _gravar(db: Session, novos, hashes):
+    ids = db.scalars(
+        insert(models.User).returning(models.User.id_user, sort_by_parameter_order=True),
+        [_dados_user(user) for _, user in novos],
+    ).all()
+    db.execute(insert(models.Login), [{"id_user": id_user, "senha": senha} for id_user, senha in zip(ids, hashes)])
+
+
+def _gravar_um_a_um(db: Session, novos, hashes, erros):
+    # Algum cadastro concorrente pegou um e-mail/CPF do lote entre a checagem e
+    # o INSERT: separa as linhas boas das que conflitam
+    gravados = 0
+    for (numero, user), senha in zip(novos, hashes):
+        try:
+            with db.begin_nested():
+                id_user = db.scalar(insert(models.User).returning(models.User.id_user), _dados_user(user))
+                db.execute(insert(models.Login), {"id_user": id_user, "senha": senha})
+            gravados += 1
+        except IntegrityError:
+            erros.append({"linha": numero, "erro": "E-mail ou CPF já está em uso."})
+    return gravados
+
+
+def importar(db: Session, linhas, lote=IMPORTACAO_LOTE, rounds=IMPORTACAO_BCRYPT_ROUNDS):
+    relatorio = {"linhas": 0, "importados": 0, "erros": []}
+    erros = relatorio["erros"]
+    vistos_email, vistos_cpf = set(), set()
+    for linhas_lote in _lotes(linhas, lote):
+        relatorio["linhas"] += len(linhas_lote)
+        validos = _validar(linhas_lote, vistos_email, vistos_cpf, erros)
+        if not validos:
+            continue
+        novos = _ja_cadastrados(db, validos, erros)
+        # A consulta acima abriu transação; não segura a conexão durante o bcrypt
+        db.rollback()
+        if not novos:
+            continue
+        hashes = hash_passwords([user.senha for _, user in novos], rounds)
+        try:
+            _gravar(db, novos, hashes)
+            db.commit()
+            relatorio["importados"] += len(novos)
+        except IntegrityError:
+            db.rollback()
+            relatorio["importados"] += _gravar_um_a_um(db, novos, hashes, erros)
+            db.commit()
+    erros.sort(key=lambda e: e["linha"])
+    return relatorio
+
+
+def importar_arquivo(db: Session, arquivo_binario, formato="csv", lote=IMPORTACAO_LOTE):
+    # arquivo_binario: arquivo aberto em modo binário (ex. UploadFile.file)
+    texto = io.TextIOWrapper(arquivo_binario, encoding="utf-8-sig", newline="")
+    try:
+        return importar(db, ler_linhas(texto, formato), lote)
+    finally:
+        texto.detach()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from app.database import SessionLocal
+    from app.security import encerrar_pool
+
+    parser = argparse.ArgumentParser(prog="python -m app.importacao")
+    parser.add_argument("arquivo")
+    parser.add_argument("--formato", choices=["csv", "ndjson"], default=None)
+    parser.add_argument("--lote", type=int, default=IMPORTACAO_LOTE)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        with open(args.arquivo, "rb") as arquivo:
+            relatorio = importar_arquivo(db, arquivo, args.formato or formato_do_arquivo(args.arquivo), args.lote)
+        for erro in relatorio["erros"]:
+            print(f"linha {erro['linha']}: {erro['erro']}")
+        print(f"{relatorio['importados']} de {relatorio['linhas']} linha(s) importada(s), {len(relatorio['erros'])} erro(s)")
+        sys.exit(1 if relatorio["erros"] else 0)
+    finally:
+        db.close()
+        encerrar_pool()
@@ -0,0 +1,203 @@
+import os
+import time
+import queue
+import asyncio
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import Future, TimeoutError as FuturesTimeout
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import tuple_
+from app import models, schemas, crud, contagem
+from app.database import SessionLocal, insert_com_conflito
+from app.tempo_real import hub
+from app import metricas
+
+# Modo opcional de gravação em lote para POST /votos/ (VOTOS_EM_LOTE=1).
+# Os votos entram numa fila limitada; uma thread escritora junta até
+# VOTOS_LOTE_TAMANHO votos (ou o que chegar em VOTOS_LOTE_ESPERA_MS), grava
+# tudo com um INSERT multi-linha e um único commit, e só então responde a
+# cada requisição do lote. A rota espera a resposta sem ocupar thread do
+# threadpool (registrar_async), por no máximo VOTOS_RESPOSTA_TIMEOUT_MS; se a
+# escritora travar, a requisição recebe 503 em vez de ficar presa. O voto
+# pode ainda ser gravado depois do 503: repita com a mesma Idempotency-Key.
+INGESTAO_EM_LOTE = os.getenv("VOTOS_EM_LOTE", "0") == "1"
+TAMANHO_LOTE = int(os.getenv("VOTOS_LOTE_TAMANHO", "200"))
+ESPERA_LOTE = float(os.getenv("VOTOS_LOTE_ESPERA_MS", "5")) / 1000
+FILA_MAX = int(os.getenv("VOTOS_FILA_MAX", "10000"))
+TIMEOUT_FILA = float(os.getenv("VOTOS_FILA_TIMEOUT_MS", "100")) / 1000
+TIMEOUT_RESPOSTA = float(os.getenv("VOTOS_RESPOSTA_TIMEOUT_MS", "10000")) / 1000
+
+MSG_ERRO = {"msg": "Erro ao registrar votação"}
+
+_PARAR = object()
+
+logger = logging.getLogger(__name__)
+
+
+def _sem_resposta():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Voto ainda não confirmado, tente novamente",
+        headers={"Retry-After": "1"},
+    )
+
+
+class IngestaoVotos:
+    def __init__(self, session_factory=SessionLocal, tamanho_lote=TAMANHO_LOTE, espera_lote=ESPERA_LOTE, fila_max=FILA_MAX, timeout_fila=TIMEOUT_FILA, timeout_resposta=TIMEOUT_RESPOSTA):
+        self.session_factory = session_factory
+        self.tamanho_lote = tamanho_lote
+        self.espera_lote = espera_lote
+        self.timeout_fila = timeout_fila
+        self.timeout_resposta = timeout_resposta
+        self.fila = queue.Queue(maxsize=fila_max)
+        self._thread = None
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._executar, name="ingestao-votos", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        if self._thread and self._thread.is_alive():
+            self.fila.put(_PARAR)
+            self._thread.join(timeout=10)
+
+    def submeter(self, voto: schemas.VotoCreate) -> Future:
+        futuro = Future()
+        try:
+            self.fila.put((voto, futuro), timeout=self.timeout_fila)
+        except queue.Full:
+            # Contrapressão: melhor recusar rápido do que enfileirar sem limite
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Fila de votos cheia, tente novamente",
+                headers={"Retry-After": "1"},
+            )
+        return futuro
+
+    def registrar(self, voto: schemas.VotoCreate):
+        # Versão bloqueante, para quem não está no event loop (CLI, benchmarks)
+        try:
+            return self.submeter(voto).result(timeout=self.timeout_resposta)
+        except FuturesTimeout:
+            raise _sem_resposta()
+
+    async def registrar_async(self, voto: schemas.VotoCreate):
+        # submeter pode esperar vaga na fila; isso não pode travar o event loop
+        futuro = await run_in_threadpool(self.submeter, voto)
+        try:
+            # shield: o timeout não cancela o futuro que a escritora vai preencher
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(futuro)), self.timeout_resposta)
+        except asyncio.TimeoutError:
+            raise _sem_resposta()
+
+    def _executar(self):
+        while True:
+            item = self.fila.get()
+            if item is _PARAR:
+                return
+            lote = [item]
+            limite = time.monotonic() + self.espera_lote
+            parar = False
+            while len(lote) < self.tamanho_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    item = self.fila.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if item is _PARAR:
+                    parar = True
+                    break
+                lote.append(item)
+            self._processar(lote)
+            if parar:
+                return
+
+    def _processar(self, lote):
+        try:
+            resultados, por_opcao = self._gravar_lote([voto for voto, _ in lote])
+        except Exception:
+            # Um voto inválido (FK, etc.) não pode derrubar o lote inteiro:
+            # refaz um a um pelo caminho normal
+            resultados, por_opcao = [self._gravar_um(voto) for voto, _ in lote], None
+        for (_, futuro), resultado in zip(lote, resultados):
+            if not futuro.cancelled():
+                futuro.set_result(resultado)
+        if por_opcao is not None:
+            self._apos_commit(por_opcao, len(lote))
+
+    def _apos_commit(self, por_opcao, total):
+        # Fora do try de _processar: com o lote já gravado, uma falha aqui não
+        # pode refazer os votos um a um (voltariam todos como duplicados)
+        try:
+            for (id_votacao, id_opcao), quantidade in por_opcao.items():
+                hub.publicar(id_votacao, id_opcao, quantidade)
+            aceitos = sum(por_opcao.values())
+            metricas.votos_aceitos.inc(quantidade=aceitos)
+            metricas.votos_duplicados.inc(quantidade=total - aceitos)
+        except Exception:
+            logger.exception("Erro depois de gravar lote de votos")
+
+    def _gravar_um(self, voto):
+        db = self.session_factory(expire_on_commit=False)
+        try:
+            return crud.criar_voto(db, voto)
+        except Exception:
+            db.rollback()
+            return MSG_ERRO
+        finally:
+            db.close()
+
+    def _gravar_lote(self, votos):
+        # Devolve (resultado de cada voto, votos gravados por (votação, opção))
+        db = self.session_factory(expire_on_commit=False)
+        try:
+            resultados = [crud.MSG_VOTO_DUPLICADO] * len(votos)
+            stmt = insert_com_conflito(db, models.Voto)
+
+            # Duplicados dentro do próprio lote: só o primeiro segue para o INSERT
+            vistos = set()
+            por_opcao = Counter()
+            if stmt is None:
+                # Sem ON CONFLICT no banco: checa os já gravados com um SELECT só
+                chaves = list({(v.id_user, v.id_votacao) for v in votos})
+                vistos = set(db.query(models.Voto.id_user, models.Voto.id_votacao).filter(tuple_(models.Voto.id_user, models.Voto.id_votacao).in_(chaves)).all())
+            novos, posicoes = [], {}
+            for i, voto in enumerate(votos):
+                chave = (voto.id_user, voto.id_votacao)
+                if chave in vistos:
+                    continue
+                vistos.add(chave)
+                novos.append(voto.model_dump())
+                posicoes[chave] = i
+
+            if novos:
+                if stmt is not None:
+                    # O conflito no índice único responde quem já tinha votado:
+                    # só as linhas realmente inseridas voltam no RETURNING
+                    stmt = stmt.on_conflict_do_nothing(index_elements=["id_user", "id_votacao"]).returning(models.Voto)
+                    gravados = db.scalars(stmt, novos).all()
+                else:
+                    gravados = [models.Voto(**dados) for dados in novos]
+                    db.add_all(gravados)
+                    db.flush()
+                for gravado in gravados:
+                    resultados[posicoes[(gravado.id_user, gravado.id_votacao)]] = gravado
+                por_opcao = Counter((g.id_votacao, g.id_opcao) for g in gravados)
+                for (id_votacao, id_opcao), quantidade in por_opcao.items():
+                    contagem.incrementar(db, id_votacao, id_opcao, quantidade)
+            db.commit()
+            return resultados, por_opcao
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+
+ingestao_votos = IngestaoVotos()
@@ -0,0 +1,155 @@
+import os
+import re
+import time
+import threading
+from functools import lru_cache
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Instrumentação do banco: tempo de espera no checkout do pool, ocupação do
+# pool e duração de cada consulta agrupada pela "impressão digital" do SQL
+# (literais e listas IN trocados por ?). Lida por estatisticas() e exposta em
+# GET /admin/stats/db, para dimensionar DB_POOL_SIZE/DB_MAX_OVERFLOW a partir
+# de números. DB_INSTRUMENTACAO=0 desliga os ganchos de consulta.
+DB_INSTRUMENTACAO = os.getenv("DB_INSTRUMENTACAO", "1") == "1"
+# Consultas distintas guardadas; as que passarem disso somam em "(outras)"
+INSTRUMENTACAO_MAX_CONSULTAS = int(os.getenv("INSTRUMENTACAO_MAX_CONSULTAS", "500"))
+
+_ESPACOS = re.compile(r"\s+")
+_TEXTOS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r"(?<![\w$])-?\d+(?:\.\d+)?\b")
+_PARAMETROS = re.compile(r"%\(\w+\)s|\$\d+|:\w+|\?")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_LINHAS = re.compile(r"\(\?\)(?:\s*,\s*\(\?\))+")
+
+
+@lru_cache(maxsize=4096)
+def impressao_digital(sql: str) -> str:
+    # SQLAlchemy manda o mesmo texto para a mesma consulta, então o cache
+    # evita repetir as regex a cada execução
+    sql = _ESPACOS.sub(" ", sql).strip()
+    sql = _TEXTOS.sub("?", sql)
+    sql = _NUMEROS.sub("?", sql)
+    sql = _PARAMETROS.sub("?", sql)
+    sql = _LISTAS.sub("(?)", sql)
+    # INSERT de várias linhas: VALUES (?), (?), ... vira uma linha só
+    return _LINHAS.sub("(?)", sql)
+
+
+class Estatisticas:
+    def __init__(self, max_consultas=INSTRUMENTACAO_MAX_CONSULTAS):
+        self.max_consultas = max_consultas
+        self._lock = threading.Lock()
+        self.zerar()
+
+    def zerar(self):
+        with self._lock:
+            self.esperas = 0
+            self.espera_total = 0.0
+            self.espera_max = 0.0
+            self.esgotamentos = 0
+            self.ocupacao_max = 0
+            self.consultas = {}
+
+    def registrar_espera(self, segundos):
+        with self._lock:
+            self.esperas += 1
+            self.espera_total += segundos
+            self.espera_max = max(self.espera_max, segundos)
+
+    def registrar_esgotamento(self):
+        with self._lock:
+            self.esgotamentos += 1
+
+    def registrar_ocupacao(self, em_uso):
+        with self._lock:
+            self.ocupacao_max = max(self.ocupacao_max, em_uso)
+
+    def registrar_consulta(self, sql, segundos):
+        chave = impressao_digital(sql)
+        with self._lock:
+            dados = self.consultas.get(chave)
+            if dados is None:
+                if len(self.consultas) >= self.max_consultas:
+                    chave = "(outras)"
+                dados = self.consultas.setdefault(chave, [0, 0.0, 0.0])
+            dados[0] += 1
+            dados[1] += segundos
+            dados[2] = max(dados[2], segundos)
+
+    def resumo(self, pool=None, top=20):
+        with self._lock:
+            consultas = sorted(self.consultas.items(), key=lambda item: item[1][1], reverse=True)[:top]
+            resultado = {
+                "checkout": {
+                    "quantidade": self.esperas,
+                    "espera_media_ms": round(1000 * self.espera_total / self.esperas, 3) if self.esperas else 0,
+                    "espera_max_ms": round(1000 * self.espera_max, 3),
+                    "esgotamentos": self.esgotamentos,
+                },
+                "consultas": [
+                    {
+                        "sql": sql,
+                        "execucoes": n,
+                        "total_ms": round(1000 * total, 3),
+                        "media_ms": round(1000 * total / n, 3),
+                        "max_ms": round(1000 * maximo, 3),
+                    }
+                    for sql, (n, total, maximo) in consultas
+                ],
+            }
+        if isinstance(pool, QueuePool):
+            resultado["pool"] = {
+                "tamanho": pool.size(),
+                "em_uso": pool.checkedout(),
+                "livres": pool.checkedin(),
+                "overflow": pool.overflow(),
+                "em_uso_max": self.ocupacao_max,
+            }
+        return resultado
+
+
+estatisticas = Estatisticas()
+
+
+class PoolInstrumentado(QueuePool):
+    # QueuePool que mede quanto cada checkout esperou por uma conexão (inclui
+    # abrir uma nova quando cabe no overflow) e conta os que estouraram o timeout
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = super()._do_get()
+        except PoolTimeoutError:
+            estatisticas.registrar_esgotamento()
+            raise
+        estatisticas.registrar_espera(time.perf_counter() - inicio)
+        return conexao
+
+
+def instrumentar(engine):
+    if isinstance(engine.pool, QueuePool):
+        @event.listens_for(engine, "checkout")
+        def _checkout(dbapi_conn, registro, proxy):
+            estatisticas.registrar_ocupacao(engine.pool.checkedout())
+
+    if not DB_INSTRUMENTACAO:
+        return
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_inicio_consulta", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        inicio = conn.info["_inicio_consulta"].pop()
+        estatisticas.registrar_consulta(statement, time.perf_counter() - inicio)
+
+    @event.listens_for(engine, "handle_error")
+    def _erro(contexto):
+        # Consulta que falhou não passa pelo after_cursor_execute. (Não use
+        # contexto.cursor: o SQLAlchemy 2.0 não preenche esse atributo.)
+        if contexto.connection is not None and contexto.statement is not None:
+            pilha = contexto.connection.info.get("_inicio_consulta")
+            if pilha:
+                pilha.pop()
@@ -0,0 +1,193 @@
+import os
+import math
+import time
+import sqlite3
+import importlib
+import threading
+from collections import OrderedDict
+from fastapi import HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from app.identidade import normalizar_email
+from app import metricas
+
+# Limite de requisições por token bucket nas rotas caras: /login/ e
+# /cadastro/ (bcrypt) e /votos/. Cada rota tem um balde por IP e outro por
+# identidade (e-mail no login e no cadastro, id_user no voto). A checagem é
+# uma dependência da rota, que o FastAPI resolve antes do get_db: a recusa é
+# um 429 com Retry-After, sem sessão de banco nem bcrypt.
+#
+# Limites no formato "capacidade/por_segundo": capacidade é a rajada aceita
+# e por_segundo a reposição. LIMITE_<ROTA>_<IP|IDENTIDADE> troca o padrão,
+# ex. LIMITE_LOGIN_IP="30/1"; "0" desliga aquele balde.
+# O IP é o request.client do uvicorn: atrás de proxy rode com
+# --proxy-headers/--forwarded-allow-ips para valer o X-Forwarded-For.
+#
+# Os baldes ficam em memória, por processo. LIMITES_ARMAZEM="modulo:Classe"
+# troca o armazém; "app.limites:BaldesArquivo" guarda em um SQLite local
+# (LIMITES_ARQUIVO) dividido pelos workers da máquina, no lugar de um
+# armazém compartilhado de verdade.
+LIMITES = os.getenv("LIMITES", "1") == "1"
+LIMITES_MAX = int(os.getenv("LIMITES_MAX", "100000"))
+LIMITES_ARMAZEM = os.getenv("LIMITES_ARMAZEM", "")
+LIMITES_ARQUIVO = os.getenv("LIMITES_ARQUIVO", "/tmp/votaai-limites.db")
+
+PADROES = {
+    "login": {"ip": "20/0.5", "identidade": "5/0.1"},
+    "cadastro": {"ip": "10/0.2", "identidade": "3/0.05"},
+    "votos": {"ip": "60/10", "identidade": "5/1"},
+}
+
+
+def _ler_limite(texto):
+    if texto.strip() == "0":
+        return None
+    capacidade, _, por_segundo = texto.partition("/")
+    return float(capacidade), float(por_segundo)
+
+
+def configuracao(rota):
+    return {
+        tipo: _ler_limite(os.getenv(f"LIMITE_{rota.upper()}_{tipo.upper()}", padrao))
+        for tipo, padrao in PADROES[rota].items()
+    }
+
+
+def _repor(tokens, ultimo, agora, capacidade, por_segundo):
+    return min(capacidade, tokens + (agora - ultimo) * por_segundo)
+
+
+class BaldesMemoria:
+    # chave -> (tokens, instante da última conta). Balde que sai por LRU
+    # voltaria cheio de qualquer forma se estava parado há tempo suficiente
+    bloqueante = False
+
+    def __init__(self, tamanho_max=LIMITES_MAX):
+        self.tamanho_max = tamanho_max
+        self._baldes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consumir(self, chave, capacidade, por_segundo):
+        # Devolve 0 se passou ou quantos segundos faltam para o próximo token
+        agora = time.monotonic()
+        with self._lock:
+            tokens, ultimo = self._baldes.get(chave, (capacidade, agora))
+            tokens = _repor(tokens, ultimo, agora, capacidade, por_segundo)
+            espera = 0.0 if tokens >= 1 else (1 - tokens) / por_segundo
+            self._baldes[chave] = (tokens - 1 if not espera else tokens, agora)
+            self._baldes.move_to_end(chave)
+            if len(self._baldes) > self.tamanho_max:
+                self._baldes.popitem(last=False)
+        return espera
+
+    def limpar(self):
+        with self._lock:
+            self._baldes.clear()
+
+
+class BaldesArquivo:
+    # Mesma conta em um SQLite local, uma transação por consumo
+    bloqueante = True
+
+    def __init__(self, caminho=LIMITES_ARQUIVO, tamanho_max=LIMITES_MAX):
+        self.caminho = caminho
+        self.tamanho_max = tamanho_max
+        self._local = threading.local()
+        self._consumos = 0
+        self._conexao().execute("CREATE TABLE IF NOT EXISTS baldes (chave TEXT PRIMARY KEY, tokens REAL, ultimo REAL)")
+
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = self._local.conexao = sqlite3.connect(self.caminho, timeout=5, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=OFF")
+        return conexao
+
+    def consumir(self, chave, capacidade, por_segundo):
+        conexao = self._conexao()
+        agora = time.time()
+        conexao.execute("BEGIN IMMEDIATE")
+        try:
+            linha = conexao.execute("SELECT tokens, ultimo FROM baldes WHERE chave = ?", (chave,)).fetchone()
+            tokens, ultimo = linha or (capacidade, agora)
+            tokens = _repor(tokens, ultimo, agora, capacidade, por_segundo)
+            espera = 0.0 if tokens >= 1 else (1 - tokens) / por_segundo
+            conexao.execute("INSERT OR REPLACE INTO baldes VALUES (?, ?, ?)", (chave, tokens - 1 if not espera else tokens, agora))
+            conexao.execute("COMMIT")
+        except BaseException:
+            conexao.execute("ROLLBACK")
+            raise
+        self._consumos += 1
+        if self._consumos % 1000 == 0:
+            self.podar()
+        return espera
+
+    def podar(self):
+        # Tira os baldes parados há mais tempo quando passar do tamanho máximo
+        conexao = self._conexao()
+        conexao.execute("DELETE FROM baldes WHERE chave IN (SELECT chave FROM baldes ORDER BY ultimo DESC LIMIT -1 OFFSET ?)", (self.tamanho_max,))
+
+    def limpar(self):
+        self._conexao().execute("DELETE FROM baldes")
+
+
+def carregar_armazem(caminho=LIMITES_ARMAZEM):
+    if not caminho:
+        return BaldesMemoria()
+    modulo, _, classe = caminho.partition(":")
+    return getattr(importlib.import_module(modulo), classe)()
+
+
+async def _identidade(rota, request: Request):
+    # O corpo já foi lido pelo FastAPI; form() e json() reaproveitam os bytes
+    try:
+        if rota == "login":
+            valor = (await request.form()).get("username")
+            return normalizar_email(valor) if valor else None
+        corpo = await request.json()
+        if rota == "cadastro":
+            return normalizar_email(corpo["email"])
+        return str(corpo["id_user"])
+    except Exception:
+        # Corpo inválido: a validação da rota responde 422 em seguida
+        return None
+
+
+class Limitador:
+    def __init__(self, armazem=None, ativo=LIMITES):
+        self.ativo = ativo
+        self.armazem = armazem if armazem is not None else carregar_armazem()
+
+    async def _consumir(self, chave, limite):
+        if self.armazem.bloqueante:
+            return await run_in_threadpool(self.armazem.consumir, chave, *limite)
+        return self.armazem.consumir(chave, *limite)
+
+    def dependencia(self, rota):
+        limites = configuracao(rota)
+
+        async def limitar(request: Request):
+            if not self.ativo:
+                return
+            for tipo, limite in limites.items():
+                if limite is None:
+                    continue
+                if tipo == "ip":
+                    valor = request.client.host if request.client else None
+                else:
+                    valor = await _identidade(rota, request)
+                if valor is None:
+                    continue
+                espera = await self._consumir(f"{rota}:{tipo}:{valor}", limite)
+                if espera:
+                    metricas.limites_recusadas.inc(rota, tipo)
+                    raise HTTPException(
+                        status_code=429,
+                        detail="Muitas requisições; tente novamente mais tarde",
+                        headers={"Retry-After": str(math.ceil(espera))},
+                    )
+
+        return limitar
+
+
+limitador = Limitador()
@@ -1,169 +1,265 @@
-from fastapi import FastAPI, Depends
+import os
+import asyncio
+from fastapi import FastAPI, Depends, Header, Response, Request, WebSocket, WebSocketDisconnect, UploadFile
+from fastapi.responses import StreamingResponse, PlainTextResponse, ORJSONResponse
 from sqlalchemy.orm import Session
 from app import models, schemas, crud
-from app.database import engine, get_db
+from app import database
+from app.database import get_db
 from datetime import datetime
 from app.auth import get_current_user, admin_required
 from fastapi.security import OAuth2PasswordRequestForm
 from fastapi import APIRouter
-from typing import List
+from typing import List, Optional
 from fastapi.exceptions import HTTPException
-
-models.Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from app.agendador import agendador, EXPIRACAO_AGENDADOR
+from app.ingestao import ingestao_votos, INGESTAO_EM_LOTE
+from app.security import encerrar_pool
+from app.paginacao import expor_cursor
+from app.instrumentacao import estatisticas
+from app import metricas
+from app.cache_respostas import cache_respostas, VOTACOES, OPCOES, CANDIDATURAS
+from app.tempo_real import hub, HEARTBEAT
+from app import exportacao, importacao
+from app.tarefas import tarefas
+from app.idempotencia import idempotencia
+from app.limites import limitador
+from app.prontidao import prontidao
+from app import esquema
+
+# Nada de banco na importação: o engine nasce no lifespan e o esquema é
+# criado/atualizado por "python -m app.esquema" (ESQUEMA_AUTOMATICO=1 faz isso
+# na subida, para desenvolvimento local)
+ESQUEMA_AUTOMATICO = os.getenv("ESQUEMA_AUTOMATICO", "0") == "1"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    database.get_engine()
+    if ESQUEMA_AUTOMATICO:
+        await run_in_threadpool(esquema.garantir)
+    if EXPIRACAO_AGENDADOR:
+        agendador.iniciar()
+    hub.iniciar()
+    tarefas.iniciar()
+    if INGESTAO_EM_LOTE:
+        ingestao_votos.iniciar()
+    prontidao.iniciar()
+    yield
+    await prontidao.parar()
+    ingestao_votos.parar()
+    tarefas.parar()
+    agendador.parar()
+    await hub.parar()
+    encerrar_pool()
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+
+# Respostas via orjson; as rotas com response_model são serializadas pelo
+# pydantic a partir do modelo, sem passar pelo jsonable_encoder
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+if metricas.METRICAS:
+    app.add_middleware(metricas.MetricasMiddleware)
+
+if database.DB_ASYNC:
+    # Precisa vir antes das rotas síncronas abaixo para ter precedência
+    from app import rotas_async
+    app.include_router(rotas_async.router)
 
 admin_router = APIRouter(dependencies=[Depends(admin_required)])
 
 # === ROTAS GET ===
 
 @admin_router.get("/users/", response_model=List[schemas.UserResponse])
-def list_users(db: Session = Depends(get_db), limit: int = 10, offset:int=0):
-    return crud.get_users(db, limit, offset)
+def list_users(response: Response, db: Session = Depends(get_db), limit: int = 10, offset:int=0, cursor: Optional[str] = None):
+    return expor_cursor(response, crud.get_users(db, limit, offset, cursor))
+
+@app.get("/pronto", include_in_schema=False)
+def pronto(response: Response):
+    # Readiness: 200 quando o banco responde e o aquecimento terminou
+    ok, detalhes = prontidao.estado()
+    if not ok:
+        response.status_code = 503
+    return detalhes
+
+@app.get("/metrics", include_in_schema=False)
+def expor_metricas():
+    return PlainTextResponse(metricas.registro.expor(), media_type="text/plain; version=0.0.4")
+
+@admin_router.get("/stats/db")
+def stats_db(top: int = 20, zerar: bool = False):
+    # Pool (ocupação atual e máxima, espera no checkout) e consultas mais custosas
+    resumo = estatisticas.resumo(database.get_engine().pool, top)
+    if database.async_engine is not None:
+        resumo["pool_async"] = estatisticas.resumo(database.async_engine.sync_engine.pool, 0).get("pool")
+    if zerar:
+        estatisticas.zerar()
+    return resumo
+
+@admin_router.get("/votacoes/{votacao_id}/exportar")
+def exportar_votacao(votacao_id: int, formato: str = "csv", tipo: str = "votos", db: Session = Depends(get_db)):
+    # tipo=votos: um registro por voto; tipo=totais: total por opção
+    if formato not in exportacao.FORMATOS or tipo not in ("votos", "totais"):
+        raise HTTPException(status_code=400, detail="Use formato=csv|ndjson e tipo=votos|totais")
+    if not db.query(models.Votacao.id_votacao).filter(models.Votacao.id_votacao == votacao_id).first():
+        raise HTTPException(status_code=404, detail="Votação não encontrada")
+    return StreamingResponse(
+        exportacao.exportar(votacao_id, formato, tipo),
+        media_type=exportacao.FORMATOS[formato],
+        headers={"Content-Disposition": f'attachment; filename="votacao-{votacao_id}-{tipo}.{formato}"'},
+    )
 
 @app.get("/users/{id}", response_model=schemas.UserResponse)
 def list_user_by_id(db: Session = Depends(get_db), id=int):
     return crud.get_user_id(db, id)
 
-@app.get("/votacoes")
-def list_votacoes(db: Session = Depends(get_db), limit: int = 10, offset:int=0):
-    return crud.get_all_votacao(db, limit, offset)
+@app.get("/votacoes", response_model=schemas.ListaVotacoes)
+def list_votacoes(request: Request, db: Session = Depends(get_db), limit: int = 10, offset:int=0, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, VOTACOES, lambda: crud.get_all_votacao(db, limit, offset, cursor), schemas.ListaVotacoes)
+
+@app.get("/votacoes/open", response_model=schemas.ListaVotacoes)
+def list_votacoes_open(request: Request, db: Session = Depends(get_db), limit: int = 10, offset:int=0, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, VOTACOES, lambda: crud.get_votacoes_abertas(db, limit, offset, cursor), schemas.ListaVotacoes)
 
-@app.get("/votacoes/open")
-def list_votacoes_open(db: Session = Depends(get_db), limit: int = 10, offset:int=0):
-    return crud.get_votacoes_abertas(db, limit, offset)
+@app.get("/votacoes/closed", response_model=schemas.ListaVotacoes)
+def list_votacoes_closed(request: Request, db: Session = Depends(get_db), limit: int = 10, offset:int=0, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, VOTACOES, lambda: crud.get_votacoes_fechadas(db, limit, offset, cursor), schemas.ListaVotacoes)
 
-@app.get("/votacoes/closed")
-def list_votacoes_closed(db: Session = Depends(get_db), limit: int = 10, offset:int=0):
-    return crud.get_votacoes_fechadas(db, limit, offset)
+# Antes de /votacoes/{id_votacao}, que também casaria com "busca". Ordena por
+# relevância entre todos os resultados, a não ser que BUSCA_MAX_CANDIDATOS
+# esteja definido (ver app/busca.py)
+@app.get("/votacoes/busca", response_model=schemas.ListaVotacoes)
+def buscar_votacoes(request: Request, q: str, categoria: Optional[int] = None, db: Session = Depends(get_db), limit: int = 10, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, VOTACOES, lambda: crud.buscar_votacoes(db, q, categoria, limit, 0, cursor), schemas.ListaVotacoes)
 
-@app.get("/votacoes/{id_votacao}")
-def list_votacao_id(db: Session = Depends(get_db), id_votacao=int):
-    return crud.get_votacao_id(db,id_votacao)
+# Listagem com os agregados de cada votação numa consulta só (crud.get_painel).
+# Sem cache de respostas: o total de votos muda a cada voto
+@app.get("/votacoes/painel", response_model=schemas.Painel)
+def painel_votacoes(response: Response, categoria: Optional[int] = None, db: Session = Depends(get_db), limit: int = 10, offset: int = 0, cursor: Optional[str] = None):
+    return expor_cursor(response, crud.get_painel(db, limit, offset, cursor, categoria))
 
-@app.get("/votacoes/{id_votacao}/votos")
+@app.get("/votacoes/{id_votacao}", response_model=schemas.VotacaoOuNada)
+def list_votacao_id(request: Request, db: Session = Depends(get_db), id_votacao=int):
+    return cache_respostas.responder(request, VOTACOES, lambda: crud.get_votacao_id(db,id_votacao), schemas.VotacaoOuNada)
+
+@app.get("/votacoes/{id_votacao}/votos", response_model=schemas.Totais)
 def list_votacao_votos(db: Session = Depends(get_db), id_votacao=int):
     resultados = crud.get_votos_votacao(db, id_votacao)
-    try:
-        return [
-            {"id_opcao": id_opcao, "total_votos": total}
-            for id_opcao, total in resultados
-        ]
-    except:
-        return resultados["msg"]
-        
-
-@app.get("/votacoes/{id_votacao}/opcoes")
-def list_votacao_opcoes(db: Session = Depends(get_db), id_votacao=int):
-    return crud.get_opcoes_id(db, id_votacao)
-
-@app.get("/candidaturas")
-def list_candidaturas(db: Session = Depends(get_db), limit: int = 10, offset:int=0):
-    registros = crud.get_candidaturas(db)
-    if registros is None:
-        raise HTTPException(status_code=404, detail="Candidatura não encontrada")
-
-    return[
-     schemas.CandidaturaInfo(
-        id_candidatura=row[0],
-        id_votacao=row[1],
-        id_user=row[2],
-        detalhes=row[3],
-        nome_completo=row[4],
-        titulo=row[5]
-        )
-        for row in registros  
-    ]
-
-@app.get("/candidaturas/aprovadas")
-def list_candidaturas_aprovadas(db: Session = Depends(get_db), limit: int = 10, offset:int=0):
-    registros = crud.get_candidaturas_aprovadas(db)
-    print(f"\n\n\n\n\n\n\n\n\nLEN REGISTROS:{len(registros)}\n\n\n\n\n\n\n")
-    if registros is None:
-        raise HTTPException(status_code=404, detail="Candidatura não encontrada")
-
-    return[
-     schemas.CandidaturaInfo(
-        id_candidatura=row[0],
-        id_votacao=row[1],
-        id_user=row[2],
-        detalhes=row[3],
-        nome_completo=row[4],
-        titulo=row[5]
-        )
-        for row in registros  
-    ]
-@app.get("/candidaturas/pendentes")
-def list_candidaturas_pendentes(db: Session = Depends(get_db), limit: int = 10, offset:int=0):
-    registros = crud.get_candidaturas_pendentes(db)
-    print(f"\n\n\n\n\n\n\n\n\nLEN REGISTROS:{len(registros)}\n\n\n\n\n\n\n")
-    if registros is None:
-        raise HTTPException(status_code=404, detail="Candidatura não encontrada")
-
-    return[
-     schemas.CandidaturaInfo(
-        id_candidatura=row[0],
-        id_votacao=row[1],
-        id_user=row[2],
-        detalhes=row[3],
-        nome_completo=row[4],
-        titulo=row[5]
-        )
-        for row in registros  
-    ]
-
-@app.get("/candidaturas/recusadas")
-def list_candidaturas_recusadas(db: Session = Depends(get_db), limit: int = 10, offset:int=0):
-    registros = crud.get_candidaturas_recusadas(db)
-    if registros is None:
-        raise HTTPException(status_code=404, detail="Candidatura não encontrada")
-
-    return[
-     schemas.CandidaturaInfo(
-        id_candidatura=row[0],
-        id_votacao=row[1],
-        id_user=row[2],
-        detalhes=row[3],
-        nome_completo=row[4],
-        titulo=row[5]
-        )
-        for row in registros  
-    ]
-
-@app.get("/opcoes")
-def opcoes_list(db: Session = Depends(get_db), limit: int = 10, offset:int=0):
-    return crud.get_opcoes(db)
+    return resultados if isinstance(resultados, list) else resultados["msg"]
 
+@app.get("/votacoes/{id_votacao}/votos/stream")
+async def stream_votacao_votos(request: Request, id_votacao: int):
+    # Server-Sent Events: um evento "totais" ao conectar e depois um por tick
+    # do hub enquanto houver votos; comentário de heartbeat quando parado
+    async def eventos():
+        async with hub.assinar(id_votacao) as fila:
+            while not await request.is_disconnected():
+                try:
+                    evento = await asyncio.wait_for(fila.get(), HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {evento}\n\n"
 
+    return StreamingResponse(eventos(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
+@app.websocket("/votacoes/{id_votacao}/votos/ws")
+async def ws_votacao_votos(websocket: WebSocket, id_votacao: int):
+    await websocket.accept()
+    async with hub.assinar(id_votacao) as fila:
+        async def enviar():
+            while True:
+                await websocket.send_text(await fila.get())
 
+        envio = asyncio.create_task(enviar())
+        try:
+            # O cliente não manda nada; ler só serve para perceber a desconexão
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            envio.cancel()
 
 
-# === ROTAS POST ===
+@app.get("/votacoes/{id_votacao}/opcoes", response_model=schemas.ListaOpcoes)
+def list_votacao_opcoes(request: Request, db: Session = Depends(get_db), id_votacao=int, limit: Optional[int] = None, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, OPCOES, lambda: crud.get_opcoes_id(db, id_votacao, limit, cursor), schemas.ListaOpcoes)
+
+# As linhas do crud (id_candidatura, ..., nome_completo, titulo) viram
+# CandidaturaInfo na serialização
+@app.get("/candidaturas", response_model=schemas.ListaCandidaturas)
+def list_candidaturas(request: Request, db: Session = Depends(get_db), limit: int = 10, offset:int=0, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, CANDIDATURAS, lambda: crud.get_candidaturas(db, limit, offset, cursor), schemas.ListaCandidaturas)
+
+@app.get("/candidaturas/aprovadas", response_model=schemas.ListaCandidaturas)
+def list_candidaturas_aprovadas(request: Request, db: Session = Depends(get_db), limit: int = 10, offset:int=0, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, CANDIDATURAS, lambda: crud.get_candidaturas_aprovadas(db, limit, offset, cursor), schemas.ListaCandidaturas)
+
+@app.get("/candidaturas/pendentes", response_model=schemas.ListaCandidaturas)
+def list_candidaturas_pendentes(request: Request, db: Session = Depends(get_db), limit: int = 10, offset:int=0, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, CANDIDATURAS, lambda: crud.get_candidaturas_pendentes(db, limit, offset, cursor), schemas.ListaCandidaturas)
+
+@app.get("/candidaturas/recusadas", response_model=schemas.ListaCandidaturas)
+def list_candidaturas_recusadas(request: Request, db: Session = Depends(get_db), limit: int = 10, offset:int=0, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, CANDIDATURAS, lambda: crud.get_candidaturas_recusadas(db, limit, offset, cursor), schemas.ListaCandidaturas)
+
+@app.get("/opcoes", response_model=schemas.ListaOpcoes)
+def opcoes_list(request: Request, db: Session = Depends(get_db), limit: int = 10, offset:int=0, cursor: Optional[str] = None):
+    return cache_respostas.responder(request, OPCOES, lambda: crud.get_opcoes(db, limit, offset, cursor), schemas.ListaOpcoes)
+
 
-@app.post("/cadastro/", response_model=schemas.UserRead)
-def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
-    return crud.create_user_with_login(db, user_data=user, senha=user.senha)
 
-@admin_router.post("/votacoes/")
+
+
+
+# === ROTAS POST ===
+
+# Com Idempotency-Key, repetições devolvem a resposta guardada (app/idempotencia.py).
+# Cadastro, voto e login passam antes pelo limite de taxa (app/limites.py)
+@app.post("/cadastro/", response_model=schemas.UserRead, dependencies=[Depends(limitador.dependencia("cadastro"))])
+def create_user(user: schemas.UserCreate, db: Session = Depends(get_db), idempotency_key: Optional[str] = Header(None)):
+    return idempotencia.responder("cadastro", idempotency_key, user, lambda: crud.create_user_with_login(db, user_data=user, senha=user.senha), schemas.UserRead)
+
+@admin_router.post("/users/importar")
+def importar_users(arquivo: UploadFile, formato: Optional[str] = None, db: Session = Depends(get_db)):
+    # CSV com cabeçalho ou NDJSON com os campos de UserCreate; para arquivos
+    # muito grandes prefira "python -m app.importacao", que não prende a requisição
+    formato = formato or importacao.formato_do_arquivo(arquivo.filename)
+    if formato not in ("csv", "ndjson"):
+        raise HTTPException(status_code=400, detail="Use formato=csv|ndjson")
+    return importacao.importar_arquivo(db, arquivo.file, formato)
+
+@admin_router.post("/votacoes/", response_model=schemas.VotacaoRead)
 def criar_votacao(votacao: schemas.VotacaoCreate, db: Session = Depends(get_db)):
     return crud.criar_votacao(db, votacao)
 
-@app.post("/candidaturas/")
+@app.post("/candidaturas/", response_model=schemas.CandidaturaRead)
 def criar_candidatura(candidatura: schemas.CandidaturaCreate, db: Session = Depends(get_db)):
     return crud.criar_candidatura(db, candidatura)
 
-@admin_router.post("/opcoes/")
+@admin_router.post("/opcoes/", response_model=schemas.OpcaoRead)
 def criar_opcao(opcao: schemas.OpcaoCreate, db: Session = Depends(get_db)):
     return crud.criar_opcao(db, opcao)
 
-@app.post("/votos/")
-def criar_voto(voto: schemas.VotoCreate, db: Session = Depends(get_db)):
-    return crud.criar_voto(db, voto)
-
-@app.post("/login/")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    dados = crud.login_user(db, form_data.username, form_data.password)
+@app.post("/votos/", response_model=schemas.VotoOuMensagem, dependencies=[Depends(limitador.dependencia("votos"))])
+async def criar_voto(voto: schemas.VotoCreate, db: Session = Depends(get_db), idempotency_key: Optional[str] = Header(None)):
+    # async: no modo em lote a espera pela escritora não segura uma thread do
+    # threadpool por voto pendente; o caminho normal roda no threadpool
+    async def gerar():
+        if INGESTAO_EM_LOTE:
+            return await ingestao_votos.registrar_async(voto)
+        return await run_in_threadpool(crud.criar_voto, db, voto)
+    return await idempotencia.responder_async("votos", idempotency_key, voto, gerar, schemas.VotoOuMensagem)
+
+# username é e-mail ou CPF: com "@" vai ao índice de e-mail, sem "@" é
+# procurado só como CPF (identidade.parece_email), numa consulta só
+@app.post("/login/", dependencies=[Depends(limitador.dependencia("login"))])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    dados = await crud.login_user(db, form_data.username, form_data.password)
     try:
         return {
             "access_token" : dados["access_token"],
@@ -173,21 +269,26 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     except:
         return {"msg": "Login não encontrado"}
 
+# Vários itens numa transação só (crud.moderar_candidaturas)
+@admin_router.post("/candidaturas/moderar/", response_model=schemas.ResultadoModeracao)
+def moderar_candidaturas(dados: schemas.ModeracaoCandidaturas, db: Session = Depends(get_db)):
+    return crud.moderar_candidaturas(db, [(item.id_candidatura, item.status) for item in dados.itens])
+
 # === ROTAS PUT ===
 
-@admin_router.put("/votacoes/{id}/")
+@admin_router.put("/votacoes/{id}/", response_model=schemas.VotacaoRead)
 def atualizar_votacao(id: int, dados: schemas.VotacaoUpdate, db: Session = Depends(get_db)):
     return crud.atualizar_votacao(db, id, dados)
 
-@app.put("/login/{id_user}/")
+@app.put("/login/{id_user}/", response_model=schemas.LoginRead)
 def atualizar_login(id_user: int, dados: schemas.LoginUpdate, db: Session = Depends(get_db),):
     return crud.atualizar_login(db, id_user, dados)
 
-@admin_router.put("/candidaturas/{id}/")
+@admin_router.put("/candidaturas/{id}/", response_model=schemas.CandidaturaRead)
 def atualizar_candidatura(id: int, dados: schemas.CandidaturaUpdate, db: Session = Depends(get_db)):
     return crud.atualizar_candidatura(db, id, dados)
 
-@admin_router.put("/opcoes/{id}/")
+@admin_router.put("/opcoes/{id}/", response_model=schemas.OpcaoRead)
 def atualizar_opcao(id: int, dados: schemas.OpcaoUpdate, db: Session = Depends(get_db)):
     return crud.atualizar_opcao(db, id, dados)
 
@@ -199,26 +300,29 @@ def atualizar_opcao(id: int, dados: schemas.OpcaoUpdate, db: Session = Depends(g
 
 
 
-@admin_router.delete("/votacoes/{votacao_id}")
-def deletar_votacao(votacao_id: int, db: Session = Depends(get_db)):
-    votacao = db.query(models.Votacao).filter(models.Votacao.id_votacao == votacao_id).first()
-
-    if not votacao:
+def _agendar_remocao(response: Response, db: Session, tipo, votacao_id):
+    if not db.query(models.Votacao.id_votacao).filter(models.Votacao.id_votacao == votacao_id).first():
         raise HTTPException(status_code=404, detail="Votação não encontrada")
-
-    db.delete(votacao)
-    db.commit()
-
-    return {"mensagem": f'Votação "{votacao.titulo}" foi deletada com sucesso.'}
-
-@admin_router.delete("/votacoes/{votacao_id}/reset")
-def resetar_votacao(db: Session = Depends(get_db), votacao_id=int):
-    try:
-        res = crud.resetar_votacao(db, votacao_id)
-        return {"msg": f"{res} Votos deletados"}
-    except:
-        return{"msg": "Nenhum voto foi encontrado"}
-    
+    tarefa = tarefas.agendar(tipo, votacao_id)
+    response.headers["Location"] = f"/admin/tarefas/{tarefa.id}"
+    return tarefa.como_dict()
+
+# Exclusão e reset rodam em segundo plano, em lotes (ver app/tarefas.py):
+# a resposta é 202 com a tarefa, acompanhada em GET /admin/tarefas/{id}
+@admin_router.delete("/votacoes/{votacao_id}", status_code=202)
+def deletar_votacao(votacao_id: int, response: Response, db: Session = Depends(get_db)):
+    return _agendar_remocao(response, db, "exclusao", votacao_id)
+
+@admin_router.delete("/votacoes/{votacao_id}/reset", status_code=202)
+def resetar_votacao(votacao_id: int, response: Response, db: Session = Depends(get_db)):
+    return _agendar_remocao(response, db, "reset", votacao_id)
+
+@admin_router.get("/tarefas/{id_tarefa}")
+def consultar_tarefa(id_tarefa: str):
+    tarefa = tarefas.consultar(id_tarefa)
+    if tarefa is None:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return tarefa.como_dict()
 
 
 
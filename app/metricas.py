@@ -0,0 +1,202 @@
+import os
+import time
+import threading
+from bisect import bisect_left
+
+# Métricas no formato texto do Prometheus, servidas em GET /metrics, sem
+# dependência externa. MetricasMiddleware (ASGI puro, sem BaseHTTPMiddleware)
+# mede cada requisição HTTP por rota (o molde, ex. /votacoes/{id_votacao},
+# nunca o caminho com o id, para não explodir o número de séries):
+#   http_requisicoes_total, http_duracao_segundos (histograma) e
+#   http_em_andamento.
+# Contadores de domínio são incrementados direto no crud e no security.
+# METRICAS=0 desliga o middleware.
+METRICAS = os.getenv("METRICAS", "1") == "1"
+
+BUCKETS_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# bcrypt fica entre dezenas e centenas de ms conforme BCRYPT_ROUNDS
+BUCKETS_SENHA = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+SEM_ROTA = "(sem_rota)"
+_ROTAS_CACHE_MAX = 10000
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(nomes, valores):
+    if not nomes:
+        return ""
+    return "{" + ",".join(f'{n}="{_escapar(v)}"' for n, v in zip(nomes, valores)) + "}"
+
+
+class Contador:
+    tipo = "counter"
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self._lock = threading.Lock()
+        self._valores = {}
+
+    def inc(self, *valores, quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def valor(self, *valores):
+        return self._valores.get(valores, 0)
+
+    def expor(self):
+        with self._lock:
+            itens = sorted(self._valores.items())
+        return [f"{self.nome}{_rotulos(self.rotulos, v)} {n}" for v, n in itens]
+
+
+class Medidor(Contador):
+    tipo = "gauge"
+
+    def dec(self, *valores, quantidade=1):
+        self.inc(*valores, quantidade=-quantidade)
+
+
+class Histograma:
+    tipo = "histogram"
+
+    def __init__(self, nome, ajuda, rotulos=(), buckets=BUCKETS_LATENCIA):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # rótulos -> [contagem por bucket (+Inf no fim), soma]
+        self._series = {}
+
+    def observar(self, segundos, *valores):
+        indice = bisect_left(self.buckets, segundos)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.buckets) + 1), 0.0]
+            serie[0][indice] += 1
+            serie[1] += segundos
+
+    def expor(self):
+        with self._lock:
+            itens = sorted((v, (list(s[0]), s[1])) for v, s in self._series.items())
+        linhas = []
+        nomes = self.rotulos + ("le",)
+        for valores, (contagens, soma) in itens:
+            acumulado = 0
+            for limite, n in zip(self.buckets + ("+Inf",), contagens):
+                acumulado += n
+                linhas.append(f"{self.nome}_bucket{_rotulos(nomes, valores + (limite,))} {acumulado}")
+            linhas.append(f"{self.nome}_sum{_rotulos(self.rotulos, valores)} {soma}")
+            linhas.append(f"{self.nome}_count{_rotulos(self.rotulos, valores)} {acumulado}")
+        return linhas
+
+
+class Registro:
+    def __init__(self):
+        self._metricas = []
+
+    def registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def expor(self) -> str:
+        linhas = []
+        for m in self._metricas:
+            linhas.append(f"# HELP {m.nome} {m.ajuda}")
+            linhas.append(f"# TYPE {m.nome} {m.tipo}")
+            linhas.extend(m.expor())
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+
+http_requisicoes = registro.registrar(Contador("http_requisicoes_total", "Requisições HTTP respondidas", ("metodo", "rota", "status")))
+http_duracao = registro.registrar(Histograma("http_duracao_segundos", "Duração das requisições HTTP", ("metodo", "rota")))
+http_em_andamento = registro.registrar(Medidor("http_em_andamento", "Requisições HTTP em andamento", ("metodo", "rota")))
+
+votos_aceitos = registro.registrar(Contador("votos_aceitos_total", "Votos gravados"))
+votos_duplicados = registro.registrar(Contador("votos_duplicados_total", "Votos recusados por já existir voto do usuário na votação"))
+logins = registro.registrar(Contador("logins_total", "Tentativas de login", ("resultado",)))
+idempotencia = registro.registrar(Contador("idempotencia_total", "Requisições com Idempotency-Key", ("resultado",)))
+limites_recusadas = registro.registrar(Contador("limites_recusadas_total", "Requisições recusadas com 429 pelo limite de taxa", ("rota", "chave")))
+senha_duracao = registro.registrar(Histograma("senha_bcrypt_segundos", "Tempo de hash/verificação de senha, incluindo a fila do pool", ("operacao",), BUCKETS_SENHA))
+
+
+class _Cronometro:
+    # with cronometrar_senha("hash"): ...  -> observa em senha_duracao
+    __slots__ = ("operacao", "inicio")
+
+    def __init__(self, operacao):
+        self.operacao = operacao
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+
+    def __exit__(self, *exc):
+        senha_duracao.observar(time.perf_counter() - self.inicio, self.operacao)
+
+
+def cronometrar_senha(operacao):
+    return _Cronometro(operacao)
+
+
+class MetricasMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self._rotas = None
+        self._moldes = {}
+
+    def _indexar(self, rotas):
+        # Rotas agrupadas pelo primeiro segmento do caminho ("/votacoes/..." ->
+        # "votacoes"), mantendo a ordem do roteador; as que começam com
+        # parâmetro entram em todos os grupos
+        rotas = [(r.path_regex, r.path, r.path.split("/")[1]) for r in rotas if hasattr(r, "path_regex")]
+        coringas = [(regex, molde) for regex, molde, seg in rotas if seg.startswith("{")]
+        grupos = {}
+        for _, _, seg in rotas:
+            if not seg.startswith("{") and seg not in grupos:
+                grupos[seg] = [(regex, molde) for regex, molde, s in rotas if s == seg or s.startswith("{")]
+        return grupos, coringas
+
+    def _molde(self, scope):
+        # Mesmo critério do roteador (primeira rota cujo caminho casa), com
+        # cache por caminho; a lista de rotas é lida na primeira requisição,
+        # depois de todos os include_router
+        caminho = scope["path"]
+        molde = self._moldes.get(caminho)
+        if molde is not None:
+            return molde
+        if self._rotas is None:
+            self._rotas = self._indexar(scope["app"].routes)
+        grupos, coringas = self._rotas
+        candidatas = grupos.get(caminho.split("/", 2)[1] if caminho.count("/") else "", coringas)
+        molde = next((m for regex, m in candidatas if regex.match(caminho)), SEM_ROTA)
+        if len(self._moldes) >= _ROTAS_CACHE_MAX:
+            self._moldes.clear()
+        self._moldes[caminho] = molde
+        return molde
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        metodo = scope["method"]
+        molde = self._molde(scope)
+        status = [500]
+
+        async def enviar(mensagem):
+            if mensagem["type"] == "http.response.start":
+                status[0] = mensagem["status"]
+            await send(mensagem)
+
+        http_em_andamento.inc(metodo, molde)
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            http_duracao.observar(time.perf_counter() - inicio, metodo, molde)
+            http_requisicoes.inc(metodo, molde, status[0])
+            http_em_andamento.dec(metodo, molde)
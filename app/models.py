@@ -1,7 +1,10 @@
-from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, Date, DateTime
+from sqlalchemy import Column, Integer, String, Text, Boolean, ForeignKey, Date, DateTime, Index, func, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from datetime import datetime
+import string
 
 Base = declarative_base()
 
@@ -17,11 +20,38 @@ class User(Base):
     votos = relationship("Voto", back_populates="user")
     candidaturas = relationship("Candidatura", back_populates="user")
 
+class minusculas_ascii(FunctionElement):
+    # Minúsculas só de A-Z, como identidade.normalizar_email
+    type = Text()
+    inherit_cache = True
+
+@compiles(minusculas_ascii)
+def _minusculas_ascii(elemento, compilador, **kw):
+    # lower() do SQLite (sem ICU) já só troca A-Z
+    return f"lower({compilador.process(elemento.clauses, **kw)})"
+
+@compiles(minusculas_ascii, "postgresql")
+def _minusculas_ascii_pg(elemento, compilador, **kw):
+    # lower() do Postgres segue o locale; translate com literais fixos, que
+    # a expressão do índice e a das consultas saiam iguais
+    return f"translate({compilador.process(elemento.clauses, **kw)}, '{string.ascii_uppercase}', '{string.ascii_lowercase}')"
+
+# Identidade normalizada (ver app/identidade.py): login e cadastro filtram por
+# estas mesmas expressões para usar os índices
+EMAIL_NORMALIZADO = minusculas_ascii(func.trim(User.email))
+# Literais fixos no SQL (não parâmetros), senão o SQLite não reconhece a expressão do índice
+_PONTO, _TRACO, _VAZIO = text("'.'"), text("'-'"), text("''")
+CPF_NORMALIZADO = func.replace(func.replace(func.trim(User.cpf), _PONTO, _VAZIO), _TRACO, _VAZIO)
+# Nome novo junto com a expressão: app.esquema cria este e remove o antigo
+# (lower completo), listado em esquema.OBSOLETOS
+Index("uq_user_email_ascii", EMAIL_NORMALIZADO, unique=True)
+Index("uq_user_cpf_normalizado", CPF_NORMALIZADO, unique=True)
+
 class Login(Base):
     __tablename__ = "login"
     id_login = Column(Integer, primary_key=True, autoincrement=True)
     senha = Column(Text)
-    id_user = Column(Integer, ForeignKey("user.id_user"))
+    id_user = Column(Integer, ForeignKey("user.id_user"), index=True)
 
     user = relationship("User", back_populates="logins")
 
@@ -41,6 +71,9 @@ class Votacao(Base):
     votos = relationship("Voto", back_populates="votacao")
     candidaturas = relationship("Candidatura", back_populates="votacao")
 
+    # Usado pelo agendador de expiração (UPDATE por status/data_fim) e pelas listagens
+    __table_args__ = (Index("ix_votacao_status_data_fim", "status", "data_fim"),)
+
 class Categoria(Base):
     __tablename__ = "categorias"
     id_categoria = Column(Integer, primary_key=True, autoincrement=True)
@@ -58,6 +91,9 @@ class Opcoes(Base):
     votacao = relationship("Votacao", back_populates="opcoes")
     votos = relationship("Voto", back_populates="opcao")
 
+    # Opções de uma votação (listagem e contagem do painel)
+    __table_args__ = (Index("ix_opcoes_votacao", "id_votacao"),)
+
 class Voto(Base):
     __tablename__ = "voto"
     id_voto = Column(Integer, primary_key=True, autoincrement=True)
@@ -71,6 +107,23 @@ class Voto(Base):
     votacao = relationship("Votacao", back_populates="votos")
     opcao = relationship("Opcoes", back_populates="votos")
 
+    # Um voto por usuário em cada votação, garantido pelo banco. O segundo
+    # índice atende as operações por votação (remoção em lotes, exportação)
+    __table_args__ = (
+        Index("uq_voto_user_votacao", "id_user", "id_votacao", unique=True),
+        Index("ix_voto_votacao", "id_votacao"),
+    )
+
+class ContagemVoto(Base):
+    # Totais por opção mantidos junto com cada voto (ver app/contagem.py).
+    # Uma opção pode ter várias linhas (shard) quando a votação usa contador
+    # fragmentado; o total é sempre a soma delas.
+    __tablename__ = "contagem_voto"
+    id_votacao = Column(Integer, ForeignKey("votacao.id_votacao"), primary_key=True)
+    id_opcao = Column(Integer, ForeignKey("opcoes.id_opcao"), primary_key=True)
+    shard = Column(Integer, primary_key=True, default=0, server_default=text("0"))
+    total = Column(Integer, nullable=False, default=0)
+
 class Candidatura(Base):
     __tablename__ = "candidatura"
     id_candidatura = Column(Integer, primary_key=True, autoincrement=True)
@@ -81,3 +134,6 @@ class Candidatura(Base):
 
     user = relationship("User", back_populates="candidaturas")
     votacao = relationship("Votacao", back_populates="candidaturas")
+
+    # Candidaturas pendentes por votação, contadas no painel
+    __table_args__ = (Index("ix_candidatura_votacao_status", "id_votacao", "status"),)
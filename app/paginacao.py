@@ -0,0 +1,75 @@
+import json
+import base64
+from datetime import date, datetime
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Paginação por cursor (keyset) para as listagens do crud. A página seguinte
+# continua de "chave > última chave vista" em vez de pular N linhas com
+# OFFSET, então o custo não cresce com a profundidade e a ordem é estável.
+# O cursor é opaco para o cliente: base64 dos valores da chave de ordenação,
+# devolvido no cabeçalho X-Proximo-Cursor.
+CABECALHO_CURSOR = "X-Proximo-Cursor"
+
+
+class Pagina(list):
+    # Lista comum (a resposta continua igual) com o cursor da próxima página
+    proximo_cursor = None
+
+
+def codificar_cursor(valores) -> str:
+    bruto = json.dumps([v.isoformat() if isinstance(v, (date, datetime)) else v for v in valores])
+    return base64.urlsafe_b64encode(bruto.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str, colunas):
+    try:
+        valores = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(valores, list) or len(valores) != len(colunas):
+            raise ValueError
+        return [_converter(coluna, valor) for coluna, valor in zip(colunas, valores)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+def _converter(coluna, valor):
+    if valor is None:
+        return None
+    tipo = coluna.type.python_type
+    if tipo is datetime:
+        return datetime.fromisoformat(valor)
+    if tipo is date:
+        return date.fromisoformat(valor)
+    return tipo(valor)
+
+
+def paginar(query, colunas, limit, cursor=None, offset=0):
+    # query: Query ou Select; colunas: chave de ordenação única, ex. [Votacao.id_votacao].
+    # Busca uma linha a mais para saber se existe próxima página.
+    if cursor:
+        valores = decodificar_cursor(cursor, colunas)
+        if len(colunas) == 1:
+            query = query.filter(colunas[0] > valores[0])
+        else:
+            query = query.filter(tuple_(*colunas) > tuple_(*valores))
+    query = query.order_by(*colunas)
+    if offset and not cursor:
+        # Compatibilidade com clientes que ainda mandam offset
+        query = query.offset(offset)
+    if limit is not None:
+        query = query.limit(limit + 1)
+    return query
+
+
+def montar_pagina(linhas, limit, chave) -> Pagina:
+    # chave: função que extrai da linha os valores das colunas de ordenação
+    pagina = Pagina(linhas if limit is None else linhas[:limit])
+    if limit is not None and len(linhas) > limit:
+        pagina.proximo_cursor = codificar_cursor(chave(pagina[-1]))
+    return pagina
+
+
+def expor_cursor(response: Response, pagina):
+    if isinstance(pagina, Pagina) and pagina.proximo_cursor:
+        response.headers[CABECALHO_CURSOR] = pagina.proximo_cursor
+    return pagina
@@ -0,0 +1,100 @@
+import os
+import time
+import asyncio
+from sqlalchemy import text
+from sqlalchemy.pool import QueuePool
+from fastapi.concurrency import run_in_threadpool
+from app import database
+from app.security import aquecer_pool
+
+# Aquecimento depois da subida, em segundo plano: abre as conexões do pool
+# (DB_POOL_AQUECER, padrão DB_POOL_SIZE), do pool async se houver, e sobe os
+# processos do bcrypt. GET /pronto responde 503 até isso terminar e enquanto
+# o banco não responder; o app já atende antes disso, só que mais frio.
+DB_POOL_AQUECER = int(os.getenv("DB_POOL_AQUECER", str(database.DB_POOL_SIZE)))
+NOVA_TENTATIVA = 2
+
+
+def _conexoes(pool):
+    return min(DB_POOL_AQUECER, pool.size()) if isinstance(pool, QueuePool) else 1
+
+
+def _aquecer_banco():
+    engine = database.get_engine()
+    conexoes = [engine.connect() for _ in range(_conexoes(engine.pool))]
+    try:
+        for conexao in conexoes:
+            conexao.execute(text("SELECT 1"))
+    finally:
+        for conexao in conexoes:
+            conexao.close()
+
+
+async def _aquecer_banco_async():
+    engine = database.async_engine
+    conexoes = [await engine.connect() for _ in range(_conexoes(engine.sync_engine.pool))]
+    try:
+        for conexao in conexoes:
+            await conexao.execute(text("SELECT 1"))
+    finally:
+        for conexao in conexoes:
+            await conexao.close()
+
+
+class Prontidao:
+    def __init__(self):
+        self.aquecido = False
+        self.erro = None
+        self.aquecimento_ms = None
+        self._tarefa = None
+
+    def iniciar(self):
+        self.aquecido, self.erro = False, None
+        self._tarefa = asyncio.create_task(self._aquecer())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+
+    async def _aquecer(self):
+        # Banco fora do ar na subida: tenta de novo até conseguir
+        inicio = time.perf_counter()
+        while True:
+            try:
+                await run_in_threadpool(_aquecer_banco)
+                if database.async_engine is not None:
+                    await _aquecer_banco_async()
+                await run_in_threadpool(aquecer_pool)
+                break
+            except Exception as e:
+                self.erro = str(e)
+                await asyncio.sleep(NOVA_TENTATIVA)
+        self.aquecido, self.erro = True, None
+        self.aquecimento_ms = round((time.perf_counter() - inicio) * 1000, 1)
+
+    def estado(self):
+        # (pronto, detalhes); o SELECT 1 é feito a cada consulta
+        banco = "ok"
+        try:
+            with database.get_engine().connect() as conexao:
+                conexao.execute(text("SELECT 1"))
+        except Exception as e:
+            banco = str(e)
+        detalhes = {
+            "aquecido": self.aquecido,
+            "aquecimento_ms": self.aquecimento_ms,
+            "banco": banco,
+        }
+        if self.erro:
+            detalhes["erro"] = self.erro
+        pool = database.get_engine().pool
+        if isinstance(pool, QueuePool):
+            detalhes["pool"] = {"tamanho": pool.size(), "livres": pool.checkedin(), "em_uso": pool.checkedout()}
+        return self.aquecido and banco == "ok", detalhes
+
+
+prontidao = Prontidao()
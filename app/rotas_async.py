@@ -0,0 +1,59 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, Request, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import schemas, crud, crud_async
+from app.database import get_async_db
+from app.paginacao import expor_cursor
+from app.ingestao import ingestao_votos, INGESTAO_EM_LOTE
+from app.cache_respostas import cache_respostas, VOTACOES, OPCOES
+from app.idempotencia import idempotencia
+from app.limites import limitador
+
+# Versões async das rotas mais quentes. Com DB_ASYNC=1 o main inclui este
+# router antes das rotas síncronas, e como o Starlette usa a primeira rota que
+# casa, estas respondem no lugar das equivalentes em app/main.py.
+router = APIRouter()
+
+
+@router.get("/votacoes", response_model=schemas.ListaVotacoes)
+async def list_votacoes(request: Request, db: AsyncSession = Depends(get_async_db), limit: int = 10, offset: int = 0, cursor: Optional[str] = None):
+    return await cache_respostas.responder_async(request, VOTACOES, lambda: crud_async.get_all_votacao(db, limit, offset, cursor), schemas.ListaVotacoes)
+
+@router.get("/votacoes/open", response_model=schemas.ListaVotacoes)
+async def list_votacoes_open(request: Request, db: AsyncSession = Depends(get_async_db), limit: int = 10, offset: int = 0, cursor: Optional[str] = None):
+    return await cache_respostas.responder_async(request, VOTACOES, lambda: crud_async.get_votacoes_abertas(db, limit, offset, cursor), schemas.ListaVotacoes)
+
+@router.get("/votacoes/closed", response_model=schemas.ListaVotacoes)
+async def list_votacoes_closed(request: Request, db: AsyncSession = Depends(get_async_db), limit: int = 10, offset: int = 0, cursor: Optional[str] = None):
+    return await cache_respostas.responder_async(request, VOTACOES, lambda: crud_async.get_votacoes_fechadas(db, limit, offset, cursor), schemas.ListaVotacoes)
+
+@router.get("/votacoes/busca", response_model=schemas.ListaVotacoes)
+async def buscar_votacoes(request: Request, q: str, categoria: Optional[int] = None, db: AsyncSession = Depends(get_async_db), limit: int = 10, cursor: Optional[str] = None):
+    # A mesma consulta do crud síncrono, rodada sobre a conexão async
+    return await cache_respostas.responder_async(request, VOTACOES, lambda: db.run_sync(crud.buscar_votacoes, q, categoria, limit, 0, cursor), schemas.ListaVotacoes)
+
+@router.get("/votacoes/painel", response_model=schemas.Painel)
+async def painel_votacoes(response: Response, categoria: Optional[int] = None, db: AsyncSession = Depends(get_async_db), limit: int = 10, offset: int = 0, cursor: Optional[str] = None):
+    return expor_cursor(response, await db.run_sync(crud.get_painel, limit, offset, cursor, categoria))
+
+@router.get("/votacoes/{id_votacao}", response_model=schemas.VotacaoOuNada)
+async def list_votacao_id(request: Request, id_votacao: int, db: AsyncSession = Depends(get_async_db)):
+    return await cache_respostas.responder_async(request, VOTACOES, lambda: crud_async.get_votacao_id(db, id_votacao), schemas.VotacaoOuNada)
+
+@router.get("/votacoes/{id_votacao}/votos", response_model=schemas.Totais)
+async def list_votacao_votos(id_votacao: int, db: AsyncSession = Depends(get_async_db)):
+    resultados = await crud_async.get_votos_votacao(db, id_votacao)
+    return resultados if isinstance(resultados, list) else resultados["msg"]
+
+@router.get("/votacoes/{id_votacao}/opcoes", response_model=schemas.ListaOpcoes)
+async def list_votacao_opcoes(request: Request, id_votacao: int, db: AsyncSession = Depends(get_async_db), limit: Optional[int] = None, cursor: Optional[str] = None):
+    return await cache_respostas.responder_async(request, OPCOES, lambda: crud_async.get_opcoes_id(db, id_votacao, limit, cursor), schemas.ListaOpcoes)
+
+
+@router.post("/votos/", response_model=schemas.VotoOuMensagem, dependencies=[Depends(limitador.dependencia("votos"))])
+async def criar_voto(voto: schemas.VotoCreate, db: AsyncSession = Depends(get_async_db), idempotency_key: Optional[str] = Header(None)):
+    async def gerar():
+        if INGESTAO_EM_LOTE:
+            return await ingestao_votos.registrar_async(voto)
+        return await crud_async.criar_voto(db, voto)
+    return await idempotencia.responder_async("votos", idempotency_key, voto, gerar, schemas.VotoOuMensagem)
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
-from datetime import datetime
+from typing import List, Literal, Optional, Union
+from datetime import date, datetime
 
 class UserBase(BaseModel):
     nome_completo: str
@@ -47,6 +47,21 @@ class CandidaturaUpdate(BaseModel):
     detalhes: Optional[str]
     status: Optional[str]
 
+class CandidaturaModeracao(BaseModel):
+    id_candidatura: int
+    status: Literal["pendente", "aprovada", "recusada"]
+
+class ModeracaoCandidaturas(BaseModel):
+    itens: List[CandidaturaModeracao]
+
+class ResultadoModeracao(BaseModel):
+    atualizadas: int
+    inalteradas: int
+    opcoes_criadas: int
+    nao_encontradas: List[int]
+    # Aprovações ignoradas: o usuário da candidatura não existe mais
+    sem_candidato: List[int] = []
+
 class VotacaoUpdate(BaseModel):
     status: Optional[str]
     titulo: Optional[str]
@@ -108,4 +123,88 @@ class CandidaturaInfo(BaseModel):
     id_user: int
     detalhes: Optional[str]
     titulo: str
-    nome_completo: str 
+    nome_completo: str
+
+    model_config = {"from_attributes": True}
+
+
+# Respostas. Montadas direto das linhas das consultas (from_attributes lê
+# tanto objetos do ORM quanto as tuplas nomeadas de um select de colunas)
+
+class VotacaoRead(BaseModel):
+    id_votacao: int
+    titulo: Optional[str] = None
+    descricao: Optional[str] = None
+    data_inicio: Optional[date] = None
+    data_fim: Optional[date] = None
+    status: Optional[str] = None
+    permite_candidatura: Optional[bool] = None
+    id_categoria: Optional[int] = None
+
+    model_config = {"from_attributes": True}
+
+
+class VotacaoPainel(VotacaoRead):
+    opcoes: int = 0
+    total_votos: int = 0
+    candidaturas_pendentes: int = 0
+
+
+class OpcaoRead(BaseModel):
+    id_opcao: int
+    titulo: Optional[str] = None
+    detalhes: Optional[str] = None
+    id_votacao: Optional[int] = None
+
+    model_config = {"from_attributes": True}
+
+
+class VotoRead(BaseModel):
+    id_voto: int
+    data_voto: Optional[datetime] = None
+    voto_publico: Optional[bool] = None
+    id_user: Optional[int] = None
+    id_votacao: Optional[int] = None
+    id_opcao: Optional[int] = None
+
+    model_config = {"from_attributes": True}
+
+
+class TotalOpcao(BaseModel):
+    # id_opcao leva o título da opção, como a rota sempre respondeu
+    id_opcao: Optional[str] = None
+    total_votos: int
+
+
+class CandidaturaRead(BaseModel):
+    id_candidatura: int
+    id_votacao: Optional[int] = None
+    id_user: Optional[int] = None
+    detalhes: Optional[str] = None
+    status: Optional[str] = None
+
+    model_config = {"from_attributes": True}
+
+
+class LoginRead(BaseModel):
+    # Sem a senha: o hash não sai na resposta
+    id_login: int
+    id_user: Optional[int] = None
+
+    model_config = {"from_attributes": True}
+
+
+class Mensagem(BaseModel):
+    msg: str
+
+
+# Tipos das respostas das rotas de leitura (também passados ao cache, que
+# serializa com eles). Os Union cobrem os casos em que a rota responde uma
+# mensagem em vez da lista
+ListaVotacoes = List[VotacaoRead]
+Painel = List[VotacaoPainel]
+VotacaoOuNada = Optional[VotacaoRead]
+ListaOpcoes = Union[List[OpcaoRead], Mensagem]
+ListaCandidaturas = List[CandidaturaInfo]
+Totais = Union[List[TotalOpcao], str]
+VotoOuMensagem = Union[VotoRead, Mensagem]
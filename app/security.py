@@ -1,7 +1,114 @@
+import os
+import asyncio
+import threading
+from collections import deque
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
 import bcrypt
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from app.metricas import cronometrar_senha
+
+# O bcrypt roda num pool de processos próprio, para que uma rajada de logins
+# não ocupe o threadpool das requisições nem dispute o GIL com elas.
+#   BCRYPT_ROUNDS   custo dos hashes novos; hashes com outro custo são refeitos no login
+#   SENHA_WORKERS   processos do pool (0 = calcula na própria thread, sem pool)
+#   SENHA_FILA_MAX  tarefas aguardando além das em execução; acima disso responde 503
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+SENHA_WORKERS = int(os.getenv("SENHA_WORKERS", str(os.cpu_count() or 1)))
+SENHA_FILA_MAX = int(os.getenv("SENHA_FILA_MAX", "64"))
+
+_pool = None
+_pool_lock = threading.Lock()
+_vagas = threading.BoundedSemaphore(max(SENHA_WORKERS, 1) + SENHA_FILA_MAX)
+
+
+def _gerar_hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds)).decode()
+
+def _conferir(plain_password: str, hashed_password: str) -> bool:
+    return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: o processo da API tem threads (agendador, ingestão) e fork com threads não é seguro
+                _pool = ProcessPoolExecutor(max_workers=SENHA_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+def encerrar_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+def aquecer_pool():
+    # Sobe todos os processos do pool antes do primeiro login (cada um leva
+    # uma importação inteira do Python com spawn)
+    if SENHA_WORKERS > 0:
+        list(_executor().map(_gerar_hash, ["aquecimento"] * SENHA_WORKERS, [4] * SENHA_WORKERS))
+
+def _submeter(funcao, *args) -> Future:
+    if not _vagas.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, tente novamente",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        futuro = _executor().submit(funcao, *args)
+    except Exception:
+        _vagas.release()
+        raise
+    futuro.add_done_callback(lambda _: _vagas.release())
+    return futuro
+
 
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    with cronometrar_senha("hash"):
+        if SENHA_WORKERS <= 0:
+            return _gerar_hash(password, BCRYPT_ROUNDS)
+        return _submeter(_gerar_hash, password, BCRYPT_ROUNDS).result()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    with cronometrar_senha("verificacao"):
+        if SENHA_WORKERS <= 0:
+            return _conferir(plain_password, hashed_password)
+        return _submeter(_conferir, plain_password, hashed_password).result()
+
+def hash_passwords(passwords, rounds=BCRYPT_ROUNDS):
+    # Lote (importação de usuários): ocupa todos os processos do pool, mas
+    # nunca com mais de SENHA_WORKERS tarefas na fila, para que um login que
+    # chegue no meio espere no máximo uma rodada. Não conta no SENHA_FILA_MAX.
+    if SENHA_WORKERS <= 0:
+        return [_gerar_hash(p, rounds) for p in passwords]
+    hashes, pendentes = [], deque()
+    for password in passwords:
+        if len(pendentes) >= SENHA_WORKERS:
+            hashes.append(pendentes.popleft().result())
+        pendentes.append(_executor().submit(_gerar_hash, password, rounds))
+    hashes.extend(f.result() for f in pendentes)
+    return hashes
+
+async def hash_password_async(password: str) -> str:
+    with cronometrar_senha("hash"):
+        if SENHA_WORKERS <= 0:
+            return await run_in_threadpool(_gerar_hash, password, BCRYPT_ROUNDS)
+        return await asyncio.wrap_future(_submeter(_gerar_hash, password, BCRYPT_ROUNDS))
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    with cronometrar_senha("verificacao"):
+        if SENHA_WORKERS <= 0:
+            return await run_in_threadpool(_conferir, plain_password, hashed_password)
+        return await asyncio.wrap_future(_submeter(_conferir, plain_password, hashed_password))
+
+def precisa_rehash(hashed_password: str) -> bool:
+    # Formato $2b$<custo>$<salt+hash>
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
@@ -0,0 +1,34 @@
+from functools import lru_cache
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy.engine import Row
+from fastapi.encoders import jsonable_encoder
+
+# Serialização das respostas de leitura. Com o modelo da resposta
+# (ex. List[schemas.VotacaoRead]) o pydantic valida as linhas e gera o JSON
+# direto em bytes, sem o jsonable_encoder percorrer cada objeto por reflexão.
+# Sem modelo, fica o caminho genérico via orjson.
+
+
+@lru_cache(maxsize=None)
+def adaptador(modelo):
+    return TypeAdapter(modelo)
+
+
+def _como_dicts(resultado):
+    # Linhas de um select de colunas viram dicts antes da validação: com
+    # from_attributes o pydantic lê cada campo da Row por getattr, bem mais
+    # devagar que validar um dict
+    if isinstance(resultado, Row):
+        return resultado._asdict()
+    if isinstance(resultado, list) and resultado and isinstance(resultado[0], Row):
+        campos = resultado[0]._fields
+        return [dict(zip(campos, linha)) for linha in resultado]
+    return resultado
+
+
+def para_json(resultado, modelo=None) -> bytes:
+    if modelo is None:
+        return orjson.dumps(jsonable_encoder(resultado))
+    tipo = adaptador(modelo)
+    return tipo.dump_json(tipo.validate_python(_como_dicts(resultado), from_attributes=True))
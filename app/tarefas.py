@@ -0,0 +1,154 @@
+import os
+import time
+import uuid
+import queue
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from app import crud
+from app.database import SessionLocal
+
+# Tarefas em segundo plano para reset e exclusão de votações
+# (DELETE /admin/votacoes/{id}/reset e DELETE /admin/votacoes/{id}). Uma
+# thread executa uma tarefa por vez, apagando em lotes de REMOCAO_LOTE linhas
+# com REMOCAO_PAUSA_MS de folga entre eles para as outras escritas passarem.
+# O andamento fica em memória e é lido em GET /admin/tarefas/{id}; com vários
+# workers do uvicorn, a consulta precisa cair no mesmo processo que agendou.
+REMOCAO_LOTE = int(os.getenv("REMOCAO_LOTE", "5000"))
+REMOCAO_PAUSA = float(os.getenv("REMOCAO_PAUSA_MS", "5")) / 1000
+# Tarefas terminadas guardadas para consulta; as mais antigas saem primeiro
+TAREFAS_HISTORICO = int(os.getenv("TAREFAS_HISTORICO", "200"))
+
+OPERACOES = {
+    "reset": crud.resetar_votacao,
+    "exclusao": crud.excluir_votacao,
+}
+
+_PARAR = object()
+
+
+class _Interrompida(Exception):
+    pass
+
+
+class Tarefa:
+    def __init__(self, tipo, id_votacao):
+        self.id = uuid.uuid4().hex
+        self.tipo = tipo
+        self.id_votacao = id_votacao
+        self.estado = "pendente"
+        self.removidos = {}
+        self.lotes = 0
+        # Maior transação de um lote: quanto tempo o lock ficou preso de uma vez
+        self.lote_max_ms = 0.0
+        self.erro = None
+        self.criada = datetime.utcnow()
+        self.iniciada = None
+        self.concluida = None
+
+    @property
+    def ativa(self):
+        return self.estado in ("pendente", "executando")
+
+    def progresso(self, tabela, linhas, segundos):
+        self.removidos[tabela] = self.removidos.get(tabela, 0) + linhas
+        self.lotes += 1
+        self.lote_max_ms = max(self.lote_max_ms, segundos * 1000)
+
+    def como_dict(self):
+        return {
+            "id_tarefa": self.id,
+            "tipo": self.tipo,
+            "id_votacao": self.id_votacao,
+            "estado": self.estado,
+            "removidos": dict(self.removidos),
+            "lotes": self.lotes,
+            "lote_max_ms": round(self.lote_max_ms, 3),
+            "erro": self.erro,
+            "criada": self.criada,
+            "iniciada": self.iniciada,
+            "concluida": self.concluida,
+        }
+
+
+class FilaTarefas:
+    def __init__(self, session_factory=SessionLocal, lote=REMOCAO_LOTE, pausa=REMOCAO_PAUSA, historico=TAREFAS_HISTORICO):
+        self.session_factory = session_factory
+        self.lote = lote
+        self.pausa = pausa
+        self.historico = historico
+        self.fila = queue.Queue()
+        self._tarefas = OrderedDict()
+        self._lock = threading.Lock()
+        self._parando = threading.Event()
+        self._thread = None
+
+    def iniciar(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._parando.clear()
+        self._thread = threading.Thread(target=self._executar, name="tarefas-remocao", daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        # A tarefa em andamento para depois do lote atual ("interrompida"); o
+        # que já foi apagado fica apagado e um novo pedido continua dali, o que
+        # também zera a contagem (ou use python -m app.contagem reconstruir)
+        if self._thread and self._thread.is_alive():
+            self._parando.set()
+            self.fila.put(_PARAR)
+            self._thread.join(timeout=10)
+
+    def agendar(self, tipo, id_votacao) -> Tarefa:
+        with self._lock:
+            # Pedido repetido enquanto o anterior não terminou: devolve o mesmo
+            for tarefa in self._tarefas.values():
+                if tarefa.ativa and tarefa.tipo == tipo and tarefa.id_votacao == id_votacao:
+                    return tarefa
+            tarefa = Tarefa(tipo, id_votacao)
+            self._tarefas[tarefa.id] = tarefa
+            self._podar()
+        self.fila.put(tarefa)
+        return tarefa
+
+    def consultar(self, id_tarefa):
+        return self._tarefas.get(id_tarefa)
+
+    def _podar(self):
+        terminadas = [t.id for t in self._tarefas.values() if not t.ativa]
+        for id_tarefa in terminadas[:max(0, len(terminadas) - self.historico)]:
+            del self._tarefas[id_tarefa]
+
+    def _executar(self):
+        while True:
+            tarefa = self.fila.get()
+            if tarefa is _PARAR:
+                return
+            self.rodar(tarefa)
+
+    def rodar(self, tarefa):
+        def progresso(tabela, linhas, segundos):
+            tarefa.progresso(tabela, linhas, segundos)
+            if self._parando.is_set():
+                raise _Interrompida()
+            if self.pausa:
+                time.sleep(self.pausa)
+
+        tarefa.estado = "executando"
+        tarefa.iniciada = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            OPERACOES[tarefa.tipo](db, tarefa.id_votacao, self.lote, progresso)
+            tarefa.estado = "concluida"
+        except _Interrompida:
+            tarefa.estado = "interrompida"
+        except Exception as e:
+            db.rollback()
+            tarefa.estado = "erro"
+            tarefa.erro = str(e)
+        finally:
+            db.close()
+            tarefa.concluida = datetime.utcnow()
+
+
+tarefas = FilaTarefas()
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import logging
+import asyncio
+import threading
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from fastapi.concurrency import run_in_threadpool
+from app import contagem
+from app.database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Resultados ao vivo (SSE e WebSocket em /votacoes/{id}/votos/stream e /ws).
+# crud.criar_voto, a ingestão em lote e crud.resetar_votacao publicam aqui
+# depois do commit; o hub junta os deltas e, a cada RESULTADOS_TICK_MS,
+# monta um único evento por votação e o entrega a todos os assinantes dela.
+# Cada evento leva os totais completos além dos deltas, então um assinante
+# lento pode perder eventos intermediários sem ficar com a conta errada.
+# A cada RESULTADOS_RESYNC_S os totais são relidos de contagem_voto, o que
+# também cobre votos gravados por outros workers.
+TICK = float(os.getenv("RESULTADOS_TICK_MS", "500")) / 1000
+RESYNC = float(os.getenv("RESULTADOS_RESYNC_S", "30"))
+HEARTBEAT = 15.0
+
+
+def _carregar_totais(id_votacao):
+    db = SessionLocal()
+    try:
+        return contagem.totais_por_opcao(db, id_votacao)
+    finally:
+        db.close()
+
+
+class HubResultados:
+    def __init__(self, tick=TICK, resync=RESYNC, carregar=_carregar_totais):
+        self.tick = tick
+        self.resync = resync
+        self.carregar = carregar
+        # Escrito por threads (crud), lido pelo loop: protegido pelo lock
+        self._lock = threading.Lock()
+        self._pendentes = defaultdict(Counter)
+        self._reiniciar = set()
+        # Só o event loop mexe daqui para baixo
+        self._assinantes = defaultdict(set)
+        self._totais = {}
+        self._sincronizado_em = {}
+        self._tarefa = None
+
+    # --- lado do produtor (qualquer thread) ---
+
+    def publicar(self, id_votacao, id_opcao, quantidade=1):
+        with self._lock:
+            self._pendentes[int(id_votacao)][id_opcao] += quantidade
+
+    def publicar_reset(self, id_votacao):
+        with self._lock:
+            self._reiniciar.add(int(id_votacao))
+
+    # --- ciclo de vida (lifespan) ---
+
+    def iniciar(self):
+        if self._tarefa is None or self._tarefa.done():
+            self._tarefa = asyncio.create_task(self._executar())
+
+    async def parar(self):
+        if self._tarefa is not None:
+            self._tarefa.cancel()
+            try:
+                await self._tarefa
+            except asyncio.CancelledError:
+                pass
+            self._tarefa = None
+
+    # --- assinantes ---
+
+    @asynccontextmanager
+    async def assinar(self, id_votacao):
+        id_votacao = int(id_votacao)
+        # maxsize=1: só o evento mais recente interessa (ele traz os totais)
+        fila = asyncio.Queue(maxsize=1)
+        if id_votacao not in self._totais:
+            await self._sincronizar(id_votacao)
+        fila.put_nowait(self._evento(id_votacao, {}, "totais"))
+        self._assinantes[id_votacao].add(fila)
+        try:
+            yield fila
+        finally:
+            assinantes = self._assinantes.get(id_votacao)
+            if assinantes is not None:
+                assinantes.discard(fila)
+                if not assinantes:
+                    del self._assinantes[id_votacao]
+                    self._totais.pop(id_votacao, None)
+                    self._sincronizado_em.pop(id_votacao, None)
+                    with self._lock:
+                        self._pendentes.pop(id_votacao, None)
+
+    def assinantes(self, id_votacao=None):
+        if id_votacao is None:
+            return sum(len(f) for f in self._assinantes.values())
+        return len(self._assinantes.get(int(id_votacao), ()))
+
+    # --- loop ---
+
+    async def _sincronizar(self, id_votacao):
+        # Os deltas publicados até aqui já estão no banco que vai ser lido:
+        # descartá-los evita somar de novo sobre os totais relidos. (Um voto
+        # publicado entre esta limpeza e a leitura pode ficar de fora ou contar
+        # duas vezes até o próximo resync.)
+        with self._lock:
+            self._pendentes.pop(id_votacao, None)
+        self._totais[id_votacao] = Counter(await run_in_threadpool(self.carregar, id_votacao))
+        self._sincronizado_em[id_votacao] = time.monotonic()
+
+    def _evento(self, id_votacao, deltas, tipo="delta"):
+        return json.dumps({
+            "tipo": tipo,
+            "id_votacao": id_votacao,
+            "deltas": {str(k): v for k, v in deltas.items()},
+            "totais": {str(k): v for k, v in self._totais.get(id_votacao, {}).items()},
+            "ts": time.time(),
+        })
+
+    def _entregar(self, id_votacao, evento):
+        for fila in self._assinantes.get(id_votacao, ()):
+            if fila.full():
+                fila.get_nowait()
+            fila.put_nowait(evento)
+
+    async def rodada(self):
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, defaultdict(Counter)
+            reiniciar, self._reiniciar = self._reiniciar, set()
+
+        agora = time.monotonic()
+        vencidas = {v for v, t in self._sincronizado_em.items() if agora - t >= self.resync}
+        for id_votacao in (reiniciar | vencidas) & self._assinantes.keys():
+            await self._sincronizar(id_votacao)
+            # Relido do banco: os deltas pendentes já estão nos totais
+            deltas = pendentes.pop(id_votacao, {})
+            self._entregar(id_votacao, self._evento(id_votacao, deltas, "totais"))
+
+        for id_votacao, deltas in pendentes.items():
+            # Sem totais: votação sem assinante ou com a primeira leitura em
+            # andamento (que já vai trazer estes votos)
+            if id_votacao not in self._assinantes or id_votacao not in self._totais:
+                continue
+            self._totais[id_votacao].update(deltas)
+            # Um json.dumps por votação por tick, não por assinante
+            self._entregar(id_votacao, self._evento(id_votacao, deltas))
+
+    async def _executar(self):
+        while True:
+            inicio = time.monotonic()
+            try:
+                await self.rodada()
+            except Exception:
+                logger.exception("Erro no hub de resultados")
+            await asyncio.sleep(max(0.0, self.tick - (time.monotonic() - inicio)))
+
+
+hub = HubResultados()
@@ -0,0 +1,48 @@
+# Custo por requisição da dependência de autenticação (get_current_user +
+# admin_required): consulta ao banco em toda chamada, cache de usuários e
+# modo só com claims.
+#
+#   python -m benchmarks.auth_dependencia --repeticoes 5000
+import argparse
+
+from benchmarks import comum
+from app import models, auth
+from app.database import SessionLocal, engine
+from app.token import criar_token_acesso
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=5000)
+    args = parser.parse_args()
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"nome_completo": f"U{i}", "email": f"u{i}@bench", "cpf": str(i), "user_type": "admin"} for i in range(10000)])
+    token = criar_token_acesso({"id": "5000", "email": "u4999@bench", "user_type": "admin", "nome_completo": "U4999"})
+
+    def chamada():
+        db = SessionLocal()
+        try:
+            auth.admin_required(auth.get_current_user(token, db))
+        finally:
+            db.close()
+
+    resultado = {}
+
+    # Sem cache: TTL zero faz toda chamada ir ao banco, como antes
+    auth.principais = auth.CachePrincipais(ttl=0)
+    resultado["consulta_por_requisicao"] = comum.medir(chamada, args.repeticoes)
+
+    auth.principais = auth.CachePrincipais()
+    resultado["cache_de_usuarios"] = comum.medir(chamada, args.repeticoes)
+
+    auth.AUTH_SOMENTE_CLAIMS = True
+    resultado["somente_claims"] = comum.medir(chamada, args.repeticoes)
+
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
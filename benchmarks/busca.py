@@ -0,0 +1,108 @@
+# Busca de votações (GET /votacoes/busca, app/busca.py): LIKE em ordem de id,
+# que varre a tabela, contra o índice FTS5 com ranking bm25, em tabelas de
+# tamanhos crescentes. Títulos e descrições sorteados de um vocabulário de
+# --vocabulario palavras; mede um termo raro, um comum e dois termos juntos,
+# primeira página e página seguinte pelo cursor. O FTS5 roda sem limite de
+# candidatos ranqueados (o padrão) e com BUSCA_MAX_CANDIDATOS=--candidatos.
+#
+#   python -m benchmarks.busca --tamanhos 10000 100000 1000000 --repeticoes 20 --candidatos 5000
+#
+# Só SQLite: o caminho do Postgres (tsvector + GIN) não é medido aqui.
+import time
+import random
+import itertools
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+from app import crud, models, busca
+from app.database import SessionLocal, engine
+
+LOTE = 50000
+
+
+def palavra(i):
+    return f"termo{i}"
+
+
+def semear(quantidade, vocabulario, seed=42):
+    # Frequência das palavras segue Zipf: palavra(0) é a mais comum
+    rng = random.Random(seed)
+    acumulados = list(itertools.accumulate(1 / (i + 1) for i in range(vocabulario)))
+    palavras = [palavra(i) for i in range(vocabulario)]
+
+    def texto(k):
+        return " ".join(rng.choices(palavras, cum_weights=acumulados, k=k))
+
+    models.Base.metadata.drop_all(bind=engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP TABLE IF EXISTS votacao_busca")
+    busca._com_indice.clear()
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        for inicio in range(0, quantidade, LOTE):
+            fim = min(inicio + LOTE, quantidade)
+            conn.execute(models.Votacao.__table__.insert(), [
+                {
+                    "titulo": texto(4),
+                    "descricao": texto(20),
+                    "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=30),
+                    "permite_candidatura": False,
+                }
+                for _ in range(inicio, fim)
+            ])
+
+
+def medir_consultas(db, consultas, repeticoes):
+    resultado = {}
+    for nome, consulta in consultas.items():
+        pagina = crud.buscar_votacoes(db, consulta, limit=10)
+        cursor = getattr(pagina, "proximo_cursor", None)
+        resultado[nome] = {
+            "primeira_pagina": comum.medir(lambda: crud.buscar_votacoes(db, consulta, limit=10), repeticoes),
+        }
+        if cursor:
+            resultado[nome]["pagina_seguinte"] = comum.medir(lambda: crud.buscar_votacoes(db, consulta, limit=10, cursor=cursor), repeticoes)
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--vocabulario", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--candidatos", type=int, default=5000, help="BUSCA_MAX_CANDIDATOS da rodada com limite")
+    args = parser.parse_args()
+
+    consultas = {
+        "raro": palavra(args.vocabulario - 1),
+        "comum": palavra(0),
+        "dois_termos": f"{palavra(0)} {palavra(50)}",
+    }
+    resultado = {"vocabulario": args.vocabulario, "tamanhos": {}}
+    for quantidade in args.tamanhos:
+        semear(quantidade, args.vocabulario)
+        db = SessionLocal()
+        try:
+            like = medir_consultas(db, consultas, args.repeticoes)
+            inicio = time.perf_counter()
+            busca.criar(engine)
+            criacao = time.perf_counter() - inicio
+            fts = medir_consultas(db, consultas, args.repeticoes)
+            padrao, busca.BUSCA_MAX_CANDIDATOS = busca.BUSCA_MAX_CANDIDATOS, args.candidatos
+            try:
+                fts_limitado = medir_consultas(db, consultas, args.repeticoes)
+            finally:
+                busca.BUSCA_MAX_CANDIDATOS = padrao
+        finally:
+            db.close()
+        resultado["tamanhos"][str(quantidade)] = {
+            "like": like, "fts5": fts, "fts5_limitado": fts_limitado, "criar_indice_s": round(criacao, 2),
+        }
+        print(quantidade, "ok", flush=True)
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
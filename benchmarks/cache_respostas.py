@@ -0,0 +1,88 @@
+# Listagens de leitura com e sem o cache de respostas (app/cache_respostas.py).
+# Tráfego misto sobre /votacoes, /votacoes/{id}, /votacoes/{id}/opcoes,
+# /opcoes e /candidaturas, com as rotas mais populares pedidas mais vezes.
+# Uma parte dos clientes revalida com If-None-Match, e a cada --escrita-cada
+# leituras uma opção é alterada.
+#
+#   python -m benchmarks.cache_respostas --requisicoes 5000 --escrita-cada 200
+import random
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+from fastapi.testclient import TestClient
+from app import models, crud, schemas
+from app.database import SessionLocal, engine
+from app.main import app
+from app.cache_respostas import cache_respostas
+
+
+def semear(votacoes):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"nome_completo": f"U{i}", "cpf": str(i), "email": f"u{i}@bench.com", "user_type": "user"} for i in range(200)])
+        conn.execute(models.Votacao.__table__.insert(), [
+            {"titulo": f"V{i}", "descricao": "x" * 200, "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=30), "permite_candidatura": True}
+            for i in range(votacoes)
+        ])
+        conn.execute(models.Opcoes.__table__.insert(), [{"id_votacao": i % votacoes + 1, "titulo": f"O{i}", "detalhes": "y" * 100} for i in range(votacoes * 5)])
+        conn.execute(models.Candidatura.__table__.insert(), [{"id_votacao": i % votacoes + 1, "id_user": i % 200 + 1, "detalhes": "z", "status": "pendente"} for i in range(votacoes * 2)])
+
+
+def rotas(votacoes):
+    # Poucas rotas quentes e uma cauda longa de páginas de detalhe
+    quentes = ["/votacoes", "/votacoes/open", "/opcoes", "/candidaturas", "/candidaturas/pendentes"]
+    cauda = [f"/votacoes/{i}" for i in range(1, votacoes + 1)] + [f"/votacoes/{i}/opcoes" for i in range(1, votacoes + 1)]
+    return quentes, cauda
+
+
+def rodar(client, args, quentes, cauda):
+    random.seed(42)
+    etags = {}
+    amostras, status = [], {200: 0, 304: 0}
+    db = SessionLocal()
+    try:
+        for i in range(args.requisicoes):
+            if args.escrita_cada and i and i % args.escrita_cada == 0:
+                crud.atualizar_opcao(db, random.randint(1, 5), schemas.OpcaoUpdate(titulo=f"O{i}", detalhes="y" * 100))
+            rota = random.choice(quentes) if random.random() < 0.8 else random.choice(cauda)
+            cabecalhos = {}
+            if rota in etags and random.random() < args.revalidacao:
+                cabecalhos["If-None-Match"] = etags[rota]
+            inicio = time.perf_counter()
+            resposta = client.get(rota, headers=cabecalhos)
+            amostras.append((time.perf_counter() - inicio) * 1000)
+            status[resposta.status_code] = status.get(resposta.status_code, 0) + 1
+            if "etag" in resposta.headers:
+                etags[rota] = resposta.headers["etag"]
+    finally:
+        db.close()
+    return {"latencia": comum.percentis(amostras), "status": status}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votacoes", type=int, default=500)
+    parser.add_argument("--requisicoes", type=int, default=5000)
+    parser.add_argument("--escrita-cada", type=int, default=200)
+    parser.add_argument("--revalidacao", type=float, default=0.5, help="fração das leituras que manda If-None-Match")
+    args = parser.parse_args()
+
+    semear(args.votacoes)
+    quentes, cauda = rotas(args.votacoes)
+    resultado = {"requisicoes": args.requisicoes, "escrita_cada": args.escrita_cada}
+    with TestClient(app) as client:
+        cache_respostas.ativo = False
+        resultado["sem_cache"] = rodar(client, args, quentes, cauda)
+        cache_respostas.ativo = True
+        cache_respostas.limpar()
+        resultado["com_cache"] = rodar(client, args, quentes, cauda)
+        resultado["com_cache"]["cache"] = cache_respostas.estatisticas()
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
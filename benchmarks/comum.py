@@ -0,0 +1,62 @@
+import os
+import sys
+import json
+import subprocess
+import time
+import tempfile
+import statistics
+
+# Os módulos do app leem DATABASE_URL/SECRET_KEY na importação; importe este
+# módulo antes de qualquer "from app import ...".
+if not os.getenv("DATABASE_URL"):
+    _arquivo = os.path.join(tempfile.mkdtemp(prefix="votaai-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{_arquivo}"
+os.environ.setdefault("SECRET_KEY", "bench-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+# Os benchmarks disparam muitas requisições de um IP só; o limite de taxa
+# (app/limites.py) fica desligado, exceto onde ele é o que se mede
+os.environ.setdefault("LIMITES", "0")
+
+
+def percentis(amostras_ms):
+    ordenadas = sorted(amostras_ms)
+    if not ordenadas:
+        return {"n": 0}
+
+    def p(q):
+        return round(ordenadas[min(len(ordenadas) - 1, int(q * len(ordenadas)))], 3)
+
+    return {
+        "n": len(ordenadas),
+        "media_ms": round(statistics.fmean(ordenadas), 3),
+        "p50_ms": p(0.50),
+        "p95_ms": p(0.95),
+        "p99_ms": p(0.99),
+        "max_ms": round(ordenadas[-1], 3),
+    }
+
+
+def medir(funcao, repeticoes):
+    amostras = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        amostras.append((time.perf_counter() - inicio) * 1000)
+    return percentis(amostras)
+
+
+def imprimir(resultado):
+    print(json.dumps(resultado, indent=2, ensure_ascii=False, default=str))
+
+
+def rodar_filho(modulo, argumentos, **env):
+    # Roda "python -m <modulo> --filho ..." com variáveis de ambiente extras e
+    # devolve o JSON da última linha da saída. Necessário quando a opção
+    # medida é lida na importação do app.
+    saida = subprocess.run(
+        [sys.executable, "-m", modulo, "--filho", *map(str, argumentos)],
+        env=dict(os.environ, **env), capture_output=True, text=True,
+    )
+    if saida.returncode != 0:
+        raise RuntimeError(f"{modulo} falhou:\n{saida.stderr}")
+    return json.loads(saida.stdout.strip().splitlines()[-1])
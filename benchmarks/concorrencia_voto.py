@@ -0,0 +1,69 @@
+# Checagem de concorrência: várias threads votam ao mesmo tempo pelo mesmo
+# usuário na mesma votação; exatamente um voto pode ser gravado.
+#
+#   python -m benchmarks.concorrencia_voto --threads 16 --rodadas 50
+import sys
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import comum
+from app import crud, models, schemas, contagem
+from app.database import SessionLocal, engine
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rodadas", type=int, default=50)
+    args = parser.parse_args()
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    falhas = []
+    erros = 0
+    with ThreadPoolExecutor(args.threads) as pool:
+        for id_user in range(1, args.rodadas + 1):
+            largada = threading.Barrier(args.threads)
+
+            def votar(_, id_user=id_user, largada=largada):
+                largada.wait()
+                db = SessionLocal()
+                try:
+                    return crud.criar_voto(db, schemas.VotoCreate(id_user=id_user, id_votacao=1, id_opcao=1, data_voto=datetime.utcnow()))
+                except Exception as e:
+                    return e
+                finally:
+                    db.close()
+
+            resultados = list(pool.map(votar, range(args.threads)))
+            erros += sum(isinstance(r, Exception) for r in resultados)
+
+            db = SessionLocal()
+            try:
+                gravados = db.query(models.Voto).filter(models.Voto.id_user == id_user, models.Voto.id_votacao == 1).count()
+            finally:
+                db.close()
+            if gravados != 1:
+                falhas.append({"id_user": id_user, "votos_gravados": gravados})
+
+    db = SessionLocal()
+    try:
+        divergencias = contagem.verificar(db)
+    finally:
+        db.close()
+
+    comum.imprimir({
+        "rodadas": args.rodadas,
+        "threads": args.threads,
+        "falhas": falhas,
+        "erros_do_banco": erros,
+        "divergencias_de_contagem": divergencias,
+    })
+    sys.exit(1 if falhas or divergencias else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+# Checagem de consistência: aplica votos e resets aleatórios pelo crud e
+# compara contagem_voto com o GROUP BY sobre voto (contagem.verificar).
+#
+#   python -m benchmarks.consistencia_contagem --usuarios 500 --votacoes 5
+import sys
+import time
+import random
+import argparse
+from datetime import datetime
+
+from benchmarks import comum
+from app import crud, models, schemas, contagem
+from app.database import SessionLocal, engine
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=500)
+    parser.add_argument("--votacoes", type=int, default=5)
+    parser.add_argument("--opcoes", type=int, default=4)
+    parser.add_argument("--resets", type=int, default=3)
+    args = parser.parse_args()
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        opcoes = {}
+        for v in range(args.votacoes):
+            votacao = crud.criar_votacao(db, schemas.VotacaoCreate(titulo=f"V{v}", descricao=None, permite_candidatura=False, data_inicio=datetime.utcnow(), data_fim=datetime.utcnow()))
+            opcoes[votacao.id_votacao] = [crud.criar_opcao(db, schemas.OpcaoCreate(id_votacao=votacao.id_votacao, titulo=f"O{o}", detalhes=None)).id_opcao for o in range(args.opcoes)]
+
+        inicio = time.perf_counter()
+        votos = 0
+        resets = set(random.sample(range(args.usuarios), min(args.resets, args.usuarios)))
+        for id_user in range(1, args.usuarios + 1):
+            for id_votacao, ids in opcoes.items():
+                # Repete parte dos votos para exercitar o caminho de duplicado
+                for _ in range(random.choice([1, 1, 2])):
+                    crud.criar_voto(db, schemas.VotoCreate(id_user=id_user, id_votacao=id_votacao, id_opcao=random.choice(ids), data_voto=datetime.utcnow()))
+                    votos += 1
+            if id_user in resets:
+                crud.resetar_votacao(db, random.choice(list(opcoes)))
+
+        divergencias = contagem.verificar(db)
+        comum.imprimir({
+            "tentativas_de_voto": votos,
+            "segundos": round(time.perf_counter() - inicio, 2),
+            "divergencias": divergencias,
+        })
+        sys.exit(1 if divergencias else 0)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# Contenção no contador de uma opção muito votada: --threads escritores
+# gravam votos (crud.criar_voto) na mesma opção da mesma votação, com o
+# contador em 1 linha e em --shards linhas (app/contagem.py). Mede vazão e
+# latência do voto, o custo da leitura dos resultados com as linhas
+# fragmentadas e o "dobrar" no fim.
+#
+# O ganho esperado é em bancos com lock por linha (Postgres: exporte
+# DATABASE_URL). No SQLite a escrita já é serializada no banco inteiro, então
+# os dois modos devem empatar na escrita.
+#
+#   python -m benchmarks.contagem_shards --threads 16 --votos 4000 --shards 16
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+from app import crud, models, schemas, contagem
+from app.database import SessionLocal, engine
+
+
+def semear():
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.Votacao.__table__.insert(), [{"titulo": "Quente", "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=1)}])
+        conn.execute(models.Opcoes.__table__.insert(), [{"titulo": f"O{i}", "id_votacao": 1} for i in range(2)])
+
+
+def escrever(threads, votos):
+    latencias = []
+    proximo = iter(range(1, votos + 1))
+    lock = threading.Lock()
+
+    def escritor():
+        db = SessionLocal()
+        amostras = []
+        try:
+            while True:
+                with lock:
+                    usuario = next(proximo, None)
+                if usuario is None:
+                    break
+                # 90% dos votos na mesma opção: é essa linha que vira gargalo
+                voto = schemas.VotoCreate(id_user=usuario, id_votacao=1, id_opcao=1 if usuario % 10 else 2, data_voto=datetime.utcnow())
+                inicio = time.perf_counter()
+                crud.criar_voto(db, voto)
+                amostras.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            db.close()
+            with lock:
+                latencias.extend(amostras)
+
+    inicio = time.perf_counter()
+    grupo = [threading.Thread(target=escritor) for _ in range(threads)]
+    for t in grupo:
+        t.start()
+    for t in grupo:
+        t.join()
+    duracao = time.perf_counter() - inicio
+    return {"votos_por_s": round(votos / duracao, 1), "voto": comum.percentis(latencias)}
+
+
+def rodar(shards, threads, votos, leituras):
+    semear()
+    contagem.CONTAGEM_SHARDS = shards
+    resultado = escrever(threads, votos)
+
+    db = SessionLocal()
+    try:
+        resultado["linhas_contagem"] = db.query(models.ContagemVoto).count()
+        resultado["leitura"] = comum.medir(lambda: crud.get_votos_votacao(db, 1), leituras)
+        inicio = time.perf_counter()
+        juntadas = contagem.dobrar(db)
+        resultado["dobrar"] = {"linhas": juntadas, "ms": round((time.perf_counter() - inicio) * 1000, 3)}
+        resultado["divergencias"] = len(contagem.verificar(db))
+    finally:
+        db.close()
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--votos", type=int, default=4000)
+    parser.add_argument("--shards", type=int, default=16)
+    parser.add_argument("--leituras", type=int, default=500)
+    args = parser.parse_args()
+
+    resultado = {"dialeto": engine.dialect.name, "threads": args.threads, "votos": args.votos}
+    resultado["1_shard"] = rodar(1, args.threads, args.votos, args.leituras)
+    resultado[f"{args.shards}_shards"] = rodar(args.shards, args.threads, args.votos, args.leituras)
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+# Exportação dos votos de uma votação com muitos votos: pico de memória (RSS)
+# e linhas por segundo do gerador em streaming (app/exportacao.py) contra o
+# jeito antigo (carregar todos os objetos Voto e escrever depois). Cada modo
+# roda num subprocesso para o pico de RSS de um não contaminar o outro.
+#
+#   python -m benchmarks.exportacao_votos --votos 10000000
+import os
+import io
+import csv
+import sys
+import json
+import time
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+
+
+def semear(votos):
+    from app import models
+    from app.database import engine
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.Votacao.__table__.insert(), [{"titulo": "Auditoria", "status": "fechada", "data_inicio": agora, "data_fim": agora + timedelta(days=1), "permite_candidatura": False}])
+        conn.execute(models.Opcoes.__table__.insert(), [{"id_votacao": 1, "titulo": f"O{i}"} for i in range(10)])
+        lote = 200000
+        for inicio in range(0, votos, lote):
+            conn.execute(models.Voto.__table__.insert(), [
+                {"id_user": i + 1, "id_votacao": 1, "id_opcao": i % 10 + 1, "data_voto": agora, "voto_publico": False}
+                for i in range(inicio, min(inicio + lote, votos))
+            ])
+
+
+def legado():
+    # Como era: todos os objetos ORM em memória antes de escrever a primeira linha
+    from app import models
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        votos = db.query(models.Voto).filter(models.Voto.id_votacao == 1).all()
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer)
+        escritor.writerow(["id_voto", "id_votacao", "id_opcao", "id_user", "data_voto", "voto_publico"])
+        for v in votos:
+            escritor.writerow([v.id_voto, v.id_votacao, v.id_opcao, v.id_user, v.data_voto.isoformat(), v.voto_publico])
+            if buffer.tell() > 1 << 20:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    finally:
+        db.close()
+
+
+def _rss_mb(campo):
+    # VmHWM: pico de RSS do processo; VmRSS: atual. Linux, em kB
+    with open("/proc/self/status") as status:
+        for linha in status:
+            if linha.startswith(campo + ":"):
+                return round(int(linha.split()[1]) / 1024, 1)
+
+
+def filho(modo, formato):
+    from app import exportacao
+
+    rss_inicial = _rss_mb("VmRSS")
+    gerador = legado() if modo == "legado" else exportacao.exportar(1, formato)
+    inicio = time.perf_counter()
+    linhas = bytes_ = 0
+    # Os pedaços são descartados como um servidor faria depois de enviá-los
+    for pedaco in gerador:
+        linhas += pedaco.count("\n")
+        bytes_ += len(pedaco)
+    duracao = time.perf_counter() - inicio
+    if formato == "csv":
+        linhas -= 1  # cabeçalho
+    print(json.dumps({
+        "linhas": linhas,
+        "mb": round(bytes_ / 2**20, 1),
+        "segundos": round(duracao, 2),
+        "linhas_por_s": round(linhas / duracao),
+        "rss_antes_mb": rss_inicial,
+        "rss_pico_mb": _rss_mb("VmHWM"),
+    }))
+
+
+def main():
+    if "--filho" in sys.argv:
+        modo, formato = sys.argv[2:4]
+        filho(modo, formato)
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votos", type=int, default=10000000)
+    parser.add_argument("--sem-legado", action="store_true", help="pula o modo antigo (precisa de vários GB com 10M votos)")
+    args = parser.parse_args()
+
+    semear(args.votos)
+    resultado = {"votos": args.votos}
+    modos = [("streaming", "csv"), ("streaming", "ndjson")]
+    if not args.sem_legado:
+        modos.append(("legado", "csv"))
+    for modo, formato in modos:
+        resultado[f"{modo}_{formato}"] = comum.rodar_filho("benchmarks.exportacao_votos", [modo, formato], DATABASE_URL=os.environ["DATABASE_URL"])
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
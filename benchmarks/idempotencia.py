@@ -0,0 +1,105 @@
+# Tempestade de repetições: cada cliente manda um cadastro e um voto e, como
+# se tivesse dado timeout, repete cada um --repeticoes vezes enquanto o
+# original ainda está em andamento. Sem Idempotency-Key toda repetição roda o
+# caminho inteiro (crud, banco e, no cadastro, o bcrypt) até esbarrar na
+# checagem de duplicado; com a chave, as repetições esperam a primeira
+# execução e recebem a resposta guardada (app/idempotencia.py).
+# Conta comandos SQL e hashes de senha, além da latência.
+#
+#   python -m benchmarks.idempotencia --clientes 50 --repeticoes 4 --threads 16
+import time
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import comum
+from fastapi.testclient import TestClient
+from app import models, metricas
+from app.database import engine
+from app.instrumentacao import estatisticas
+from app.idempotencia import idempotencia
+from app.main import app
+
+
+def semear():
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.Votacao.__table__.insert(), [{"titulo": "V", "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=1)}])
+        conn.execute(models.Opcoes.__table__.insert(), [{"titulo": f"O{i}", "id_votacao": 1} for i in range(4)])
+
+
+def _hashes():
+    serie = metricas.senha_duracao._series.get(("hash",))
+    return sum(serie[0]) if serie else 0
+
+
+def _comandos_sql():
+    return sum(dados[0] for dados in estatisticas.consultas.values())
+
+
+def requisicoes(clientes, repeticoes, com_chave):
+    # As tentativas de um cliente ficam juntas na fila para se sobreporem
+    lista = []
+    for i in range(clientes):
+        usuario = {"nome_completo": f"Usuário {i}", "cpf": f"{i:011d}", "email": f"u{i}@bench.com", "user_type": "user", "senha": "bench-senha"}
+        voto = {"id_user": i + 1, "id_votacao": 1, "id_opcao": 1 + i % 4, "data_voto": "2026-01-01T00:00:00"}
+        for rota, corpo in (("/cadastro/", usuario), ("/votos/", voto)):
+            cabecalhos = {"Idempotency-Key": f"{rota}{i}"} if com_chave else {}
+            lista.extend([(rota, corpo, cabecalhos)] * (1 + repeticoes))
+    return lista
+
+
+def rodar(cliente, clientes, repeticoes, threads, com_chave):
+    semear()
+    idempotencia.limpar()
+    estatisticas.zerar()
+    hashes = _hashes()
+    latencias = {"/cadastro/": [], "/votos/": []}
+    status = {}
+
+    def enviar(pedido):
+        rota, corpo, cabecalhos = pedido
+        inicio = time.perf_counter()
+        resposta = cliente.post(rota, json=corpo, headers=cabecalhos)
+        return rota, (time.perf_counter() - inicio) * 1000, resposta.status_code
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        for rota, ms, codigo in pool.map(enviar, requisicoes(clientes, repeticoes, com_chave)):
+            latencias[rota].append(ms)
+            status[codigo] = status.get(codigo, 0) + 1
+    duracao = time.perf_counter() - inicio
+
+    with engine.connect() as conn:
+        usuarios = conn.execute(models.User.__table__.select()).fetchall()
+        votos = conn.execute(models.Voto.__table__.select()).fetchall()
+    return {
+        "duracao_s": round(duracao, 3),
+        "cadastro": comum.percentis(latencias["/cadastro/"]),
+        "voto": comum.percentis(latencias["/votos/"]),
+        "status": status,
+        "hashes_senha": _hashes() - hashes,
+        "comandos_sql": _comandos_sql(),
+        "usuarios_gravados": len(usuarios),
+        "votos_gravados": len(votos),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clientes", type=int, default=50)
+    parser.add_argument("--repeticoes", type=int, default=4, help="repetições por requisição original")
+    parser.add_argument("--threads", type=int, default=16)
+    args = parser.parse_args()
+
+    resultado = {"clientes": args.clientes, "repeticoes": args.repeticoes, "threads": args.threads}
+    with TestClient(app) as cliente:
+        resultado["sem_chave"] = rodar(cliente, args.clientes, args.repeticoes, args.threads, com_chave=False)
+        resultado["com_chave"] = rodar(cliente, args.clientes, args.repeticoes, args.threads, com_chave=True)
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# Busca de login e checagem de duplicidade no cadastro com muitos usuários:
+# consultas antigas (duas buscas sem índice) contra a consulta única pelos
+# índices normalizados. Mede só a parte de banco; o bcrypt fica de fora.
+#
+#   python -m benchmarks.identidade_login --usuarios 1000000 --repeticoes 50
+import random
+import argparse
+
+from benchmarks import comum
+from app import crud, models
+from app.database import SessionLocal, engine
+from app.identidade import normalizar_email, normalizar_cpf
+from sqlalchemy import or_
+
+
+def buscar_login_legado(db, username):
+    result = db.query(models.User, models.Login).join(models.Login, models.Login.id_user == models.User.id_user).filter(models.User.email == username).first()
+    if not result:
+        result = db.query(models.User, models.Login).join(models.Login, models.Login.id_user == models.User.id_user).filter(models.User.cpf == username).first()
+    return result
+
+
+def cadastro_legado(db, email, cpf):
+    return db.query(models.User).filter(models.User.email == email).first()
+
+
+def cadastro_atual(db, email, cpf):
+    return db.query(models.EMAIL_NORMALIZADO).filter(or_(models.EMAIL_NORMALIZADO == normalizar_email(email), models.CPF_NORMALIZADO == normalizar_cpf(cpf))).first()
+
+
+def cpf(i):
+    d = f"{i:011d}"
+    return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+
+
+def semear(usuarios):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    lote = 100000
+    with engine.begin() as conn:
+        for inicio in range(0, usuarios, lote):
+            faixa = range(inicio, min(inicio + lote, usuarios))
+            conn.execute(models.User.__table__.insert(), [{"nome_completo": f"U{i}", "cpf": cpf(i), "email": f"u{i}@bench.com", "user_type": "user"} for i in faixa])
+            conn.execute(models.Login.__table__.insert(), [{"id_user": i + 1, "senha": "x"} for i in faixa])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=1000000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    args = parser.parse_args()
+
+    semear(args.usuarios)
+    amostra = lambda: random.randrange(args.usuarios)
+
+    db = SessionLocal()
+    try:
+        casos = {
+            "login_email": lambda f: f(db, f"u{amostra()}@bench.com"),
+            "login_cpf": lambda f: f(db, cpf(amostra())),
+            "login_inexistente": lambda f: f(db, "ninguem@bench.com"),
+        }
+        resultado = {"usuarios": args.usuarios, "antes": {}, "depois": {}}
+        for nome, caso in casos.items():
+            resultado["antes"][nome] = comum.medir(lambda: caso(buscar_login_legado), args.repeticoes)
+            resultado["depois"][nome] = comum.medir(lambda: caso(crud._buscar_login), args.repeticoes)
+        resultado["antes"]["cadastro_checagem"] = comum.medir(lambda: cadastro_legado(db, "novo@bench.com", "999.999.999-99"), args.repeticoes)
+        resultado["depois"]["cadastro_checagem"] = comum.medir(lambda: cadastro_atual(db, "novo@bench.com", "999.999.999-99"), args.repeticoes)
+    finally:
+        db.close()
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
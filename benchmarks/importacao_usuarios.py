@@ -0,0 +1,113 @@
+# Vazão da importação em massa de usuários (app/importacao.py) contra o
+# cadastro linha a linha (crud.create_user_with_login, como faz POST
+# /cadastro/). O banco começa com --existentes usuários e uma parte das linhas
+# do arquivo repete e-mails já cadastrados. O custo do bcrypt vem de
+# BCRYPT_ROUNDS e os processos de SENHA_WORKERS, como na API.
+# --malformadas linhas do CSV têm um campo a mais que o cabeçalho: cada uma
+# tem de sair no relatório como erro da sua linha, sem parar a importação
+# (sai com 1 se não sair).
+#
+#   python -m benchmarks.importacao_usuarios --usuarios 20000 --legado 200 --malformadas 10
+import io
+import sys
+import time
+import random
+import argparse
+
+from benchmarks import comum
+from app import crud, models, schemas, importacao
+from app.database import SessionLocal, engine
+from app.security import BCRYPT_ROUNDS, SENHA_WORKERS, encerrar_pool
+
+
+def semear(existentes):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        for inicio in range(0, existentes, 100000):
+            faixa = range(inicio, min(inicio + 100000, existentes))
+            conn.execute(models.User.__table__.insert(), [{"nome_completo": f"E{i}", "cpf": f"9{i:010d}", "email": f"e{i}@bench.com", "user_type": "user"} for i in faixa])
+            conn.execute(models.Login.__table__.insert(), [{"id_user": i + 1, "senha": "x"} for i in faixa])
+
+
+def linhas(prefixo, quantidade, existentes, duplicados):
+    random.seed(7)
+    for i in range(quantidade):
+        if existentes and random.random() < duplicados:
+            email = f"e{random.randrange(existentes)}@bench.com"
+        else:
+            email = f"{prefixo}{i}@bench.com"
+        yield {"nome_completo": f"N{i}", "cpf": f"{prefixo}-{i:09d}", "email": email, "user_type": "user", "senha": f"senha{i}"}
+
+
+def legado(quantidade, existentes, duplicados):
+    db = SessionLocal()
+    importados = 0
+    try:
+        inicio = time.perf_counter()
+        for dados in linhas("l", quantidade, existentes, duplicados):
+            try:
+                crud.create_user_with_login(db, schemas.UserCreate(**dados), dados["senha"])
+                importados += 1
+            except Exception:
+                db.rollback()
+        duracao = time.perf_counter() - inicio
+    finally:
+        db.close()
+    return {"linhas": quantidade, "importados": importados, "segundos": round(duracao, 2), "linhas_por_s": round(quantidade / duracao, 1)}
+
+
+def em_massa(quantidade, existentes, duplicados, lote, malformadas=0):
+    # As malformadas ficam espalhadas pelo arquivo; guarda o número da linha
+    # (o cabeçalho é a linha 1)
+    passo = max(1, quantidade // malformadas) if malformadas else 0
+    numeros = []
+    arquivo = io.StringIO()
+    arquivo.write("nome_completo,cpf,email,user_type,senha\n")
+    for i, d in enumerate(linhas("m", quantidade, existentes, duplicados)):
+        extra = ""
+        if passo and i % passo == passo // 2 and len(numeros) < malformadas:
+            extra = ",sobrando"
+            numeros.append(i + 2)
+        arquivo.write(f"{d['nome_completo']},{d['cpf']},{d['email']},{d['user_type']},{d['senha']}{extra}\n")
+    binario = io.BytesIO(arquivo.getvalue().encode())
+
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        relatorio = importacao.importar_arquivo(db, binario, "csv", lote)
+        duracao = time.perf_counter() - inicio
+    finally:
+        db.close()
+    reportadas = [e["linha"] for e in relatorio["erros"] if e["erro"] == importacao.MSG_COLUNAS_A_MAIS]
+    return {
+        "linhas": relatorio["linhas"], "importados": relatorio["importados"], "erros": len(relatorio["erros"]),
+        "segundos": round(duracao, 2), "linhas_por_s": round(quantidade / duracao, 1),
+        "malformadas_reportadas": reportadas == numeros,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=20000)
+    parser.add_argument("--legado", type=int, default=200, help="linhas pelo caminho antigo (é lento: uma a uma)")
+    parser.add_argument("--existentes", type=int, default=100000)
+    parser.add_argument("--duplicados", type=float, default=0.05)
+    parser.add_argument("--lote", type=int, default=importacao.IMPORTACAO_LOTE)
+    parser.add_argument("--malformadas", type=int, default=10, help="linhas com um campo a mais que o cabeçalho")
+    args = parser.parse_args()
+
+    semear(args.existentes)
+    resultado = {"bcrypt_rounds": BCRYPT_ROUNDS, "senha_workers": SENHA_WORKERS, "existentes": args.existentes}
+    try:
+        resultado["legado"] = legado(args.legado, args.existentes, args.duplicados)
+        resultado["em_massa"] = em_massa(args.usuarios, args.existentes, args.duplicados, args.lote, args.malformadas)
+    finally:
+        encerrar_pool()
+    resultado["aceleracao"] = round(resultado["em_massa"]["linhas_por_s"] / resultado["legado"]["linhas_por_s"], 1)
+    comum.imprimir(resultado)
+    sys.exit(0 if resultado["em_massa"]["malformadas_reportadas"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# Vazão de votos: crud.criar_voto (um commit por voto) contra a ingestão em
+# lote (app/ingestao.py), com vários "requests" concorrentes.
+#
+#   python -m benchmarks.ingestao_votos --votos 20000 --threads 32 --lote 200 --espera-ms 5
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks import comum
+from app import crud, models, schemas
+from app.database import SessionLocal, engine
+from app.ingestao import IngestaoVotos
+
+
+def preparar(opcoes=4):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        votacao = crud.criar_votacao(db, schemas.VotacaoCreate(titulo="Bench", descricao=None, permite_candidatura=False, data_inicio=datetime.utcnow(), data_fim=datetime.utcnow()))
+        ids = [crud.criar_opcao(db, schemas.OpcaoCreate(id_votacao=votacao.id_votacao, titulo=f"O{i}", detalhes=None)).id_opcao for i in range(opcoes)]
+        return votacao.id_votacao, ids
+    finally:
+        db.close()
+
+
+def votos_sinteticos(quantidade, id_votacao, ids):
+    agora = datetime.utcnow()
+    return [schemas.VotoCreate(id_user=i + 1, id_votacao=id_votacao, id_opcao=ids[i % len(ids)], data_voto=agora) for i in range(quantidade)]
+
+
+def disparar(votar, votos, threads):
+    latencias = []
+
+    def um(voto):
+        inicio = time.perf_counter()
+        votar(voto)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(um, votos))
+    duracao = time.perf_counter() - inicio
+    return {"votos_por_s": round(len(votos) / duracao, 1), "latencia": comum.percentis(latencias)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votos", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--lote", type=int, default=200)
+    parser.add_argument("--espera-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    resultado = {"votos": args.votos, "threads": args.threads}
+
+    id_votacao, ids = preparar()
+
+    def votar_direto(voto):
+        db = SessionLocal()
+        try:
+            crud.criar_voto(db, voto)
+        finally:
+            db.close()
+
+    resultado["um_commit_por_voto"] = disparar(votar_direto, votos_sinteticos(args.votos, id_votacao, ids), args.threads)
+
+    id_votacao, ids = preparar()
+    ingestao = IngestaoVotos(tamanho_lote=args.lote, espera_lote=args.espera_ms / 1000, timeout_fila=30)
+    ingestao.iniciar()
+    try:
+        resultado["em_lote"] = disparar(ingestao.registrar, votos_sinteticos(args.votos, id_votacao, ids), args.threads)
+    finally:
+        ingestao.parar()
+    resultado["em_lote"].update({"lote": args.lote, "espera_ms": args.espera_ms})
+
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# Custo de subida do app. Três medidas:
+#   - importação a frio de app.main em processo novo, como está hoje (sem
+#     banco) e com o create_all que rodava na importação (legado);
+#   - importação com DATABASE_URL apontando para um banco fora do ar, que
+#     antes falhava;
+#   - uvicorn: tempo até responder, até o primeiro 200 e até GET /pronto dar
+#     200, e a latência do primeiro login com o pool do bcrypt frio (logo
+#     que o servidor responde) e depois do aquecimento.
+#
+#   python -m benchmarks.inicializacao --repeticoes 5
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+from benchmarks import comum
+from benchmarks import semente
+
+
+def filho(modo):
+    inicio = time.perf_counter()
+    import app.main  # noqa: F401
+    if modo == "legado":
+        from app import models
+        from app.database import engine
+        models.Base.metadata.create_all(bind=engine)
+    print(json.dumps({"ms": (time.perf_counter() - inicio) * 1000}))
+
+
+def importacao(repeticoes):
+    resultado = {}
+    for modo in ("atual", "legado"):
+        amostras = [comum.rodar_filho("benchmarks.inicializacao", [modo])["ms"] for _ in range(repeticoes)]
+        resultado[f"{modo}_ms"] = round(statistics.median(amostras), 1)
+    try:
+        comum.rodar_filho("benchmarks.inicializacao", ["atual"], DATABASE_URL="postgresql://bench@127.0.0.1:1/fora_do_ar")
+        resultado["importa_sem_banco"] = True
+    except RuntimeError:
+        resultado["importa_sem_banco"] = False
+    return resultado
+
+
+def _esperar(cliente, url, status=None, limite=60):
+    prazo = time.monotonic() + limite
+    while time.monotonic() < prazo:
+        try:
+            resposta = cliente.get(url)
+            if status is None or resposta.status_code == status:
+                return
+        except Exception:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{url} não respondeu a tempo")
+
+
+def _login(cliente):
+    inicio = time.perf_counter()
+    resposta = cliente.post("/login/", data={"username": semente.email(0), "password": semente.SENHA})
+    resposta.raise_for_status()
+    return round((time.perf_counter() - inicio) * 1000, 1)
+
+
+def uvicorn(porta, aguardar_pronto):
+    import httpx
+
+    inicio = time.perf_counter()
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(porta), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    resultado = {}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{porta}", timeout=30) as cliente:
+            _esperar(cliente, "/pronto")
+            resultado["responde_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+            if aguardar_pronto:
+                _esperar(cliente, "/pronto", 200)
+                resultado["pronto_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+            t = time.perf_counter()
+            cliente.get("/votacoes/open").raise_for_status()
+            resultado["primeira_leitura_ms"] = round((time.perf_counter() - t) * 1000, 1)
+            resultado["primeiro_login_ms"] = _login(cliente)
+            resultado["login_seguinte_ms"] = statistics.median(_login(cliente) for _ in range(5))
+    finally:
+        processo.terminate()
+        processo.wait(timeout=15)
+    return resultado
+
+
+def main():
+    if "--filho" in sys.argv:
+        filho(sys.argv[2])
+        return
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--porta", type=int, default=8766)
+    args = parser.parse_args()
+
+    from app.security import encerrar_pool
+    try:
+        semente.semear(usuarios=10, votacoes=5, votos=10, candidaturas=5)
+    finally:
+        encerrar_pool()
+    resultado = {"importacao": importacao(args.repeticoes)}
+    resultado["uvicorn_frio"] = uvicorn(args.porta, aguardar_pronto=False)
+    resultado["uvicorn_aquecido"] = uvicorn(args.porta, aguardar_pronto=True)
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# Latência das listagens de votações: UPDATE por leitura (caminho antigo)
+# contra status derivado na consulta + agendador (caminho atual).
+#
+#   python -m benchmarks.leitura_votacoes --votacoes 20000 --repeticoes 200 --threads 8
+import argparse
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+from app import crud, models
+from app.agendador import AgendadorExpiracao
+from app.database import SessionLocal, engine
+
+
+def atualizar_status_legado(db):
+    # Cópia do caminho anterior: carrega cada votação vencida no ORM e faz commit
+    agora = datetime.utcnow()
+    votacoes = db.query(models.Votacao).filter(models.Votacao.status == "aberta", models.Votacao.data_fim < agora).all()
+    for votacao in votacoes:
+        votacao.status = "fechada"
+    db.commit()
+
+
+def listar_legado(db):
+    atualizar_status_legado(db)
+    return db.query(models.Votacao).filter(models.Votacao.status == "aberta").limit(10).offset(0).all()
+
+
+def listar_atual(db):
+    return crud.get_votacoes_abertas(db, 10, 0)
+
+
+def semear(quantidade):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    hoje = datetime.utcnow()
+    linhas = [
+        {
+            "titulo": f"Votação {i}",
+            "descricao": "bench",
+            "data_inicio": hoje - timedelta(days=30),
+            "data_fim": hoje + timedelta(days=random.randint(-20, 20)),
+            "status": "aberta",
+            "permite_candidatura": False,
+        }
+        for i in range(quantidade)
+    ]
+    with engine.begin() as conn:
+        conn.execute(models.Votacao.__table__.insert(), linhas)
+
+
+def rodar(listar, repeticoes, threads):
+    def uma_leitura():
+        db = SessionLocal()
+        try:
+            listar(db)
+        finally:
+            db.close()
+
+    sequencial = comum.medir(uma_leitura, repeticoes)
+
+    def lote(_):
+        return comum.medir(uma_leitura, repeticoes // threads or 1)
+
+    with ThreadPoolExecutor(threads) as pool:
+        inicio = time.perf_counter()
+        list(pool.map(lote, range(threads)))
+        duracao = time.perf_counter() - inicio
+
+    return {"sequencial": sequencial, "concorrente_leituras_por_s": round(repeticoes / duracao, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votacoes", type=int, default=20000)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    semear(args.votacoes)
+    resultado = {"votacoes": args.votacoes}
+    resultado["antes_update_por_leitura"] = rodar(listar_legado, args.repeticoes, args.threads)
+    semear(args.votacoes)
+    # Estado estável: o agendador já passou uma vez e fechou as vencidas
+    AgendadorExpiracao().rodada()
+    resultado["depois_status_derivado"] = rodar(listar_atual, args.repeticoes, args.threads)
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
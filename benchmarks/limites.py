@@ -0,0 +1,123 @@
+# Limite de taxa (app/limites.py). Duas medidas:
+#   - custo: uma conta de balde em memória e no SQLite local (BaldesArquivo),
+#     e POST /votos/ com o limitador desligado e ligado, com limites altos
+#     para nenhuma requisição ser recusada;
+#   - inundação de login: --atacantes threads mandam --taxa POST /login/ por
+#     segundo com a senha certa (bcrypt a cada tentativa) enquanto um leitor pede
+#     GET /votacoes/{id}/votos; compara a latência da leitura sem inundação,
+#     com inundação e limitador desligado, e com os limites padrão de login.
+#
+#   python -m benchmarks.limites --duracao 30 --atacantes 8 --taxa 20
+import os
+import time
+import tempfile
+import argparse
+import threading
+
+from benchmarks import comum
+from benchmarks import semente
+
+# Só o voto ganha limites altos (medida de custo); o login fica com o padrão
+os.environ["LIMITE_VOTOS_IP"] = "1000000/1000000"
+os.environ["LIMITE_VOTOS_IDENTIDADE"] = "1000000/1000000"
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.limites import limitador, BaldesMemoria, BaldesArquivo
+from app.security import encerrar_pool
+
+
+def custo_balde(repeticoes):
+    resultado = {}
+    for nome, armazem in (("memoria", BaldesMemoria()), ("arquivo", BaldesArquivo(os.path.join(tempfile.mkdtemp(), "limites.db")))):
+        chaves = iter(range(10 ** 9))
+        # Metade das contas em chave nova, metade em chave repetida
+        resultado[nome] = comum.medir(lambda: armazem.consumir(f"votos:ip:{next(chaves) % (repeticoes // 2)}", 1e6, 1e6), repeticoes)
+    return resultado
+
+
+def custo_voto(cliente, repeticoes):
+    # As três configurações se alternam a cada voto, para o crescimento da
+    # tabela e o ruído da máquina pesarem igual em todas
+    configuracoes = {
+        "desligado": (False, BaldesMemoria()),
+        "memoria": (True, BaldesMemoria()),
+        "arquivo": (True, BaldesArquivo(os.path.join(tempfile.mkdtemp(), "limites.db"))),
+    }
+    amostras = {nome: [] for nome in configuracoes}
+    usuario = 10 ** 6
+    for _ in range(repeticoes):
+        for nome, (ativo, armazem) in configuracoes.items():
+            limitador.ativo, limitador.armazem = ativo, armazem
+            usuario += 1
+            inicio = time.perf_counter()
+            resposta = cliente.post("/votos/", json={"id_user": usuario, "id_votacao": 1, "id_opcao": 1, "data_voto": "2026-01-01T00:00:00"})
+            amostras[nome].append((time.perf_counter() - inicio) * 1000)
+            if resposta.status_code != 200:
+                raise RuntimeError(resposta.text)
+    return {nome: comum.percentis(valores) for nome, valores in amostras.items()}
+
+
+def inundacao(cliente, duracao, atacantes, taxa, ativo):
+    # Cada atacante manda taxa/atacantes logins por segundo. Taxa fixa de
+    # propósito: os atacantes rodam na mesma máquina, e um laço sem pausa
+    # mediria a CPU gasta pelo próprio cliente, não pelo servidor
+    limitador.ativo, limitador.armazem = ativo, BaldesMemoria()
+    fim = threading.Event()
+    logins = {}
+    lock = threading.Lock()
+    intervalo = atacantes / taxa if taxa else 0
+
+    def atacar(n):
+        proximo = time.monotonic()
+        while not fim.is_set():
+            resposta = cliente.post("/login/", data={"username": semente.email(n % 50), "password": semente.SENHA})
+            with lock:
+                logins[resposta.status_code] = logins.get(resposta.status_code, 0) + 1
+            proximo += intervalo
+            fim.wait(max(0, proximo - time.monotonic()))
+
+    grupo = [threading.Thread(target=atacar, args=(n,)) for n in range(atacantes)]
+    for t in grupo:
+        t.start()
+    leituras = []
+    prazo = time.monotonic() + duracao
+    i = 0
+    while time.monotonic() < prazo:
+        i += 1
+        inicio = time.perf_counter()
+        cliente.get(f"/votacoes/{i % 10 + 1}/votos").raise_for_status()
+        leituras.append((time.perf_counter() - inicio) * 1000)
+        time.sleep(0.01)
+    fim.set()
+    for t in grupo:
+        t.join()
+    return {"leitura": comum.percentis(leituras), "logins": logins}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--duracao", type=float, default=30, help="segundos de cada rodada de inundação")
+    parser.add_argument("--atacantes", type=int, default=8)
+    parser.add_argument("--taxa", type=float, default=20, help="logins por segundo somando os atacantes")
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    args = parser.parse_args()
+
+    try:
+        semente.semear(usuarios=100, votacoes=10, votos=500, candidaturas=10)
+    finally:
+        encerrar_pool()
+
+    resultado = {"balde": custo_balde(args.repeticoes * 10)}
+    with TestClient(app) as cliente:
+        resultado["voto"] = custo_voto(cliente, args.repeticoes)
+        resultado["inundacao_login"] = {
+            "sem_inundacao": inundacao(cliente, args.duracao, 0, 0, False),
+            "limitador_desligado": inundacao(cliente, args.duracao, args.atacantes, args.taxa, False),
+            "limitador_ligado": inundacao(cliente, args.duracao, args.atacantes, args.taxa, True),
+        }
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
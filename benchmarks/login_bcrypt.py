@@ -0,0 +1,89 @@
+# Rajada de logins com leituras em paralelo: bcrypt na thread da requisição
+# (SENHA_WORKERS=0, comportamento antigo) contra o pool de processos.
+# Mede a vazão de logins e a latência de GET /votacoes durante a rajada.
+#
+#   python -m benchmarks.login_bcrypt --logins 200 --leitores 8 --workers 4
+import time
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+
+
+def semear(usuarios):
+    import bcrypt
+    from app import models, security
+    from app.database import engine
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    senha = bcrypt.hashpw(b"senha", bcrypt.gensalt(security.BCRYPT_ROUNDS)).decode()
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"nome_completo": f"U{i}", "cpf": str(i), "email": f"u{i}@bench", "user_type": "user"} for i in range(usuarios)])
+        conn.execute(models.Login.__table__.insert(), [{"id_user": i + 1, "senha": senha} for i in range(usuarios)])
+        conn.execute(models.Votacao.__table__.insert(), [{"titulo": f"V{i}", "status": "aberta", "data_fim": agora + timedelta(days=5)} for i in range(100)])
+
+
+async def rajada(logins, leitores):
+    import httpx
+    from app.main import app
+    from app.security import encerrar_pool
+
+    latencias_leitura, latencias_login = [], []
+    fim = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120) as cliente:
+        async def leitor():
+            while not fim.is_set():
+                inicio = time.perf_counter()
+                (await cliente.get("/votacoes")).raise_for_status()
+                latencias_leitura.append((time.perf_counter() - inicio) * 1000)
+
+        async def login(i):
+            inicio = time.perf_counter()
+            resposta = await cliente.post("/login/", data={"username": f"u{i}@bench", "password": "senha"})
+            latencias_login.append((time.perf_counter() - inicio) * 1000)
+            return resposta.status_code
+
+        tarefas_leitura = [asyncio.create_task(leitor()) for _ in range(leitores)]
+        inicio = time.perf_counter()
+        codigos = await asyncio.gather(*(login(i) for i in range(logins)))
+        duracao = time.perf_counter() - inicio
+        fim.set()
+        await asyncio.gather(*tarefas_leitura)
+
+    encerrar_pool()
+    return {
+        "logins_por_s": round(logins / duracao, 1),
+        "respostas_login": {str(c): codigos.count(c) for c in set(codigos)},
+        "latencia_login": comum.percentis(latencias_login),
+        "latencia_leitura_durante_rajada": comum.percentis(latencias_leitura),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--leitores", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(comum.json.dumps(asyncio.run(rajada(args.logins, args.leitores))))
+        return
+
+    semear(args.logins)
+    argumentos = ["--logins", args.logins, "--leitores", args.leitores]
+    comum.imprimir({
+        "logins": args.logins,
+        "leitores": args.leitores,
+        "bcrypt_na_thread": comum.rodar_filho("benchmarks.login_bcrypt", argumentos, SENHA_WORKERS="0"),
+        "pool_de_processos": comum.rodar_filho("benchmarks.login_bcrypt", argumentos, SENHA_WORKERS=str(args.workers), SENHA_FILA_MAX=str(args.logins)),
+    })
+
+
+if __name__ == "__main__":
+    main()
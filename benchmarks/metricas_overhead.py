@@ -0,0 +1,125 @@
+# Custo do MetricasMiddleware (app/metricas.py) por requisição. Duas medidas:
+#   - isolado: chamada ASGI direta a um app trivial, com e sem o middleware,
+#     em caminho repetido (molde em cache) e em caminhos sempre novos;
+#   - app real: latência de GET /votacoes/{id} (com o cache de respostas, a
+#     rota mais barata), para expressar o overhead isolado em porcentagem.
+#     Comparar o app com e sem o middleware direto não serve: a variação do
+#     threadpool entre rodadas (~±100 µs) é maior que o próprio overhead.
+# Orçamento: até ORCAMENTO_US por requisição no pior caso do isolado e até
+# ORCAMENTO_PCT da latência da rota mais barata. Sai com código 1 se estourar.
+#
+#   python -m benchmarks.metricas_overhead --requisicoes 50000
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+
+# A latência da rota é medida sem o middleware; o isolado o aplica por fora
+os.environ["METRICAS"] = "0"
+
+ORCAMENTO_US = 10.0
+ORCAMENTO_PCT = 5.0
+
+
+async def _app_trivial(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+class _AppComRotas:
+    # Imita scope["app"].routes do FastAPI com as rotas reais do projeto
+    def __init__(self, rotas):
+        self.routes = rotas
+
+
+async def _chamar(app, scope):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(mensagem):
+        pass
+
+    await app(dict(scope), receive, send)
+
+
+async def _medir_asgi(app, escopos, repeticoes):
+    # Mediana de 5 rodadas, em µs por requisição
+    rodadas = []
+    for _ in range(5):
+        inicio = time.perf_counter()
+        for i in range(repeticoes):
+            await _chamar(app, escopos[i % len(escopos)])
+        rodadas.append((time.perf_counter() - inicio) / repeticoes * 1e6)
+    return statistics.median(rodadas)
+
+
+def isolado(repeticoes):
+    from app.main import app as app_real
+    from app.metricas import MetricasMiddleware
+
+    base = {"type": "http", "method": "GET", "app": _AppComRotas(app_real.routes), "headers": []}
+    repetido = [dict(base, path="/votacoes/1")]
+    # Mais caminhos distintos que o cache de moldes: sempre cai na busca pelas rotas
+    novos = [dict(base, path=f"/votacoes/{i}") for i in range(20000)]
+
+    com = MetricasMiddleware(_app_trivial)
+    sem = _app_trivial
+
+    async def rodar():
+        return {
+            "sem_middleware_us": await _medir_asgi(sem, repetido, repeticoes),
+            "caminho_repetido_us": await _medir_asgi(com, repetido, repeticoes),
+            "caminho_novo_us": await _medir_asgi(com, novos, repeticoes),
+        }
+
+    resultado = asyncio.run(rodar())
+    resultado = {k: round(v, 3) for k, v in resultado.items()}
+    resultado["overhead_repetido_us"] = round(resultado["caminho_repetido_us"] - resultado["sem_middleware_us"], 3)
+    resultado["overhead_novo_us"] = round(resultado["caminho_novo_us"] - resultado["sem_middleware_us"], 3)
+    return resultado
+
+
+def app_real(repeticoes):
+    from app import models
+    from app.database import engine
+    from app.main import app
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.Votacao.__table__.insert(), [{"titulo": "V", "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=1), "permite_candidatura": False}])
+
+    escopo = {"type": "http", "method": "GET", "path": "/votacoes/1", "raw_path": b"/votacoes/1", "query_string": b"", "headers": [], "scheme": "http", "server": ("bench", 80), "client": ("127.0.0.1", 1), "root_path": "", "http_version": "1.1"}
+
+    async def rodar():
+        await _medir_asgi(app, [escopo], 200)  # aquece cache e conexões
+        return await _medir_asgi(app, [escopo], repeticoes)
+
+    return {"rota_us": round(asyncio.run(rodar()), 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=50000)
+    parser.add_argument("--requisicoes-app", type=int, default=5000)
+    args = parser.parse_args()
+
+    resultado = {"orcamento": {"us_por_requisicao": ORCAMENTO_US, "pct_da_rota": ORCAMENTO_PCT}}
+    resultado["isolado"] = isolado(args.requisicoes)
+    resultado["app_real"] = app_real(args.requisicoes_app)
+
+    pior_us = max(resultado["isolado"]["overhead_repetido_us"], resultado["isolado"]["overhead_novo_us"])
+    resultado["app_real"]["overhead_pct"] = round(100 * pior_us / resultado["app_real"]["rota_us"], 2)
+    resultado["dentro_do_orcamento"] = pior_us <= ORCAMENTO_US and resultado["app_real"]["overhead_pct"] <= ORCAMENTO_PCT
+    comum.imprimir(resultado)
+    sys.exit(0 if resultado["dentro_do_orcamento"] else 1)
+
+
+if __name__ == "__main__":
+    main()
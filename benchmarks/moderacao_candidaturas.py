@@ -0,0 +1,126 @@
+# Moderação de candidaturas: aprova (e recusa uma parte de) --candidaturas
+# candidaturas pendentes de uma votação grande, um PUT
+# /admin/candidaturas/{id}/ por item contra um POST
+# /admin/candidaturas/moderar/ com todas (crud.moderar_candidaturas). Conta
+# comandos SQL e confere que os dois caminhos criam as mesmas opções; a
+# chamada em massa é repetida no fim para mostrar que não duplica nada.
+# --orfas candidaturas apontam para usuários que não existem mais: a chamada
+# em massa tem de devolvê-las em sem_candidato, sem aprovar nem criar opção
+# (o PUT um a um não as recebe, ele responde 500 nesse caso).
+#
+#   python -m benchmarks.moderacao_candidaturas --candidaturas 5000 --recusar 0.2 --orfas 50
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+from fastapi.testclient import TestClient
+from sqlalchemy import select, func
+from app import models
+from app.database import engine
+from app.instrumentacao import estatisticas
+from app.auth import admin_required
+from app.main import app
+
+
+def semear(candidaturas, orfas=0):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [
+            {"nome_completo": f"Candidato {i}", "cpf": f"{i:011d}", "email": f"c{i}@bench.com", "user_type": "user"}
+            for i in range(candidaturas)
+        ])
+        conn.execute(models.Votacao.__table__.insert(), [{"titulo": "Eleição", "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=30), "permite_candidatura": True}])
+        conn.execute(models.Candidatura.__table__.insert(), [
+            {"id_user": i + 1, "id_votacao": 1, "detalhes": f"Proposta {i}", "status": "pendente"}
+            for i in range(candidaturas)
+        ] + [
+            # Usuário removido depois da candidatura (ids sem linha em user)
+            {"id_user": candidaturas + 1000 + i, "id_votacao": 1, "detalhes": f"Órfã {i}", "status": "pendente"}
+            for i in range(orfas)
+        ])
+
+
+def decisoes(candidaturas, recusar, seed=42):
+    rng = random.Random(seed)
+    return [(i + 1, "recusada" if rng.random() < recusar else "aprovada") for i in range(candidaturas)]
+
+
+def _comandos_sql():
+    return sum(dados[0] for dados in estatisticas.consultas.values())
+
+
+def _pendentes(ids):
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.count()).select_from(models.Candidatura)
+            .where(models.Candidatura.id_candidatura.in_(ids), models.Candidatura.status == "pendente")
+        ).scalar()
+
+
+def _opcoes():
+    with engine.connect() as conn:
+        return sorted(conn.execute(models.Opcoes.__table__.select().with_only_columns(models.Opcoes.titulo, models.Opcoes.detalhes, models.Opcoes.id_votacao)).all())
+
+
+def rodar(funcao):
+    estatisticas.zerar()
+    inicio = time.perf_counter()
+    extra = funcao()
+    resultado = {"duracao_s": round(time.perf_counter() - inicio, 3), "comandos_sql": _comandos_sql()}
+    if extra:
+        # Listas de ids viram contagens na saída
+        resultado.update({k: len(v) if isinstance(v, list) else v for k, v in extra.items()})
+        resultado["_resposta"] = extra
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidaturas", type=int, default=5000)
+    parser.add_argument("--recusar", type=float, default=0.2, help="fração recusada; o resto é aprovado")
+    parser.add_argument("--orfas", type=int, default=50, help="candidaturas de usuários que não existem mais")
+    args = parser.parse_args()
+
+    lista = decisoes(args.candidaturas, args.recusar)
+    orfas = [args.candidaturas + i + 1 for i in range(args.orfas)]
+    app.dependency_overrides[admin_required] = lambda: None
+    resultado = {"candidaturas": args.candidaturas}
+    with TestClient(app) as cliente:
+        def um_por_um():
+            for id_candidatura, status in lista:
+                # CandidaturaUpdate exige detalhes; manda o mesmo texto da semente
+                corpo = {"status": status, "detalhes": f"Proposta {id_candidatura - 1}"}
+                cliente.put(f"/admin/candidaturas/{id_candidatura}/", json=corpo).raise_for_status()
+
+        def em_massa():
+            itens = [{"id_candidatura": i, "status": s} for i, s in lista] + [{"id_candidatura": i, "status": "aprovada"} for i in orfas]
+            resposta = cliente.post("/admin/candidaturas/moderar/", json={"itens": itens})
+            resposta.raise_for_status()
+            return resposta.json()
+
+        semear(args.candidaturas)
+        resultado["um_por_um"] = rodar(um_por_um)
+        opcoes_um_por_um = _opcoes()
+
+        semear(args.candidaturas, args.orfas)
+        resultado["em_massa"] = rodar(em_massa)
+        opcoes_em_massa = _opcoes()
+        orfas_pendentes = _pendentes(orfas)
+        resultado["em_massa_repetida"] = rodar(em_massa)
+
+    resultado["mesmas_opcoes"] = opcoes_um_por_um == opcoes_em_massa
+    resultado["orfas_ignoradas"] = sorted(resultado["em_massa"].pop("_resposta")["sem_candidato"]) == orfas and orfas_pendentes == len(orfas)
+    resultado["em_massa_repetida"].pop("_resposta")
+    resultado["opcoes"] = len(opcoes_em_massa)
+    resultado["opcoes_apos_repeticao"] = len(_opcoes())
+    comum.imprimir(resultado)
+    sys.exit(0 if resultado["mesmas_opcoes"] and resultado["orfas_ignoradas"] and resultado["opcoes_apos_repeticao"] == resultado["opcoes"] else 1)
+
+
+if __name__ == "__main__":
+    main()
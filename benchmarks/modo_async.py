@@ -0,0 +1,88 @@
+# Vazão de requisições concorrentes com o engine síncrono (threadpool) e com
+# DB_ASYNC=1 (AsyncSession). Cada modo roda num subprocesso, porque o modo é
+# lido na importação do app; os dois usam o mesmo banco semeado aqui.
+#
+#   python -m benchmarks.modo_async --requisicoes 2000 --concorrencia 64
+import json
+import time
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+
+ROTAS = ["/votacoes", "/votacoes/open", "/votacoes/1", "/votacoes/1/votos", "/votacoes/1/opcoes"]
+
+
+def semear(votacoes=2000, votos=20000):
+    from app import models, contagem
+    from app.database import SessionLocal, engine
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.Votacao.__table__.insert(), [
+            {"titulo": f"V{i}", "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=i % 30 - 10), "permite_candidatura": False}
+            for i in range(votacoes)
+        ])
+        conn.execute(models.Opcoes.__table__.insert(), [{"id_votacao": 1, "titulo": f"O{i}"} for i in range(5)])
+        conn.execute(models.Voto.__table__.insert(), [{"id_user": i, "id_votacao": 1, "id_opcao": i % 5 + 1, "data_voto": agora} for i in range(votos)])
+    db = SessionLocal()
+    try:
+        contagem.reconstruir(db)
+    finally:
+        db.close()
+
+
+async def disparar(requisicoes, concorrencia):
+    import httpx
+    from app import database
+    from app.main import app
+
+    latencias = []
+    fila = asyncio.Queue()
+    for i in range(requisicoes):
+        fila.put_nowait(ROTAS[i % len(ROTAS)])
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as cliente:
+        async def trabalhador():
+            while not fila.empty():
+                rota = fila.get_nowait()
+                inicio = time.perf_counter()
+                resposta = await cliente.get(rota)
+                resposta.raise_for_status()
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabalhador() for _ in range(concorrencia)))
+        duracao = time.perf_counter() - inicio
+
+    # Fora do servidor o lifespan não roda; sem dispose as conexões do
+    # aiosqlite seguram o processo aberto
+    if database.async_engine is not None:
+        await database.async_engine.dispose()
+
+    return {"requisicoes_por_s": round(requisicoes / duracao, 1), "latencia": comum.percentis(latencias)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requisicoes", type=int, default=2000)
+    parser.add_argument("--concorrencia", type=int, default=64)
+    parser.add_argument("--filho", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        print(json.dumps(asyncio.run(disparar(args.requisicoes, args.concorrencia))))
+        return
+
+    semear()
+    resultado = {"requisicoes": args.requisicoes, "concorrencia": args.concorrencia}
+    for modo, valor in (("sincrono", "0"), ("async", "1")):
+        resultado[modo] = comum.rodar_filho("benchmarks.modo_async", ["--requisicoes", args.requisicoes, "--concorrencia", args.concorrencia], DB_ASYNC=valor)
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
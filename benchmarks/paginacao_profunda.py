@@ -0,0 +1,135 @@
+# Custo de páginas profundas em /votacoes: OFFSET (cresce com a posição)
+# contra cursor (constante). Além de medir, confere:
+#   - latência plana: o p50 do cursor na página mais funda não passa de
+#     --tolerancia vezes o da primeira;
+#   - páginas certas: em cada posição medida o cursor devolve os mesmos ids
+#     do OFFSET;
+#   - sem sobreposição nem buraco: percorre a tabela inteira pelo cursor,
+#     apagando votações já lidas e criando novas no meio do caminho, e cada
+#     id aparece uma vez só (as originais todas e as novas no fim). O mesmo
+#     percurso por OFFSET é só reportado, ele pula linhas por construção.
+# Sai com 1 se alguma conferência falhar.
+#
+#   python -m benchmarks.paginacao_profunda --votacoes 200000 --repeticoes 50
+import sys
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+from app import crud, models
+from app.database import SessionLocal, engine
+from app.paginacao import codificar_cursor
+
+LOTE = 50000
+
+
+def _linhas(quantidade, agora, prefixo="V"):
+    return [
+        {"titulo": f"{prefixo}{i}", "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=30), "permite_candidatura": False}
+        for i in range(quantidade)
+    ]
+
+
+def semear(votacoes):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        for inicio in range(0, votacoes, LOTE):
+            conn.execute(models.Votacao.__table__.insert(), _linhas(min(LOTE, votacoes - inicio), agora))
+
+
+def _mexer_no_meio(lidos, limit):
+    # Apaga a primeira página já lida e cria uma página de votações novas
+    tabela = models.Votacao.__table__
+    with engine.begin() as conn:
+        conn.execute(tabela.delete().where(tabela.c.id_votacao.in_(lidos[:limit])))
+        conn.execute(tabela.insert(), _linhas(limit, datetime.utcnow(), "Nova"))
+
+
+def percorrer(db, limit, por_cursor):
+    # Lista de ids na ordem em que as páginas chegaram
+    lidos, cursor, offset, total = [], None, 0, db.query(models.Votacao).count()
+    mexeu = False
+    while True:
+        if por_cursor:
+            pagina = crud.get_all_votacao(db, limit, 0, cursor)
+        else:
+            pagina = crud.get_all_votacao(db, limit, offset)
+        lidos.extend(v.id_votacao for v in pagina)
+        offset += limit
+        if not mexeu and len(lidos) >= total // 2:
+            _mexer_no_meio(lidos, limit)
+            mexeu = True
+        cursor = getattr(pagina, "proximo_cursor", None)
+        if (por_cursor and not cursor) or (not por_cursor and len(pagina) < limit):
+            return lidos
+
+
+def conferir_percurso(lidos, esperados):
+    repetidos = len(lidos) - len(set(lidos))
+    faltando = len(esperados - set(lidos))
+    return {"lidos": len(lidos), "repetidos": repetidos, "faltando": faltando}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votacoes", type=int, default=200000)
+    parser.add_argument("--repeticoes", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--tolerancia", type=float, default=3.0, help="p50 da página mais funda pelo cursor / p50 da primeira")
+    args = parser.parse_args()
+
+    semear(args.votacoes)
+    resultado = {"votacoes": args.votacoes, "paginas": {}}
+    paginas_diferentes = []
+    db = SessionLocal()
+    try:
+        for fracao in (0, 0.25, 0.5, 0.99):
+            posicao = int(args.votacoes * fracao)
+            # O cursor equivalente à posição é o último id da página anterior
+            cursor = codificar_cursor([posicao]) if posicao else None
+            por_offset = [v.id_votacao for v in crud.get_all_votacao(db, args.limit, posicao)]
+            por_cursor = [v.id_votacao for v in crud.get_all_votacao(db, args.limit, 0, cursor)]
+            if por_offset != por_cursor:
+                paginas_diferentes.append(posicao)
+            resultado["paginas"][str(posicao)] = {
+                "offset": comum.medir(lambda: crud.get_all_votacao(db, args.limit, posicao), args.repeticoes),
+                "cursor": comum.medir(lambda: crud.get_all_votacao(db, args.limit, 0, cursor), args.repeticoes),
+            }
+
+        medidas = list(resultado["paginas"].values())
+        rasa, funda = medidas[0]["cursor"]["p50_ms"], medidas[-1]["cursor"]["p50_ms"]
+        resultado["cursor_funda_sobre_rasa"] = round(funda / rasa, 2) if rasa else None
+        latencia_plana = funda <= args.tolerancia * rasa
+
+        # Percursos completos com escrita no meio; o de OFFSET vem depois sobre
+        # uma tabela nova para partir do mesmo estado
+        originais = set(range(1, args.votacoes + 1))
+        lidos = percorrer(db, args.limit, por_cursor=True)
+        novas = set(range(args.votacoes + 1, args.votacoes + args.limit + 1))
+        resultado["percurso_cursor"] = conferir_percurso(lidos, originais | novas)
+        resultado["percurso_cursor"]["em_ordem"] = lidos == sorted(lidos)
+    finally:
+        db.close()
+
+    semear(args.votacoes)
+    db = SessionLocal()
+    try:
+        resultado["percurso_offset"] = conferir_percurso(percorrer(db, args.limit, por_cursor=False), originais | novas)
+    finally:
+        db.close()
+
+    percurso = resultado["percurso_cursor"]
+    percurso_ok = percurso["repetidos"] == 0 and percurso["faltando"] == 0 and percurso["em_ordem"]
+    resultado["conferencias"] = {
+        "latencia_plana": latencia_plana,
+        "paginas_iguais_ao_offset": not paginas_diferentes,
+        "percurso_sem_sobreposicao_nem_buraco": percurso_ok,
+    }
+    comum.imprimir(resultado)
+    sys.exit(1 if not latencia_plana or paginas_diferentes or not percurso_ok else 0)
+
+
+if __name__ == "__main__":
+    main()
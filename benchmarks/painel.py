@@ -0,0 +1,123 @@
+# Tela de visão geral das votações: uma página com número de opções, total de
+# votos e candidaturas pendentes de cada votação. Compara o que o cliente
+# precisava fazer antes (GET /votacoes e, para cada votação, /votacoes/{id},
+# /opcoes e /votos, mais percorrer /candidaturas/pendentes para contar as de
+# cada votação) com um GET /votacoes/painel. Conta requisições HTTP e
+# comandos SQL por tela, além da latência.
+#
+#   python -m benchmarks.painel --votacoes 1000 --candidaturas 5000 --limit 20
+import os
+import time
+import argparse
+
+from benchmarks import comum
+from benchmarks import semente
+
+# O cache de respostas esconderia as consultas repetidas da composição
+os.environ["RESPOSTAS_CACHE"] = "0"
+
+from fastapi.testclient import TestClient
+from app.main import app
+from app.instrumentacao import estatisticas
+from app.security import encerrar_pool
+from app.paginacao import codificar_cursor
+
+
+def _comandos_sql():
+    return sum(dados[0] for dados in estatisticas.consultas.values())
+
+
+def composta(cliente, limit, cursor):
+    requisicoes = 0
+
+    def get(url):
+        nonlocal requisicoes
+        requisicoes += 1
+        resposta = cliente.get(url)
+        resposta.raise_for_status()
+        return resposta
+
+    url = f"/votacoes?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+    tela = {}
+    for votacao in get(url).json():
+        id_votacao = votacao["id_votacao"]
+        detalhe = get(f"/votacoes/{id_votacao}").json()
+        opcoes = get(f"/votacoes/{id_votacao}/opcoes").json()
+        totais = get(f"/votacoes/{id_votacao}/votos").json()
+        tela[id_votacao] = {
+            "titulo": detalhe["titulo"],
+            "opcoes": len(opcoes) if isinstance(opcoes, list) else 0,
+            "total_votos": sum(t["total_votos"] for t in totais) if isinstance(totais, list) else 0,
+            "candidaturas_pendentes": 0,
+        }
+    # Pendentes não filtram por votação: o cliente percorre todas
+    proximo = None
+    while True:
+        resposta = get("/candidaturas/pendentes?limit=100" + (f"&cursor={proximo}" if proximo else ""))
+        for candidatura in resposta.json():
+            if candidatura["id_votacao"] in tela:
+                tela[candidatura["id_votacao"]]["candidaturas_pendentes"] += 1
+        proximo = resposta.headers.get("x-proximo-cursor")
+        if not proximo:
+            break
+    return tela, requisicoes
+
+
+def painel(cliente, limit, cursor):
+    resposta = cliente.get(f"/votacoes/painel?limit={limit}" + (f"&cursor={cursor}" if cursor else ""))
+    resposta.raise_for_status()
+    tela = {
+        v["id_votacao"]: {"titulo": v["titulo"], "opcoes": v["opcoes"], "total_votos": v["total_votos"], "candidaturas_pendentes": v["candidaturas_pendentes"]}
+        for v in resposta.json()
+    }
+    return tela, 1
+
+
+def medir(cliente, funcao, limit, cursores, repeticoes):
+    amostras, requisicoes, comandos = [], 0, 0
+    for i in range(repeticoes):
+        cursor = cursores[i % len(cursores)]
+        antes = _comandos_sql()
+        inicio = time.perf_counter()
+        _, n = funcao(cliente, limit, cursor)
+        amostras.append((time.perf_counter() - inicio) * 1000)
+        requisicoes += n
+        comandos += _comandos_sql() - antes
+    return {
+        "tela": comum.percentis(amostras),
+        "requisicoes_por_tela": requisicoes / repeticoes,
+        "comandos_sql_por_tela": comandos / repeticoes,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--usuarios", type=int, default=2000)
+    parser.add_argument("--votacoes", type=int, default=1000)
+    parser.add_argument("--votos", type=int, default=100000)
+    parser.add_argument("--candidaturas", type=int, default=5000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeticoes", type=int, default=30)
+    args = parser.parse_args()
+
+    try:
+        semente.semear(usuarios=args.usuarios, votacoes=args.votacoes, votos=args.votos, candidaturas=args.candidaturas)
+    finally:
+        encerrar_pool()
+
+    resultado = {"limit": args.limit}
+    with TestClient(app) as cliente:
+        # Páginas espalhadas pela listagem, as mesmas nos dois modos
+        cursores = [codificar_cursor([int(args.votacoes * f)]) if f else None for f in (0, 0.25, 0.5, 0.75)]
+        # Os dois caminhos montam a mesma tela
+        for cursor in cursores:
+            if composta(cliente, args.limit, cursor)[0] != painel(cliente, args.limit, cursor)[0]:
+                raise RuntimeError(f"telas diferentes no cursor {cursor}")
+        estatisticas.zerar()
+        resultado["composta"] = medir(cliente, composta, args.limit, cursores, args.repeticoes)
+        resultado["painel"] = medir(cliente, painel, args.limit, cursores, args.repeticoes)
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()
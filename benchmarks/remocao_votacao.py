@@ -0,0 +1,212 @@
+# Reset e exclusão de uma votação grande: caminho anterior (um DELETE só no
+# reset; db.delete do ORM na exclusão, que carrega os filhos) contra a remoção
+# em lotes das tarefas (app/tarefas.py). Enquanto a remoção roda, uma thread
+# grava votos em outra votação e mede quanto cada voto esperou: é aí que
+# aparece o lock preso. "transacao_max_ms" é a maior transação da remoção.
+#
+# No fim confere a exclusão com chave estrangeira valendo (PRAGMA
+# foreign_keys=ON no SQLite; no Postgres ela sempre vale): votos chegam na
+# votação durante a fase de candidaturas e a de opções, e uma candidatura nova
+# durante a de opções. A exclusão tem de terminar sem erro e sem deixar linha
+# da votação em nenhuma tabela. Sai com 1 se não terminar.
+#
+#   python -m benchmarks.remocao_votacao --votos 500000 --lote 5000
+import sys
+import time
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, select, func
+from benchmarks import comum
+from app import crud, models, schemas, contagem
+from app.database import SessionLocal, engine
+from app.tarefas import FilaTarefas, Tarefa
+
+
+def semear(votos):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.Votacao.__table__.insert(), [{"titulo": t, "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=1)} for t in ("Grande", "Ao vivo")])
+        conn.execute(models.Opcoes.__table__.insert(), [{"titulo": f"O{i}", "id_votacao": 1 + i // 4} for i in range(8)])
+        conn.execute(models.Candidatura.__table__.insert(), [{"id_user": i + 1, "id_votacao": 1, "status": "pendente"} for i in range(1000)])
+        for inicio in range(0, votos, 50000):
+            faixa = range(inicio, min(inicio + 50000, votos))
+            conn.execute(models.Voto.__table__.insert(), [{"id_user": i + 1, "id_votacao": 1, "id_opcao": 1 + i % 4, "data_voto": agora} for i in faixa])
+    db = SessionLocal()
+    try:
+        contagem.reconstruir(db, 1)
+    finally:
+        db.close()
+
+
+def reset_legado(db):
+    # Cópia do caminho anterior
+    db.query(models.Voto).filter(models.Voto.id_votacao == 1).delete()
+    contagem.zerar(db, 1)
+    db.commit()
+
+
+def exclusao_legado(db):
+    # Cópia do caminho anterior
+    votacao = db.query(models.Votacao).filter(models.Votacao.id_votacao == 1).first()
+    db.delete(votacao)
+    db.commit()
+
+
+def em_lotes(tipo, lote):
+    fila = FilaTarefas(lote=lote, pausa=0.005)
+
+    def rodar(db):
+        tarefa = Tarefa(tipo, 1)
+        fila.rodar(tarefa)
+        if tarefa.estado != "concluida":
+            raise RuntimeError(tarefa.erro)
+        return tarefa
+
+    return rodar
+
+
+def medir(operacao):
+    # Escritor concorrente: um voto por vez na votação 2 até a remoção acabar
+    latencias, erros = [], [0]
+    fim = threading.Event()
+
+    def escritor():
+        db = SessionLocal()
+        usuario = 10_000_000
+        try:
+            while not fim.is_set():
+                usuario += 1
+                voto = schemas.VotoCreate(id_user=usuario, id_votacao=2, id_opcao=5, data_voto=datetime.utcnow())
+                inicio = time.perf_counter()
+                try:
+                    crud.criar_voto(db, voto)
+                except Exception:
+                    db.rollback()
+                    erros[0] += 1
+                latencias.append((time.perf_counter() - inicio) * 1000)
+                time.sleep(0.002)
+        finally:
+            db.close()
+
+    thread = threading.Thread(target=escritor)
+    thread.start()
+    time.sleep(0.2)
+    db = SessionLocal()
+    try:
+        inicio = time.perf_counter()
+        tarefa = operacao(db)
+        duracao = time.perf_counter() - inicio
+    finally:
+        db.close()
+    time.sleep(0.2)
+    fim.set()
+    thread.join()
+
+    resultado = {
+        "duracao_s": round(duracao, 3),
+        # Caminho anterior: uma transação só, do começo ao fim
+        "transacao_max_ms": round(tarefa.lote_max_ms, 3) if tarefa else round(duracao * 1000, 3),
+        "escritor": comum.percentis(latencias),
+        "escritor_erros": erros[0],
+    }
+    if tarefa:
+        resultado["lotes"] = tarefa.lotes
+        resultado["removidos"] = tarefa.removidos
+    return resultado
+
+
+def _chave_estrangeira(conexao, _):
+    conexao.execute("PRAGMA foreign_keys=ON")
+
+
+def conferir_chave_estrangeira(lote):
+    # Votação 1 com 4 opções a cada lote de opções e um voto por opção
+    opcoes, tabelas = 4 * lote, (models.Voto, models.ContagemVoto, models.Candidatura, models.Opcoes, models.Votacao)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _chave_estrangeira)
+        engine.dispose()
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"nome_completo": f"U{i}", "cpf": f"{i:011d}", "email": f"u{i}@bench.com", "user_type": "user"} for i in range(opcoes + 10)])
+        conn.execute(models.Votacao.__table__.insert(), [{"titulo": "Excluída", "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=1)}])
+        conn.execute(models.Opcoes.__table__.insert(), [{"titulo": f"O{i}", "id_votacao": 1} for i in range(opcoes)])
+        conn.execute(models.Candidatura.__table__.insert(), [{"id_user": i + 1, "id_votacao": 1, "status": "pendente"} for i in range(2 * lote)])
+        conn.execute(models.Voto.__table__.insert(), [{"id_user": i + 1, "id_votacao": 1, "id_opcao": i + 1, "data_voto": agora} for i in range(opcoes)])
+    db = SessionLocal()
+    try:
+        contagem.reconstruir(db, 1)
+    finally:
+        db.close()
+
+    chegadas = []
+
+    def chega(tabela):
+        # Outra sessão, entre dois lotes: o lote anterior já foi confirmado
+        outro = SessionLocal()
+        try:
+            usuario = opcoes + len(chegadas) + 1
+            if tabela == "candidatura" or tabela == "opcoes":
+                # Na última opção, que só sai no último lote
+                crud.criar_voto(outro, schemas.VotoCreate(id_user=usuario, id_votacao=1, id_opcao=opcoes, data_voto=datetime.utcnow()))
+                chegadas.append(("voto", tabela))
+            if tabela == "opcoes":
+                outro.execute(models.Candidatura.__table__.insert().values(id_user=usuario, id_votacao=1, status="pendente"))
+                outro.commit()
+                chegadas.append(("candidatura", tabela))
+        finally:
+            outro.close()
+
+    vistas = set()
+
+    def progresso(tabela, linhas, segundos):
+        if tabela not in vistas:
+            vistas.add(tabela)
+            chega(tabela)
+
+    db = SessionLocal()
+    try:
+        try:
+            crud.excluir_votacao(db, 1, lote=lote, progresso=progresso)
+            erro = None
+        except Exception as e:
+            db.rollback()
+            erro = f"{type(e).__name__}: {e}".splitlines()[0]
+        sobras = {m.__tablename__: db.execute(select(func.count()).select_from(m).where(m.id_votacao == 1)).scalar() for m in tabelas}
+        if engine.dialect.name == "sqlite":
+            sobras["foreign_key_check"] = len(db.connection().exec_driver_sql("PRAGMA foreign_key_check").all())
+    finally:
+        db.close()
+        if engine.dialect.name == "sqlite":
+            event.remove(engine, "connect", _chave_estrangeira)
+            engine.dispose()
+    return {"chegadas_durante": chegadas, "erro": erro, "sobras": sobras, "ok": erro is None and not any(sobras.values())}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--votos", type=int, default=500000)
+    parser.add_argument("--lote", type=int, default=5000)
+    args = parser.parse_args()
+
+    resultado = {"votos": args.votos, "lote": args.lote, "dialeto": engine.dialect.name}
+    for nome, operacao in (
+        ("reset_legado", reset_legado),
+        ("reset_em_lotes", em_lotes("reset", args.lote)),
+        ("exclusao_legado", exclusao_legado),
+        ("exclusao_em_lotes", em_lotes("exclusao", args.lote)),
+    ):
+        semear(args.votos)
+        resultado[nome] = medir(operacao)
+    resultado["exclusao_com_chave_estrangeira"] = conferir_chave_estrangeira(min(args.lote, 100))
+    comum.imprimir(resultado)
+    sys.exit(0 if resultado["exclusao_com_chave_estrangeira"]["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# Popula o banco do DATABASE_URL (SQLite ou Postgres local) pelas tabelas de
+# models.Base, com volumes configuráveis. Usado pela suíte (benchmarks/suite.py)
+# e também sozinho, para preparar um banco e apontar o uvicorn para ele:
+#
+#   python -m benchmarks.semente --usuarios 10000 --votacoes 200 --opcoes 5 --votos 100000
+#
+# Todos os usuários têm a mesma senha (SENHA), com hash de BCRYPT_ROUNDS feito
+# uma vez só. O e-mail do usuário i é u{i}@bench.com. Cada par (usuário,
+# votação) recebe no máximo um voto, como exige uq_voto_user_votacao, e a
+# contagem_voto é gravada já consistente com os votos.
+import random
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+
+SENHA = "bench-senha"
+LOTE = 20000
+
+
+def email(i):
+    return f"u{i}@bench.com"
+
+
+def _em_lotes(conn, tabela, linhas):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= LOTE:
+            conn.execute(tabela.insert(), lote)
+            lote = []
+    if lote:
+        conn.execute(tabela.insert(), lote)
+
+
+def semear(usuarios=1000, votacoes=50, opcoes=4, votos=10000, candidaturas=500, fechadas=0.2, seed=42):
+    from app import models
+    from app.database import engine
+    from app.security import hash_password
+
+    if votos > usuarios * votacoes:
+        raise ValueError("votos não pode passar de usuarios * votacoes (um voto por usuário em cada votação)")
+
+    rng = random.Random(seed)
+    agora = datetime.utcnow()
+    senha = hash_password(SENHA)
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(models.Categoria.__table__.insert(), [{"nome_categoria": "Bench"}])
+        _em_lotes(conn, models.User.__table__, (
+            {"nome_completo": f"Usuario {i}", "cpf": f"{i:011d}", "email": email(i), "user_type": "user"}
+            for i in range(usuarios)
+        ))
+        _em_lotes(conn, models.Login.__table__, ({"id_user": i + 1, "senha": senha} for i in range(usuarios)))
+
+        # As primeiras votações ficam abertas; as últimas (fração "fechadas") já venceram
+        n_fechadas = int(votacoes * fechadas)
+        _em_lotes(conn, models.Votacao.__table__, (
+            {
+                "titulo": f"Votacao {v}",
+                "descricao": f"Votação de carga {v}",
+                "data_inicio": agora - timedelta(days=10),
+                "data_fim": agora + timedelta(days=30) if v < votacoes - n_fechadas else agora - timedelta(days=1),
+                "status": "aberta" if v < votacoes - n_fechadas else "fechada",
+                "permite_candidatura": True,
+                "id_categoria": 1,
+            }
+            for v in range(votacoes)
+        ))
+        # id_opcao da opção j da votação v: v * opcoes + j + 1
+        _em_lotes(conn, models.Opcoes.__table__, (
+            {"titulo": f"Opcao {v}-{j}", "detalhes": "", "id_votacao": v + 1}
+            for v in range(votacoes) for j in range(opcoes)
+        ))
+
+        # Voto k: votação k % votacoes, usuário k // votacoes -> pares distintos
+        contagem = Counter()
+
+        def gerar_votos():
+            for k in range(votos):
+                v = k % votacoes
+                id_opcao = v * opcoes + rng.randrange(opcoes) + 1
+                contagem[(v + 1, id_opcao)] += 1
+                yield {"id_user": k // votacoes + 1, "id_votacao": v + 1, "id_opcao": id_opcao, "data_voto": agora, "voto_publico": False}
+
+        _em_lotes(conn, models.Voto.__table__, gerar_votos())
+        _em_lotes(conn, models.ContagemVoto.__table__, (
+            {"id_votacao": id_votacao, "id_opcao": id_opcao, "total": total}
+            for (id_votacao, id_opcao), total in contagem.items()
+        ))
+
+        status = ("pendente", "aprovada", "recusada")
+        _em_lotes(conn, models.Candidatura.__table__, (
+            {"id_user": rng.randrange(usuarios) + 1, "id_votacao": rng.randrange(votacoes) + 1, "detalhes": f"Candidatura {c}", "status": status[c % 3]}
+            for c in range(candidaturas)
+        ))
+
+    return {
+        "usuarios": usuarios,
+        "votacoes": votacoes,
+        "votacoes_abertas": votacoes - n_fechadas,
+        "opcoes_por_votacao": opcoes,
+        "votos": votos,
+        "candidaturas": candidaturas,
+        "dialeto": engine.dialect.name,
+    }
+
+
+def adicionar_argumentos(parser):
+    parser.add_argument("--usuarios", type=int, default=1000)
+    parser.add_argument("--votacoes", type=int, default=50)
+    parser.add_argument("--opcoes", type=int, default=4, help="opções por votação")
+    parser.add_argument("--votos", type=int, default=10000)
+    parser.add_argument("--candidaturas", type=int, default=500)
+    parser.add_argument("--fechadas", type=float, default=0.2, help="fração das votações já encerradas")
+    parser.add_argument("--seed", type=int, default=42)
+
+
+def validar(parser, args):
+    if args.votos > args.usuarios * args.votacoes:
+        parser.error("--votos não pode passar de --usuarios * --votacoes (um voto por usuário em cada votação)")
+
+
+def volumes(args):
+    return {"usuarios": args.usuarios, "votacoes": args.votacoes, "opcoes": args.opcoes, "votos": args.votos, "candidaturas": args.candidaturas, "fechadas": args.fechadas, "seed": args.seed}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+    validar(parser, args)
+    comum.imprimir(semear(**volumes(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# Serialização das listagens com --itens linhas (1000 por padrão): caminho
+# anterior (objetos do ORM ou CandidaturaInfo montado linha a linha, e
+# jsonable_encoder + JSONResponse) contra o atual (linhas do select de
+# colunas validadas pelo modelo da resposta e JSON gerado pelo pydantic, ver
+# app/serializacao.py). Mede só a serialização e a consulta + serialização,
+# e confere que os dois caminhos geram o mesmo conteúdo.
+#
+#   python -m benchmarks.serializacao --itens 1000 --repeticoes 200
+import json
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks import comum
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm.attributes import set_committed_value
+from app import crud, models, schemas
+from app.database import SessionLocal, engine
+from app.serializacao import para_json
+
+
+def semear(itens):
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    agora = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(models.User.__table__.insert(), [{"nome_completo": f"Usuário {i}", "cpf": str(i), "email": f"u{i}@bench.com", "user_type": "user"} for i in range(itens)])
+        conn.execute(models.Votacao.__table__.insert(), [
+            {"titulo": f"Votação {i}", "descricao": "x" * 200, "status": "aberta", "data_inicio": agora, "data_fim": agora + timedelta(days=30), "permite_candidatura": True}
+            for i in range(itens)
+        ])
+        conn.execute(models.Opcoes.__table__.insert(), [{"id_votacao": i + 1, "titulo": f"Opção {i}", "detalhes": "y" * 100} for i in range(itens)])
+        conn.execute(models.Candidatura.__table__.insert(), [{"id_votacao": i + 1, "id_user": i + 1, "detalhes": "z" * 50, "status": "pendente"} for i in range(itens)])
+
+
+def _legado(resultado):
+    return JSONResponse(jsonable_encoder(resultado)).body
+
+
+# Cópias das consultas anteriores
+def votacoes_legado(db, itens):
+    agora = datetime.utcnow()
+    linhas = db.query(models.Votacao, crud.status_efetivo(agora)).order_by(models.Votacao.id_votacao).limit(itens).all()
+    votacoes = []
+    for votacao, status_atual in linhas:
+        set_committed_value(votacao, "status", status_atual)
+        votacoes.append(votacao)
+    return votacoes
+
+
+def opcoes_legado(db, itens):
+    return db.query(models.Opcoes).order_by(models.Opcoes.id_opcao).limit(itens).all()
+
+
+def candidaturas_legado(db, itens):
+    registros = crud._query_candidaturas(db).order_by(models.Candidatura.id_candidatura).limit(itens).all()
+    return [
+        schemas.CandidaturaInfo(id_candidatura=r[0], id_votacao=r[1], id_user=r[2], detalhes=r[3], nome_completo=r[4], titulo=r[5])
+        for r in registros
+    ]
+
+
+LISTAGENS = {
+    "votacoes": (votacoes_legado, lambda db, n: crud.get_all_votacao(db, n), schemas.ListaVotacoes),
+    "opcoes": (opcoes_legado, lambda db, n: crud.get_opcoes(db, n), schemas.ListaOpcoes),
+    "candidaturas": (candidaturas_legado, lambda db, n: crud.get_candidaturas(db, n), schemas.ListaCandidaturas),
+}
+
+
+def rodar(db, itens, repeticoes):
+    resultado = {}
+    for nome, (legado, atual, modelo) in LISTAGENS.items():
+        # A sessão é limpa a cada rodada para o ORM montar os objetos de novo
+        def antes():
+            db.expunge_all()
+            return _legado(legado(db, itens))
+
+        def depois():
+            return para_json(atual(db, itens), modelo)
+
+        linhas_antes, linhas_atual = legado(db, itens), atual(db, itens)
+        resultado[nome] = {
+            "itens": len(linhas_atual),
+            "mesmo_conteudo": json.loads(antes()) == json.loads(depois()),
+            "bytes": len(depois()),
+            "serializacao_antes": comum.medir(lambda: _legado(linhas_antes), repeticoes),
+            "serializacao_depois": comum.medir(lambda: para_json(linhas_atual, modelo), repeticoes),
+            "consulta_e_serializacao_antes": comum.medir(antes, repeticoes),
+            "consulta_e_serializacao_depois": comum.medir(depois, repeticoes),
+        }
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--itens", type=int, default=1000)
+    parser.add_argument("--repeticoes", type=int, default=200)
+    args = parser.parse_args()
+
+    semear(args.itens)
+    db = SessionLocal()
+    try:
+        comum.imprimir(rodar(db, args.itens, args.repeticoes))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
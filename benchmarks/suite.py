@@ -0,0 +1,288 @@
+# Suíte de carga do app inteiro. Semeia o banco (benchmarks/semente.py) e
+# dispara cenários HTTP com N clientes concorrentes, dentro do processo
+# (httpx + ASGITransport, com o lifespan do app) ou contra um uvicorn de
+# verdade (--modo uvicorn, subprocesso com --workers):
+#   navegacao   GET /votacoes, /votacoes/open|closed, /votacoes/{id},
+#               /votacoes/{id}/opcoes e /candidaturas*
+#   resultados  GET /votacoes/{id}/votos nas votações "quentes"
+#   votos       POST /votos/ com usuário e opção sorteados (parte duplicada)
+#   login       POST /login/ com a senha certa (custo do bcrypt)
+# A saída é JSON: p50/p95/p99 e requisições/s por cenário (e por rota na
+# navegação), mais os dados do ambiente. --saida grava o JSON em arquivo e
+# --comparar lê um resultado anterior e mostra a variação; com --tolerancia,
+# sai com código 1 se algum cenário piorou mais que isso.
+#
+#   python -m benchmarks.suite --saida base.json
+#   python -m benchmarks.suite --modo uvicorn --workers 2 --comparar base.json --tolerancia 15
+#
+# Para Postgres, exporte DATABASE_URL antes (o banco é recriado).
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import platform
+import subprocess
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from benchmarks import comum
+from benchmarks import semente
+
+CENARIOS = ("navegacao", "resultados", "votos", "login")
+# Variáveis que mudam o comportamento medido; vão para o JSON quando definidas
+AMBIENTE = ("DB_ASYNC", "RESPOSTAS_CACHE", "METRICAS", "DB_INSTRUMENTACAO", "INGESTAO_EM_LOTE", "BCRYPT_ROUNDS", "SENHA_WORKERS", "DB_POOL_SIZE", "DB_MAX_OVERFLOW", "LIMITES")
+METRICAS_COMPARADAS = ("p50_ms", "p95_ms", "p99_ms", "throughput_rps")
+
+
+class Gerador:
+    # Monta as requisições de cada cenário a partir dos volumes semeados:
+    # cada método devolve (rótulo, método HTTP, url, kwargs do httpx)
+    def __init__(self, volumes, quentes):
+        self.usuarios = volumes["usuarios"]
+        self.votacoes = volumes["votacoes"]
+        self.abertas = max(1, volumes["votacoes"] - int(volumes["votacoes"] * volumes["fechadas"]))
+        self.opcoes = volumes["opcoes"]
+        self.quentes = max(1, min(quentes, self.votacoes))
+
+    def navegacao(self, rng):
+        id_votacao = rng.randrange(self.votacoes) + 1
+        offset = rng.randrange(5) * 10
+        rota = rng.choice((
+            ("/votacoes", f"/votacoes?offset={offset}"),
+            ("/votacoes/open", f"/votacoes/open?offset={offset}"),
+            ("/votacoes/closed", "/votacoes/closed"),
+            ("/votacoes/{id_votacao}", f"/votacoes/{id_votacao}"),
+            ("/votacoes/{id_votacao}/opcoes", f"/votacoes/{id_votacao}/opcoes"),
+            ("/candidaturas", f"/candidaturas?offset={offset}"),
+            ("/candidaturas/aprovadas", "/candidaturas/aprovadas"),
+            ("/candidaturas/pendentes", "/candidaturas/pendentes"),
+        ))
+        return rota[0], "GET", rota[1], {}
+
+    def resultados(self, rng):
+        return "/votacoes/{id_votacao}/votos", "GET", f"/votacoes/{rng.randrange(self.quentes) + 1}/votos", {}
+
+    def votos(self, rng):
+        v = rng.randrange(self.abertas)
+        voto = {
+            "id_user": rng.randrange(self.usuarios) + 1,
+            "id_votacao": v + 1,
+            "id_opcao": v * self.opcoes + rng.randrange(self.opcoes) + 1,
+            "data_voto": datetime.utcnow().isoformat(),
+        }
+        return "/votos/", "POST", "/votos/", {"json": voto}
+
+    def login(self, rng):
+        dados = {"username": semente.email(rng.randrange(self.usuarios)), "password": semente.SENHA}
+        return "/login/", "POST", "/login/", {"data": dados}
+
+
+async def rodar_cenario(cliente, gerar, rng, requisicoes, duracao, concorrencia, aquecimento):
+    for _ in range(aquecimento):
+        _, metodo, url, kwargs = gerar(rng)
+        await cliente.request(metodo, url, **kwargs)
+
+    amostras = defaultdict(list)
+    status = Counter()
+    excecoes = Counter()
+    aceitos = 0
+    restantes = [requisicoes]
+    prazo = time.perf_counter() + duracao if duracao else None
+
+    async def cliente_virtual():
+        nonlocal aceitos
+        while True:
+            if prazo is not None:
+                if time.perf_counter() >= prazo:
+                    return
+            elif restantes[0] <= 0:
+                return
+            else:
+                restantes[0] -= 1
+            rotulo, metodo, url, kwargs = gerar(rng)
+            inicio = time.perf_counter()
+            try:
+                resposta = await cliente.request(metodo, url, **kwargs)
+            except Exception as e:
+                excecoes[type(e).__name__] += 1
+                continue
+            amostras[rotulo].append((time.perf_counter() - inicio) * 1000)
+            status[resposta.status_code] += 1
+            if rotulo == "/votos/" and b'"id_voto"' in resposta.content:
+                aceitos += 1
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(cliente_virtual() for _ in range(concorrencia)))
+    total_s = time.perf_counter() - inicio
+
+    todas = [a for lista in amostras.values() for a in lista]
+    resultado = comum.percentis(todas)
+    resultado["duracao_s"] = round(total_s, 3)
+    resultado["throughput_rps"] = round(len(todas) / total_s, 1) if total_s else 0
+    resultado["status"] = {str(codigo): n for codigo, n in sorted(status.items())}
+    resultado["erros"] = sum(n for codigo, n in status.items() if codigo >= 500) + sum(excecoes.values())
+    if excecoes:
+        resultado["excecoes"] = dict(excecoes)
+    if len(amostras) > 1:
+        resultado["por_rota"] = {rotulo: comum.percentis(lista) for rotulo, lista in sorted(amostras.items())}
+    if "/votos/" in amostras:
+        resultado["votos_aceitos"] = aceitos
+        resultado["votos_duplicados"] = len(amostras["/votos/"]) - aceitos
+    return resultado
+
+
+async def rodar_cenarios(cliente, args, gerador):
+    resultados = {}
+    for nome in args.cenarios:
+        rng = random.Random(f"{args.seed}-{nome}")
+        requisicoes = args.requisicoes_login if nome == "login" else args.requisicoes
+        resultados[nome] = await rodar_cenario(cliente, getattr(gerador, nome), rng, requisicoes, args.duracao, args.concorrencia, args.aquecimento)
+    return resultados
+
+
+async def em_processo(args, gerador):
+    import httpx
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transporte = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=args.timeout) as cliente:
+            return await rodar_cenarios(cliente, args, gerador)
+
+
+def _esperar_servidor(url, processo, limite=60):
+    import httpx
+
+    prazo = time.monotonic() + limite
+    while time.monotonic() < prazo:
+        if processo.poll() is not None:
+            raise RuntimeError(f"uvicorn saiu com código {processo.returncode}")
+        try:
+            if httpx.get(f"{url}/votacoes/open", timeout=2).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("uvicorn não respondeu a tempo")
+
+
+async def via_uvicorn(args, gerador):
+    import httpx
+
+    url = f"http://127.0.0.1:{args.porta}"
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(args.porta), "--workers", str(args.workers), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        _esperar_servidor(url, processo)
+        limites = httpx.Limits(max_connections=args.concorrencia, max_keepalive_connections=args.concorrencia)
+        async with httpx.AsyncClient(base_url=url, limits=limites, timeout=args.timeout) as cliente:
+            return await rodar_cenarios(cliente, args, gerador)
+    finally:
+        processo.terminate()
+        try:
+            processo.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            processo.kill()
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(anterior, atual, tolerancia):
+    # Variação em % de cada métrica; latência subindo ou vazão caindo além da
+    # tolerância conta como regressão
+    comparacao = {}
+    regressoes = []
+    for nome, depois in atual["cenarios"].items():
+        antes = anterior.get("cenarios", {}).get(nome)
+        if not antes:
+            continue
+        comparacao[nome] = {}
+        for metrica in METRICAS_COMPARADAS:
+            if not antes.get(metrica) or metrica not in depois:
+                continue
+            variacao = round(100 * (depois[metrica] - antes[metrica]) / antes[metrica], 1)
+            comparacao[nome][metrica] = {"antes": antes[metrica], "depois": depois[metrica], "variacao_pct": variacao}
+            piora = -variacao if metrica == "throughput_rps" else variacao
+            if tolerancia is not None and piora > tolerancia:
+                regressoes.append(f"{nome}.{metrica}")
+    return comparacao, regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    semente.adicionar_argumentos(parser)
+    parser.add_argument("--cenarios", type=lambda s: s.split(","), default=list(CENARIOS), help="lista separada por vírgula: " + ",".join(CENARIOS))
+    parser.add_argument("--modo", choices=("processo", "uvicorn"), default="processo")
+    parser.add_argument("--workers", type=int, default=1, help="workers do uvicorn (--modo uvicorn)")
+    parser.add_argument("--porta", type=int, default=8765)
+    parser.add_argument("--concorrencia", type=int, default=16, help="clientes simultâneos")
+    parser.add_argument("--requisicoes", type=int, default=2000, help="por cenário")
+    parser.add_argument("--requisicoes-login", type=int, default=200, help="o login é limitado pelo bcrypt")
+    parser.add_argument("--duracao", type=float, default=0, help="segundos por cenário; substitui o número de requisições")
+    parser.add_argument("--aquecimento", type=int, default=20, help="requisições descartadas antes de medir cada cenário")
+    parser.add_argument("--quentes", type=int, default=5, help="votações consultadas no cenário resultados")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--sem-semente", action="store_true", help="usa o banco como está (com os mesmos volumes informados)")
+    parser.add_argument("--saida", help="grava o JSON neste arquivo")
+    parser.add_argument("--comparar", help="JSON de uma rodada anterior")
+    parser.add_argument("--tolerancia", type=float, help="piora máxima em %% antes de sair com código 1")
+    args = parser.parse_args()
+
+    semente.validar(parser, args)
+    desconhecidos = set(args.cenarios) - set(CENARIOS)
+    if desconhecidos:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+    volumes = semente.volumes(args)
+    resultado = {
+        "suite": {
+            "data": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "modo": args.modo,
+            "workers": args.workers if args.modo == "uvicorn" else None,
+            "concorrencia": args.concorrencia,
+            "ambiente": {nome: os.environ[nome] for nome in AMBIENTE if nome in os.environ},
+        },
+        "volumes": volumes,
+    }
+    if not args.sem_semente:
+        inicio = time.perf_counter()
+        resultado["semente"] = semente.semear(**volumes)
+        resultado["semente"]["segundos"] = round(time.perf_counter() - inicio, 2)
+
+    gerador = Gerador(volumes, args.quentes)
+    executar = via_uvicorn if args.modo == "uvicorn" else em_processo
+    try:
+        resultado["cenarios"] = asyncio.run(executar(args, gerador))
+    finally:
+        from app.security import encerrar_pool
+        encerrar_pool()
+
+    regressoes = []
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            resultado["comparacao"], regressoes = comparar(json.load(f), resultado, args.tolerancia)
+        if args.tolerancia is not None:
+            resultado["regressoes"] = regressoes
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f, indent=2, ensure_ascii=False, default=str)
+    comum.imprimir(resultado)
+    sys.exit(1 if regressoes else 0)
+
+
+if __name__ == "__main__":
+    main()
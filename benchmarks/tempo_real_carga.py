@@ -0,0 +1,97 @@
+# Carga do hub de resultados ao vivo (app/tempo_real.py): N assinantes numa
+# votação, um produtor publicando votos num ritmo fixo. Mede o uso de CPU do
+# processo e o atraso entre publicar um voto e o assinante recebê-lo.
+# O hub roda sem banco (carregador injetado) e os assinantes consomem a fila
+# direto, sem HTTP, então o número isola o custo do fan-out.
+#
+#   python -m benchmarks.tempo_real_carga --assinantes 100 1000 5000 --votos-por-s 2000
+import json
+import time
+import asyncio
+import argparse
+import threading
+
+from benchmarks import comum
+from app.tempo_real import HubResultados
+
+OPCOES = 5
+
+
+async def rodar(assinantes, votos_por_s, duracao, tick_ms):
+    hub = HubResultados(tick=tick_ms / 1000, resync=3600, carregar=lambda id_votacao: {})
+    hub.iniciar()
+    publicados = []
+    atrasos_ultimo, atrasos_primeiro = [], []
+    recebidos = [0]
+
+    async def assinante(medir):
+        async with hub.assinar(1) as fila:
+            await fila.get()  # evento inicial de totais
+            while True:
+                evento = json.loads(await fila.get())
+                agora = time.time()
+                recebidos[0] += 1
+                if not medir:
+                    continue
+                total = sum(evento["totais"].values())
+                novos = sum(evento["deltas"].values())
+                atrasos_ultimo.append((agora - publicados[total - 1]) * 1000)
+                atrasos_primeiro.append((agora - publicados[total - novos]) * 1000)
+
+    # O atraso é medido em uma amostra de assinantes; todos recebem e decodificam
+    tarefas = [asyncio.create_task(assinante(i % 50 == 0)) for i in range(assinantes)]
+    while hub.assinantes(1) < assinantes:
+        await asyncio.sleep(0.01)
+
+    parar = threading.Event()
+
+    def produtor():
+        intervalo = 1 / votos_por_s
+        proximo = time.perf_counter()
+        while not parar.is_set():
+            publicados.append(time.time())
+            hub.publicar(1, len(publicados) % OPCOES + 1)
+            proximo += intervalo
+            espera = proximo - time.perf_counter()
+            if espera > 0:
+                time.sleep(espera)
+
+    thread = threading.Thread(target=produtor, daemon=True)
+    cpu_inicio, parede_inicio = time.process_time(), time.perf_counter()
+    thread.start()
+    await asyncio.sleep(duracao)
+    parar.set()
+    cpu = time.process_time() - cpu_inicio
+    parede = time.perf_counter() - parede_inicio
+    thread.join()
+
+    for tarefa in tarefas:
+        tarefa.cancel()
+    await asyncio.gather(*tarefas, return_exceptions=True)
+    await hub.parar()
+    return {
+        "assinantes": assinantes,
+        "votos_publicados": len(publicados),
+        "eventos_entregues": recebidos[0],
+        "cpu_pct": round(100 * cpu / parede, 1),
+        "atraso_voto_mais_recente": comum.percentis(atrasos_ultimo),
+        "atraso_voto_mais_antigo": comum.percentis(atrasos_primeiro),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--assinantes", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--votos-por-s", type=int, default=2000)
+    parser.add_argument("--duracao", type=float, default=5)
+    parser.add_argument("--tick-ms", type=float, default=500)
+    args = parser.parse_args()
+
+    resultado = {"votos_por_s": args.votos_por_s, "tick_ms": args.tick_ms, "cargas": []}
+    for n in args.assinantes:
+        resultado["cargas"].append(asyncio.run(rodar(n, args.votos_por_s, args.duracao, args.tick_ms)))
+    comum.imprimir(resultado)
+
+
+if __name__ == "__main__":
+    main()